@@ -0,0 +1,408 @@
+"""
+Benchmarks del pipeline.
+
+Uso:
+    # Layout físico del parquet: tamaño y lectura filtrada (ciudad / un id),
+    # layout anterior (to_parquet por defecto) vs. src/storage.py
+    python -m src.benchmarks layout
+    python -m src.benchmarks layout --parquet data/processed/housing_history.parquet --repetir 50
+
+    # Escalamiento sobre datos sintéticos (src/synthetic.py): tiempo y memoria
+    # pico por etapa; cada medición se añade a data/benchmarks/escala.csv
+    python -m src.benchmarks escala --filas 100000 1000000 10000000
+    python -m src.benchmarks escala --filas 1000000 --etapas preprocesar ingest_streaming
+
+    # Features de servicios cercanos (src/osm_pois.py) sobre inmuebles sintéticos:
+    # motor de conteo × n_jobs × tamaño de tanda → data/benchmarks/pois.csv
+    # (POIs reales de data/osm/ si existen; si no, sintéticos alrededor de las ciudades)
+    python -m src.benchmarks pois --filas 1000000 --n-jobs 1 4 --conteo arbol exacto
+
+    # BallTree haversine vs. cKDTree 3-D: conteos en radio y vecino más cercano,
+    # tiempos y diferencias → data/benchmarks/motores.csv
+    python -m src.benchmarks motores --filas 200000 --n-jobs 4
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.config import BASE_DIR, DATA_PROC
+from src.storage import escribir_parquet
+
+LAYOUT_FUENTES = [BASE_DIR / "data" / "app" / "housing_clean.parquet",
+                  DATA_PROC / "housing_history.parquet",
+                  DATA_PROC / "housing_clean.parquet"]
+
+ESCALA_RESULTADOS = BASE_DIR / "data" / "benchmarks" / "escala.csv"
+ETAPAS = ["preprocesar", "upsert", "ingest", "ingest_streaming", "cambios"]
+POIS_RESULTADOS = BASE_DIR / "data" / "benchmarks" / "pois.csv"
+MOTORES_RESULTADOS = BASE_DIR / "data" / "benchmarks" / "motores.csv"
+
+
+def _cronometrar(fn, repeticiones: int = 5) -> float:
+    """Mejor tiempo (s) de `repeticiones` llamadas."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def _grupos_tocados(path: Path, col: str, valor) -> int:
+    """Row groups cuyo min/max admite `valor` (lo que un lector no puede saltarse)."""
+    md = pq.ParquetFile(path).metadata
+    i = md.schema.to_arrow_schema().get_field_index(col)
+    n = 0
+    for g in range(md.num_row_groups):
+        st = md.row_group(g).column(i).statistics
+        if st is None or not st.has_min_max or st.min <= valor <= st.max:
+            n += 1
+    return n
+
+
+def bench_layout(parquet: Path | None = None, repetir: int = 20) -> pd.DataFrame:
+    """Compara el layout anterior contra el de `src.storage` sobre `parquet`
+    (replicado `repetir` veces con ids distintos para tener volumen)."""
+    src = parquet or next((p for p in LAYOUT_FUENTES if p.exists()), None)
+    if src is None:
+        raise FileNotFoundError("No hay parquet limpio. Corre `python -m src.ingest` primero.")
+    base = pd.read_parquet(src)
+    base["id_inmueble"] = base["id_inmueble"].astype(str)
+    copias = [base.assign(id_inmueble=base["id_inmueble"] + f"-{k}") for k in range(repetir)]
+    # Orden de llegada "arbitrario" (el de hoy): barajado con semilla fija
+    df = pd.concat(copias, ignore_index=True).sample(frac=1, random_state=42, ignore_index=True)
+
+    ciudad = df["Ciudad"].value_counts().index[0]
+    un_id = df["id_inmueble"].iloc[len(df) // 2]
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        antes, ahora = Path(tmp) / "antes.parquet", Path(tmp) / "ahora.parquet"
+        escrituras = {
+            "antes": (antes, lambda: df.to_parquet(antes, index=False)),
+            "ahora": (ahora, lambda: escribir_parquet(
+                df, ahora, orden=["Departamento", "Ciudad", "id_inmueble"])),
+        }
+        for nombre, (path, escribir) in escrituras.items():
+            t_w = _cronometrar(escribir, 1)
+            filas.append({
+                "layout": nombre,
+                "filas": len(df),
+                "MB": path.stat().st_size / 1e6,
+                "row_groups": pq.ParquetFile(path).metadata.num_row_groups,
+                "escritura_s": t_w,
+                "lectura_total_s": _cronometrar(lambda: pq.read_table(path)),
+                "filtro_ciudad_s": _cronometrar(
+                    lambda: pq.read_table(path, filters=[("Ciudad", "==", ciudad)])),
+                "grupos_ciudad": _grupos_tocados(path, "Ciudad", ciudad),
+                "filtro_id_s": _cronometrar(
+                    lambda: pq.read_table(path, filters=[("id_inmueble", "==", un_id)])),
+                "grupos_id": _grupos_tocados(path, "id_inmueble", un_id),
+            })
+    res = pd.DataFrame(filas)
+    print(f"Fuente: {src} ×{repetir} · ciudad='{ciudad}' · id='{un_id}'")
+    print(res.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    return res
+
+
+# ───────────────────────── Escalamiento (datos sintéticos) ─────────────────────────
+
+def _memoria_mb(campo: str) -> float:
+    """VmRSS/VmHWM del proceso actual en MB (Linux); si no hay /proc, el máximo
+    de getrusage."""
+    try:
+        with open("/proc/self/status") as fh:
+            for linea in fh:
+                if linea.startswith(campo + ":"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reiniciar_pico() -> None:
+    """Reinicia el pico de memoria (VmHWM) para no contar la preparación."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _redirigir(raiz: Path) -> None:
+    """Apunta las rutas de datos de los módulos al directorio temporal `raiz`."""
+    from src import eventos, ingest, master, preprocessing
+    proc = raiz / "processed"
+    proc.mkdir(parents=True, exist_ok=True)
+    ingest.DATA_RAW, ingest.DATA_PROC = raiz / "raw", proc
+    ingest.HIST_PATH = proc / "housing_history.parquet"
+    ingest.CLEAN_PATH = proc / "housing_clean.parquet"
+    ingest.MANIFEST_PATH = proc / "raw_manifest.parquet"
+    preprocessing.CACHE_DIR = proc / "norm_cache"
+    master.MASTER_PATH = raiz / "master" / "listings.parquet"
+    eventos.EVENTOS_DIR = raiz / "master" / "eventos"
+
+
+def _medir_etapa(etapa: str, raiz: Path, n_jobs: int, cola) -> None:
+    """Corre `etapa` en un proceso limpio y reporta (segundos, base_MB, pico_MB).
+
+    Lo que la etapa recibe ya hecho (leer los crudos, la historia…) se prepara
+    antes de reiniciar el pico y no cuenta ni en tiempo ni en memoria.
+    """
+    from src import ingest, master, changes
+    from src.preprocessing import preprocesar_datos_finca_raiz
+    from src.raw_io import leer_raw, listar_raw
+    _redirigir(raiz)
+    raw = raiz / "raw"
+
+    if etapa == "preprocesar":
+        df = leer_raw(listar_raw(raw), columnas=ingest.COLUMNAS)
+        fn = lambda: preprocesar_datos_finca_raiz(df, usar_cache=False, n_jobs=n_jobs)
+    elif etapa == "upsert":
+        def fn():
+            # Una corrida por fecha, como el job diario (lee el snapshot del día)
+            for dia in sorted(p for p in raw.iterdir() if p.is_dir()):
+                master.upsert(leer_raw(listar_raw(dia), excluir=master.DROP_COLS), dia.name)
+    elif etapa in ("ingest", "ingest_streaming"):
+        fn = lambda: ingest.run(full_rebuild=True, streaming=etapa == "ingest_streaming",
+                                n_jobs=n_jobs)
+    elif etapa == "cambios":
+        if not ingest.HIST_PATH.exists():
+            ingest.run(full_rebuild=True, n_jobs=n_jobs)
+        hist = pd.read_parquet(ingest.HIST_PATH)
+        hist["fecha_recoleccion"] = pd.to_datetime(hist["fecha_recoleccion"], errors="coerce")
+        fn = lambda: changes.cambios_de_precio(hist)
+    else:
+        raise ValueError(f"Etapa desconocida: {etapa}")
+
+    _reiniciar_pico()
+    base = _memoria_mb("VmRSS")
+    t0 = time.perf_counter()
+    fn()
+    cola.put((time.perf_counter() - t0, base, _memoria_mb("VmHWM")))
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def bench_escala(filas=(100_000, 1_000_000), etapas=ETAPAS, fechas: int = 5,
+                 n_jobs: int = 1, resultados: Path = ESCALA_RESULTADOS,
+                 semilla: int = 0) -> pd.DataFrame:
+    """Tiempo y memoria pico de cada etapa sobre historias sintéticas de `filas`
+    filas (todas las fechas) y `fechas` corridas.
+
+    Cada etapa corre en un proceso nuevo (spawn) para que el pico de memoria sea
+    solo suyo. Los resultados se añaden a `resultados` (CSV) con la fecha y el
+    commit, para comparar entre versiones.
+    """
+    from src.synthetic import escribir_raw
+    ctx = mp.get_context("spawn")
+    commit, hoy = _commit(), pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
+    filas_res = []
+    for n in filas:
+        with tempfile.TemporaryDirectory() as tmp:
+            raiz = Path(tmp)
+            t0 = time.perf_counter()
+            escribir_raw(raiz / "raw", n, fechas, semilla=semilla)
+            print(f"🧪 {n:,} filas sintéticas ({fechas} fechas) en "
+                  f"{time.perf_counter() - t0:.1f}s")
+            for etapa in etapas:
+                cola = ctx.Queue()
+                proc = ctx.Process(target=_medir_etapa, args=(etapa, raiz, n_jobs, cola))
+                proc.start()
+                proc.join()
+                if proc.exitcode != 0:
+                    print(f"   ❌ {etapa}: el proceso terminó con código {proc.exitcode}")
+                    continue
+                seg, base, pico = cola.get()
+                filas_res.append({"fecha": hoy, "commit": commit, "etapa": etapa, "filas": n,
+                                  "fechas": fechas, "n_jobs": n_jobs, "segundos": round(seg, 3),
+                                  "base_MB": round(base, 1), "pico_MB": round(pico, 1)})
+                print(f"   {etapa:<17} {seg:9.2f}s  pico {pico:9.1f} MB")
+    res = pd.DataFrame(filas_res)
+    if len(res):
+        resultados = Path(resultados)
+        resultados.parent.mkdir(parents=True, exist_ok=True)
+        res.to_csv(resultados, mode="a", header=not resultados.exists(), index=False)
+        print(f"💾 {len(res)} mediciones añadidas a {resultados}")
+    return res
+
+
+# ───────────────────────── Servicios cercanos (POIs) ─────────────────────────
+
+def _puntos_ciudades(n: int, rng, dispersion: float = 0.04) -> tuple:
+    """(lat, lon) de `n` puntos alrededor de las ciudades de src/synthetic.py."""
+    from src.synthetic import CIUDADES
+    pesos = np.array([c[4] for c in CIUDADES], float)
+    ci = rng.choice(len(CIUDADES), n, p=pesos / pesos.sum())
+    return (np.array([c[2] for c in CIUDADES])[ci] + rng.normal(0, dispersion, n),
+            np.array([c[3] for c in CIUDADES])[ci] + rng.normal(0, dispersion, n))
+
+
+def _pois_de_prueba(tmp: Path, n_pois: int, rng) -> None:
+    """Si no hay dataset de POIs real, apunta src.osm_pois a uno sintético de
+    `n_pois` POIs en `tmp`."""
+    from src import osm_pois as O
+    if O.POIS_DIR.exists():
+        return
+    print(f"🧪 {n_pois:,} POIs sintéticos (no hay {O.POIS_DIR})")
+    O.OSM_DIR, O.POIS_DIR, O.INDICE_DIR = tmp, tmp / "pois", tmp / "pois_indice"
+    lat, lon = _puntos_ciudades(n_pois, rng, dispersion=0.08)
+    O.guardar_pois(pd.DataFrame({"lat": lat, "lon": lon,
+                                 "categoria": rng.choice(sorted(O.CATEGORIAS), n_pois)}))
+
+
+def bench_pois(filas: int = 1_000_000, n_jobs=(1,), filas_chunk=(50_000,),
+               conteos=("arbol",), n_pois: int = 400_000, resultados: Path = POIS_RESULTADOS,
+               semilla: int = 0) -> pd.DataFrame:
+    """Tiempo y memoria pico de `features_servicios` sobre `filas` inmuebles
+    sintéticos, por motor de conteo, n_jobs y tamaño de tanda.
+
+    Usa el índice de POIs real si hay parquet en data/osm/; si no, construye uno
+    sintético de `n_pois` POIs en un directorio temporal. La primera llamada (que
+    puede construir el índice) no se mide.
+    """
+    from src import osm_pois as O
+    rng = np.random.default_rng(semilla)
+    commit, hoy = _commit(), pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
+    with tempfile.TemporaryDirectory() as tmp:
+        _pois_de_prueba(Path(tmp), n_pois, rng)
+        lat, lon = _puntos_ciudades(filas, rng)
+        inmuebles = pd.DataFrame({"Latitud": lat, "Longitud": lon})
+        O.features_servicios(inmuebles.head(10))   # carga (o construye) índice y grilla
+        total_pois = len(O.leer_pois(columnas=["lat"]))
+
+        filas_res = []
+        for conteo in conteos:
+            for nj in n_jobs:
+                for chunk in filas_chunk:
+                    _reiniciar_pico()
+                    base = _memoria_mb("VmRSS")
+                    t0 = time.perf_counter()
+                    O.features_servicios(inmuebles, conteo=conteo, n_jobs=nj, filas_chunk=chunk)
+                    seg = time.perf_counter() - t0
+                    pico = _memoria_mb("VmHWM")
+                    filas_res.append({"fecha": hoy, "commit": commit, "conteo": conteo,
+                                      "filas": filas, "pois": total_pois,
+                                      "n_jobs": nj, "filas_chunk": chunk,
+                                      "segundos": round(seg, 3), "base_MB": round(base, 1),
+                                      "pico_MB": round(pico, 1)})
+                    print(f"   {conteo:<7} n_jobs={nj:<3} tanda={chunk:<9,} {seg:9.2f}s  "
+                          f"pico {pico:9.1f} MB")
+    res = pd.DataFrame(filas_res)
+    if len(res):
+        resultados = Path(resultados)
+        resultados.parent.mkdir(parents=True, exist_ok=True)
+        res.to_csv(resultados, mode="a", header=not resultados.exists(), index=False)
+        print(f"💾 {len(res)} mediciones añadidas a {resultados}")
+    return res
+
+
+def bench_motores(filas: int = 200_000, n_jobs: int = 1, radios_km=(0.5, 1.0),
+                  repetir: int = 3, n_pois: int = 400_000,
+                  resultados: Path = MOTORES_RESULTADOS, semilla: int = 0) -> pd.DataFrame:
+    """BallTree haversine vs. cKDTree sobre vectores unitarios (src/osm_pois.py)
+    para cada operación de las features: conteo en cada radio (todos los POIs)
+    y distancia al más cercano de cada categoría. Mide el mejor de `repetir`
+    tiempos y cuántos resultados difieren entre motores."""
+    from src import osm_pois as O
+    rng = np.random.default_rng(semilla)
+    commit, hoy = _commit(), pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
+    with tempfile.TemporaryDirectory() as tmp:
+        _pois_de_prueba(Path(tmp), n_pois, rng)
+        lat, lon = _puntos_ciudades(filas, rng)
+        bt, kd = O.cargar_indice("balltree"), O.cargar_indice("ckdtree")
+        rad, uni = np.radians(np.column_stack([lat, lon])), O.xyz(lat, lon)
+        ops = {f"radio_{int(r * 1000)}m": (
+            lambda r=r: bt["todos"].query_radius(rad, r=r / O.RADIO_TIERRA_KM, count_only=True),
+            lambda r=r: kd["todos"].query_ball_point(uni, r=O.cuerda(r), workers=n_jobs,
+                                                     return_length=True))
+            for r in radios_km}
+        cats = [c for c in bt if c != "todos"]
+        ops["vecino_k1"] = (
+            lambda: np.column_stack([bt[c].query(rad, k=1)[0][:, 0] * O.RADIO_TIERRA_KM
+                                     for c in cats]),
+            lambda: np.column_stack([O.arco_km(kd[c].query(uni, k=1, workers=n_jobs)[0])
+                                     for c in cats]))
+
+        filas_res = []
+        for op, (f_bt, f_kd) in ops.items():
+            a, b = f_bt(), f_kd()
+            dif = (int((a != b).sum()) if op.startswith("radio")
+                   else float(np.abs(a - b).max(initial=0.0)))
+            t_bt, t_kd = _cronometrar(f_bt, repetir), _cronometrar(f_kd, repetir)
+            filas_res.append({"fecha": hoy, "commit": commit, "operacion": op, "filas": filas,
+                              "pois": len(O.leer_pois(columnas=["lat"])), "n_jobs": n_jobs,
+                              "balltree_s": round(t_bt, 3), "ckdtree_s": round(t_kd, 3),
+                              "aceleracion": round(t_bt / t_kd, 2), "diferencia": dif})
+            print(f"   {op:<12} balltree {t_bt:8.2f}s  ckdtree {t_kd:8.2f}s  "
+                  f"×{t_bt / t_kd:5.1f}  " + (f"{dif} conteos distintos" if op.startswith("radio")
+                                               else f"máx |Δ| {dif:.2e} km"))
+    res = pd.DataFrame(filas_res)
+    resultados = Path(resultados)
+    resultados.parent.mkdir(parents=True, exist_ok=True)
+    res.to_csv(resultados, mode="a", header=not resultados.exists(), index=False)
+    print(f"💾 {len(res)} mediciones añadidas a {resultados}")
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="bench", required=True)
+    lay = sub.add_parser("layout", help="Tamaño y lectura filtrada del parquet")
+    lay.add_argument("--parquet", type=Path, default=None)
+    lay.add_argument("--repetir", type=int, default=20)
+    esc = sub.add_parser("escala", help="Tiempo y memoria por etapa sobre datos sintéticos")
+    esc.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000],
+                     help="Tamaños (filas totales de la historia) a medir")
+    esc.add_argument("--fechas", type=int, default=5)
+    esc.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    esc.add_argument("--n-jobs", type=int, default=1)
+    esc.add_argument("--semilla", type=int, default=0)
+    esc.add_argument("--resultados", type=Path, default=ESCALA_RESULTADOS)
+    poi = sub.add_parser("pois", help="Features de servicios cercanos por motor y paralelismo")
+    poi.add_argument("--filas", type=int, default=1_000_000)
+    poi.add_argument("--n-jobs", type=int, nargs="+", default=[1])
+    poi.add_argument("--filas-chunk", type=int, nargs="+", default=[50_000],
+                     help="Inmuebles por tanda (0 = todos de una vez)")
+    poi.add_argument("--conteo", nargs="+", choices=["arbol", "exacto", "grilla"],
+                     default=["arbol"])
+    poi.add_argument("--pois", type=int, default=400_000,
+                     help="POIs sintéticos si no hay parquet real")
+    poi.add_argument("--semilla", type=int, default=0)
+    poi.add_argument("--resultados", type=Path, default=POIS_RESULTADOS)
+    mot = sub.add_parser("motores", help="BallTree haversine vs. cKDTree 3-D")
+    mot.add_argument("--filas", type=int, default=200_000)
+    mot.add_argument("--n-jobs", type=int, default=1, help="Hilos de cKDTree (-1 = todos)")
+    mot.add_argument("--repetir", type=int, default=3)
+    mot.add_argument("--pois", type=int, default=400_000,
+                     help="POIs sintéticos si no hay dataset real")
+    mot.add_argument("--semilla", type=int, default=0)
+    mot.add_argument("--resultados", type=Path, default=MOTORES_RESULTADOS)
+    a = p.parse_args()
+    if a.bench == "layout":
+        bench_layout(a.parquet, a.repetir)
+    elif a.bench == "escala":
+        bench_escala(a.filas, a.etapas, a.fechas, a.n_jobs, a.resultados, a.semilla)
+    elif a.bench == "pois":
+        bench_pois(a.filas, a.n_jobs, a.filas_chunk, a.conteo, a.pois, a.resultados, a.semilla)
+    elif a.bench == "motores":
+        bench_motores(a.filas, a.n_jobs, repetir=a.repetir, n_pois=a.pois,
+                      resultados=a.resultados, semilla=a.semilla)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,35 @@
 Genera el dataset curado y liviano que consume el dashboard
 (data/app/housing_clean.parquet) a partir del parquet limpio de `ingest`.
 
+Con master, la limpieza es incremental: data/master/clean_rows.parquet guarda las
+filas ya limpias y data/master/clean_index.parquet el hash de la fila cruda de
+la que salió cada una (id_inmueble → hash). Cada corrida solo limpia los
+inmuebles nuevos o cuyo crudo cambió, descarta los que ya no están en el master
+y reutiliza el resto; el resultado es idéntico al de limpiar todo
+(`--full-rebuild`). Cambiar las reglas (`REGLAS_VERSION`) invalida todo el store.
+
+Del master solo se leen las columnas crudas de las que salen APP_COLS
+(`ENTRADAS`); el hash se calcula sobre ellas, así que un cambio en una columna
+que el dashboard no usa no obliga a re-limpiar.
+
+Si hay POIs de OSM (data/osm/pois/), se añaden las columnas de
+servicios cercanos desde su tabla lateral (`osm_pois.con_servicios`): solo se
+calculan los inmuebles nuevos o movidos.
+
 Uso:
     python -m src.ingest            # produce data/processed/housing_clean.parquet
     python -m src.build_app_dataset # produce data/app/housing_clean.parquet
+    python -m src.build_app_dataset --full-rebuild
 """
-from pathlib import Path
+import argparse
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from src.config import DATA_PROC, BASE_DIR
-from src.master import MASTER_PATH
-from src.preprocessing import preprocesar_datos_finca_raiz
+from src import master as M, osm_pois as O
+from src.preprocessing import REGLAS_VERSION, columnas_crudas, preprocesar_datos_finca_raiz
+from src.schema import categorizar
+from src.storage import escribir_parquet, leer_parquet
 
 # Solo las columnas que el dashboard necesita (mantiene el parquet pequeño)
 APP_COLS = ["id_inmueble", "Título", "URL detalle", "Precio", "Area_m2",
@@ -18,23 +38,110 @@ APP_COLS = ["id_inmueble", "Título", "URL detalle", "Precio", "Area_m2",
             "Departamento", "Barrio", "Latitud", "Longitud",
             "Estrato", "Parqueaderos", "Piso", "Antiguedad", "Estado"]
 
+# Lo único que se lee del master: las columnas crudas de las que salen APP_COLS
+# (ni la descripción ni Publicante ni el resto de la ficha se materializan)
+ENTRADAS = ["id_inmueble", *columnas_crudas(APP_COLS)]
+
+# Orden físico del parquet (el dashboard filtra por ciudad; ver src/storage.py)
+APP_ORDEN = ["Departamento", "Ciudad", "id_inmueble"]
+
+# Store de filas limpias (junto al master: el CI lo versiona con él)
+CLEAN_ROWS_PATH = M.MASTER_PATH.parent / "clean_rows.parquet"
+CLEAN_INDEX_PATH = M.MASTER_PATH.parent / "clean_index.parquet"
+
+# Columnas del master que la limpieza no lee (no cuentan para el hash)
+NO_CRUDAS = {"first_seen", "last_seen", "_enriquecido"}
+
+
+def hash_crudo(master: pd.DataFrame) -> pd.Series:
+    """Hash (uint64) por fila de las columnas crudas leídas + versión de las reglas."""
+    cols = sorted(c for c in master.columns if c not in NO_CRUDAS)
+    crudo = master[cols].copy()
+    if "Etiquetas" in crudo.columns:   # listas → texto (hash_pandas_object no hashea listas)
+        # pyarrow devuelve las listas como np.ndarray, no como list
+        crudo["Etiquetas"] = crudo["Etiquetas"].map(
+            lambda x: "\x1f".join(map(str, x)) if isinstance(x, (list, tuple, np.ndarray))
+            else None)
+    crudo["_reglas"] = REGLAS_VERSION
+    return pd.util.hash_pandas_object(crudo, index=False)
+
+
+def _limpiar(master: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+    df = preprocesar_datos_finca_raiz(master, n_jobs=n_jobs)
+    return df[[c for c in APP_COLS if c in df.columns]]
+
 
-def run() -> None:
+def limpiar_incremental(master: pd.DataFrame, full_rebuild: bool = False,
+                        n_jobs: int = 1) -> pd.DataFrame:
+    """Limpia solo las filas nuevas/cambiadas del master y persiste el store.
+
+    Devuelve las filas limpias en el mismo orden (y tipos) que `_limpiar(master)`.
+    """
+    llave = master["id_inmueble"].astype(str)
+    indice = pd.DataFrame({"id_inmueble": llave.to_numpy(), "hash": hash_crudo(master).to_numpy()})
+
+    previo = None
+    if not full_rebuild and CLEAN_ROWS_PATH.exists() and CLEAN_INDEX_PATH.exists():
+        previo = leer_parquet(CLEAN_INDEX_PATH)
+    if previo is None:
+        sucio = pd.Series(True, index=master.index)
+    else:
+        conocido = indice.merge(previo, on=["id_inmueble", "hash"], how="left", indicator=True)
+        sucio = pd.Series(conocido["_merge"].eq("left_only").to_numpy(), index=master.index)
+
+    nuevas = _limpiar(master[sucio], n_jobs)
+    if previo is not None:
+        # Reutiliza las filas limpias de los inmuebles sin cambios (los dados de
+        # baja o modificados quedan fuera)
+        vigentes = set(llave[~sucio])
+        guardadas = leer_parquet(CLEAN_ROWS_PATH)
+        guardadas = guardadas[guardadas["id_inmueble"].isin(vigentes)]
+        limpias = pd.concat([guardadas, nuevas], ignore_index=True) if len(guardadas) else nuevas
+    else:
+        limpias = nuevas
+    # Mismo orden que una limpieza completa: el del master
+    pos = pd.Series(range(len(llave)), index=llave.to_numpy())
+    limpias = limpias.iloc[pos.loc[limpias["id_inmueble"]].argsort(kind="stable")]
+    # Categorías unificadas (guardadas y nuevas traen cada una las suyas)
+    limpias = categorizar(limpias.reset_index(drop=True))
+
+    escribir_parquet(limpias, CLEAN_ROWS_PATH, orden=["id_inmueble"])
+    escribir_parquet(indice, CLEAN_INDEX_PATH, orden=["id_inmueble"])
+    print(f"🧹 Limpiados {int(sucio.sum()):,} de {len(master):,} inmuebles "
+          f"({len(master) - int(sucio.sum()):,} reutilizados)")
+    return limpias
+
+
+def run(full_rebuild: bool = False, n_jobs: int = 1) -> None:
     # Prioridad: master incremental (crudo → se limpia) > parquet ya limpio de ingest
-    if MASTER_PATH.exists():
-        df = preprocesar_datos_finca_raiz(pd.read_parquet(MASTER_PATH))
+    if M.MASTER_PATH.exists():
+        df = limpiar_incremental(M.cargar(ENTRADAS), full_rebuild, n_jobs)
     else:
         src = DATA_PROC / "housing_clean.parquet"
         if not src.exists():
             raise FileNotFoundError(
                 f"No hay master ni {src}. Corre el scraper (--incremental) o `python -m src.ingest`.")
-        df = pd.read_parquet(src)
+        df = leer_parquet(src, [c for c in APP_COLS if c in pq.read_schema(src).names])
+
+    cols = [c for c in APP_COLS if c in df.columns]
+    if O.POIS_DIR.exists():
+        df = O.con_servicios(df[cols], n_jobs=n_jobs)
+        cols += [c for c in df.columns if O.COLUMNA_SERVICIO.match(c)]
 
     out = BASE_DIR / "data" / "app" / "housing_clean.parquet"
-    out.parent.mkdir(parents=True, exist_ok=True)
-    df[[c for c in APP_COLS if c in df.columns]].to_parquet(out, index=False)
+    escribir_parquet(df[cols], out, orden=APP_ORDEN)
     print(f"✅ {len(df):,} filas → {out}")
 
 
+def main() -> None:
+    p = argparse.ArgumentParser(description="Dataset del dashboard desde el master")
+    p.add_argument("--full-rebuild", action="store_true",
+                   help="Limpia todo el master ignorando el store de filas limpias")
+    p.add_argument("--n-jobs", type=int, default=1,
+                   help="Procesos para la limpieza (-1 = todos los núcleos)")
+    a = p.parse_args()
+    run(a.full_rebuild, a.n_jobs)
+
+
 if __name__ == "__main__":
-    run()
+    main()
@@ -1,19 +1,40 @@
 """
-Deriva cambios en el mercado a partir de la historia de snapshots.
+Cambios en el mercado: cambios de precio, nuevas y no vistas.
 
-Requiere haber corrido antes:
-    python -m src.scraper ...   (varias veces, en días distintos)
-    python -m src.ingest        (genera data/processed/housing_history.parquet)
+El CLI consulta la bitácora de eventos que escribe cada upsert al master
+(`src.eventos`, data/master/eventos/) por rango de fechas; no recorre la
+historia. `cambios_de_precio` / `nuevas_y_eliminadas` siguen disponibles para
+derivarlos de la historia de `ingest` (data/processed/housing_history.parquet).
+
+`consultar` responde preguntas puntuales ("bajadas de más del 5 % en Medellín
+desde el 1 de septiembre", "nuevos en un barrio esta semana") sin cargar la
+bitácora: la fecha poda particiones y el resto de condiciones (evento, ciudad,
+barrio, tipo, variación) se empujan como filtro al lector de pyarrow, que solo
+materializa las filas y columnas que cumplen.
 
 Uso:
-    python -m src.changes
+    python -m src.changes                          # todo lo anotado
+    python -m src.changes --desde 2026-08-01 --hasta 2026-08-31
     python -m src.changes --save     # guarda los 3 CSV en data/processed/
+    python -m src.changes --ciudad Medellín --caida-min 5 --desde 2026-09-01
+    python -m src.changes --evento nuevo --barrio "El Poblado" --ultimos-dias 7
+    python -m src.changes --evento no_visto --ciudad Cali --salida cali.csv
 """
 from __future__ import annotations
 import argparse
+from datetime import date, timedelta
+from typing import Sequence
+
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from src import eventos as EV
 from src.config import DATA_PROC
 
+# Lo único que leen los cambios de la historia (proyección al leer el parquet)
+COLUMNAS = ["id_inmueble", "Título", "Precio", "Ciudad", "fecha_recoleccion"]
+
 
 def cargar_historia() -> pd.DataFrame:
     path = DATA_PROC / "housing_history.parquet"
@@ -21,7 +42,7 @@ def cargar_historia() -> pd.DataFrame:
         raise FileNotFoundError(
             f"No existe {path}. Corre `python -m src.ingest` primero."
         )
-    df = pd.read_parquet(path)
+    df = pd.read_parquet(path, columns=COLUMNAS)
     df["fecha_recoleccion"] = pd.to_datetime(df["fecha_recoleccion"], errors="coerce")
     return df
 
@@ -74,27 +95,119 @@ def nuevas_y_eliminadas(hist: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]
     return nuevas, eliminadas
 
 
+def desde_eventos(desde: str | None = None, hasta: str | None = None
+                  ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """(cambios de precio, nuevas, no vistas) anotados en [desde, hasta]."""
+    ev = EV.leer(desde, hasta).rename(columns={"fecha": "fecha_recoleccion"})
+    precios = ev[ev["evento"] == "precio"]
+    precios = precios.assign(
+        variacion=precios["Precio"] - precios["precio_anterior"],
+        variacion_pct=(precios["Precio"] / precios["precio_anterior"] - 1) * 100,
+    )[["id_inmueble", "Título", "fecha_recoleccion",
+       "precio_anterior", "Precio", "variacion", "variacion_pct"]]
+    nuevas = ev.loc[ev["evento"] == "nuevo",
+                    ["id_inmueble", "Título", "Precio", "Ciudad", "fecha_recoleccion"]]
+    eliminadas = ev.loc[ev["evento"] == "no_visto",
+                        ["id_inmueble", "Título", "precio_anterior", "Ciudad",
+                         "fecha_recoleccion"]].rename(
+        columns={"precio_anterior": "Precio", "fecha_recoleccion": "no_visto_desde"})
+    return (precios.reset_index(drop=True), nuevas.reset_index(drop=True),
+            eliminadas.reset_index(drop=True))
+
+
+def _igual(col: str, valor: str) -> ds.Expression:
+    """`col == valor` sin distinguir mayúsculas ("medellín" encuentra "Medellín")."""
+    return pc.utf8_lower(ds.field(col)) == valor.strip().lower()
+
+
+def consultar(desde: str | None = None, hasta: str | None = None,
+              eventos: Sequence[str] | None = None, ciudad: str | None = None,
+              barrio: str | None = None, tipo: str | None = None,
+              variacion_min: float | None = None, variacion_max: float | None = None,
+              columnas: Sequence[str] | None = None) -> pd.DataFrame:
+    """Eventos de la bitácora que cumplen todas las condiciones dadas.
+
+    `variacion_min` / `variacion_max` acotan la variación de precio en %
+    (p. ej. `variacion_max=-5` → bajadas de más del 5 %) y restringen la
+    consulta a eventos `precio`. El resultado trae además `variacion` y
+    `variacion_pct` y, si se pasan `columnas`, solo esas (se leen solo las
+    necesarias para calcularlas).
+    """
+    filtro = None
+    conds = [_igual("Ciudad", ciudad) if ciudad else None,
+             _igual("Barrio", barrio) if barrio else None,
+             _igual("Tipo_propiedad", tipo) if tipo else None]
+    if variacion_min is not None or variacion_max is not None:
+        eventos = ["precio"]
+        pct = (ds.field("Precio") / ds.field("precio_anterior") - 1) * 100
+        conds += [pct >= variacion_min if variacion_min is not None else None,
+                  pct <= variacion_max if variacion_max is not None else None]
+    for cond in conds:
+        if cond is not None:
+            filtro = cond if filtro is None else filtro & cond
+
+    leer = None
+    if columnas is not None:
+        leer = list(dict.fromkeys([*(c for c in columnas if c not in ("variacion", "variacion_pct")),
+                                   "fecha", "evento", "id_inmueble", "precio_anterior", "Precio"]))
+    ev = EV.leer(desde, hasta, tipos=eventos, columnas=leer, filtro=filtro)
+    ev["variacion"] = ev["Precio"] - ev["precio_anterior"]
+    ev["variacion_pct"] = (ev["Precio"] / ev["precio_anterior"] - 1) * 100
+    return ev[list(columnas)] if columnas is not None else ev
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
+    parser.add_argument("--desde", default=None, help="Fecha inicial (AAAA-MM-DD, incluida)")
+    parser.add_argument("--hasta", default=None, help="Fecha final (AAAA-MM-DD, incluida)")
+    parser.add_argument("--ultimos-dias", type=int, default=None,
+                        help="Atajo de --desde: los últimos N días (7 = esta semana)")
     parser.add_argument("--save", action="store_true", help="Guardar CSVs en data/processed/")
+    consulta = parser.add_argument_group(
+        "consulta", "Cualquiera de estas opciones devuelve una sola tabla filtrada")
+    consulta.add_argument("--evento", nargs="+", choices=EV.TIPOS, default=None)
+    consulta.add_argument("--ciudad", default=None)
+    consulta.add_argument("--barrio", default=None)
+    consulta.add_argument("--tipo", default=None, help="Tipo_propiedad (Apartamento, Casa…)")
+    consulta.add_argument("--caida-min", type=float, default=None,
+                          help="Solo bajadas de precio de al menos este %% (5 = -5 %% o más)")
+    consulta.add_argument("--subida-min", type=float, default=None,
+                          help="Solo subidas de precio de al menos este %%")
+    consulta.add_argument("--limite", type=int, default=20,
+                          help="Filas a imprimir (0 = todas)")
+    consulta.add_argument("--salida", default=None, help="Guardar el resultado en este CSV")
     args = parser.parse_args()
-
-    hist = cargar_historia()
-    n_fechas = hist["fecha_recoleccion"].nunique(dropna=True)
-    if n_fechas < 2:
-        print(
-            f"⚠️  Solo hay {n_fechas} fecha(s) de recolección en la historia. "
-            "Necesitas al menos 2 corridas en días distintos para detectar cambios."
-        )
-
-    precios = cambios_de_precio(hist)
-    nuevas, eliminadas = nuevas_y_eliminadas(hist)
+    if args.ultimos_dias:
+        args.desde = (date.today() - timedelta(days=args.ultimos_dias - 1)).isoformat()
+
+    if not EV.EVENTOS_DIR.exists():
+        print(f"⚠️  Aún no hay bitácora en {EV.EVENTOS_DIR}. Se llena con cada "
+              "`python -m src.ingest_master` (a partir de la segunda corrida).")
+
+    if any(v is not None for v in (args.evento, args.ciudad, args.barrio, args.tipo,
+                                   args.caida_min, args.subida_min, args.salida)):
+        res = consultar(args.desde, args.hasta, args.evento, args.ciudad, args.barrio,
+                        args.tipo,
+                        variacion_min=args.subida_min,
+                        variacion_max=-args.caida_min if args.caida_min is not None else None,
+                        columnas=["fecha", "evento", "id_inmueble", "Título", "Ciudad",
+                                  "Barrio", "Tipo_propiedad", "precio_anterior", "Precio",
+                                  "variacion_pct"])
+        print(f"\n🔎 {len(res):,} eventos")
+        if len(res):
+            print((res if args.limite == 0 else res.head(args.limite)).to_string(index=False))
+        if args.salida:
+            res.to_csv(args.salida, index=False)
+            print(f"\n💾 Guardado en {args.salida}")
+        return
+
+    precios, nuevas, eliminadas = desde_eventos(args.desde, args.hasta)
 
     print(f"\n📈 Cambios de precio: {len(precios)}")
     print(precios.head(10).to_string(index=False))
     print(f"\n🆕 Nuevas: {len(nuevas)}")
     print(nuevas.head(10).to_string(index=False))
-    print(f"\n❌ Eliminadas (no vistas en la última corrida): {len(eliminadas)}")
+    print(f"\n❌ No vistas (dejaron de aparecer en su departamento): {len(eliminadas)}")
     print(eliminadas.head(10).to_string(index=False))
 
     if args.save:
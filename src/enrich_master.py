@@ -6,24 +6,44 @@ Re-consulta la página de detalle de cada inmueble (rápido, en paralelo con
 Estado, Área construida/privada. Idempotente y **reanudable**: marca cada id como
 enriquecido y guarda checkpoints, así puedes cortar y retomar sin perder trabajo.
 
+Las descargas se programan en flujo: nunca hay más de `--en-vuelo` pedidos
+pendientes en el pool (la memoria no crece con el tamaño del master) y los ids
+salen de una cola perezosa ordenada por prioridad:
+
+  - recientes  : primero los publicados más recientemente (first_seen).
+  - sin-estrato: primero las ciudades con mayor proporción de inmuebles sin
+                 Estrato (y dentro de cada una, los más recientes).
+  - master     : el orden del master (el comportamiento anterior).
+
+Ctrl-C deja de programar, espera lo que ya está en vuelo y guarda un último
+checkpoint; un segundo Ctrl-C descarta lo que está en vuelo (se reintentará en
+la próxima corrida) y guarda igual.
+
 Uso:
     python -m src.enrich_master                 # todo el master
     python -m src.enrich_master --limit 3000    # prueba (p. ej. una tanda)
     python -m src.enrich_master --workers 12    # más/menos hilos
+    python -m src.enrich_master --prioridad sin-estrato --en-vuelo 48
 """
 from __future__ import annotations
 import argparse
 import concurrent.futures as cf
+import signal
+import threading
 import time
 
+import numpy as np
+
 import pandas as pd
 from bs4 import BeautifulSoup
 
 from src import master as M
+from src.preprocessing import normalizar_ubicacion
 from src.scraper import make_session, _parse_detail
 
 CAMPOS = ["Estrato", "Antiguedad", "Parqueaderos", "Piso", "Estado",
           "Area_construida", "Area_privada"]
+PRIORIDADES = ["recientes", "sin-estrato", "master"]
 
 
 def _fetch(session, url: str):
@@ -38,15 +58,36 @@ def _fetch(session, url: str):
 
 
 def _guardar(df: pd.DataFrame) -> None:
-    """Persiste el master (coerción de columnas object para que parquet no falle)."""
-    out = df.reset_index()
-    for c in out.select_dtypes(include="object").columns:
-        na = out[c].notna()
-        out.loc[na, c] = out.loc[na, c].astype(str)
-    out.to_parquet(M.MASTER_PATH, index=False)
+    """Persiste el master (los tipos los fija el esquema declarado de `src.schema`)."""
+    M.guardar(df.reset_index())
 
 
-def run(workers: int = 12, limit: int | None = None, guardar_cada: int = 2000) -> None:
+def _pendientes(m: pd.DataFrame, prioridad: str = "recientes") -> np.ndarray:
+    """Posiciones (en `m`) de los inmuebles por enriquecer, en orden de prioridad."""
+    # "1" = ya intentado (NA-safe: los NA/"" se consideran pendientes)
+    pend = (~m["_enriquecido"].astype(str).isin(["1", "True"])
+            & m["URL detalle"].notna()).to_numpy(dtype=bool)
+    pos = np.flatnonzero(pend)
+    if prioridad == "master" or not len(pos):
+        return pos
+    visto = (m["first_seen"] if "first_seen" in m.columns
+             else pd.Series(pd.NA, index=m.index))
+    claves = pd.DataFrame({"reciente": visto.astype("string").to_numpy()[pos]})
+    if prioridad == "sin-estrato":
+        # Proporción sin Estrato de la ciudad de cada inmueble (todo el master)
+        ciudad = normalizar_ubicacion(m["Ubicación listado"])["Ciudad"].fillna("")
+        falta = m["Estrato"].isna() | m["Estrato"].astype("string").str.strip().eq("")
+        proporcion = falta.groupby(ciudad.to_numpy()).mean()
+        claves.insert(0, "falta", ciudad.map(proporcion).to_numpy(dtype="float64")[pos])
+    orden = claves.sort_values(list(claves.columns), ascending=False,
+                               na_position="last", kind="stable").index
+    return pos[orden.to_numpy()]
+
+
+def run(workers: int = 12, limit: int | None = None, guardar_cada: int = 2000,
+        en_vuelo: int | None = None, prioridad: str = "recientes") -> None:
+    if prioridad not in PRIORIDADES:
+        raise ValueError(f"prioridad debe ser una de {PRIORIDADES}")
     m = M.cargar()
     if m.empty:
         raise SystemExit("El master está vacío. Corre el scraper primero.")
@@ -55,40 +96,77 @@ def run(workers: int = 12, limit: int | None = None, guardar_cada: int = 2000) -
             m[c] = pd.NA
     m = m.set_index("id_inmueble")
 
-    # "1" = ya intentado (NA-safe: los NA/"" se consideran pendientes)
-    pend = m[~m["_enriquecido"].astype(str).isin(["1", "True"])]
-    pend = pend[pend["URL detalle"].notna()]
+    orden = _pendientes(m, prioridad)
     if limit:
-        pend = pend.head(limit)
-    total = len(pend)
-    print(f"🔧 A enriquecer: {total:,} de {len(m):,} inmuebles (workers={workers})")
+        orden = orden[:limit]
+    total = len(orden)
+    en_vuelo = max(en_vuelo or 4 * workers, workers)
+    print(f"🔧 A enriquecer: {total:,} de {len(m):,} inmuebles "
+          f"(workers={workers}, en vuelo ≤ {en_vuelo}, prioridad={prioridad})")
     if total == 0:
         return
 
+    # Ctrl-C: el primero deja de programar y drena; el segundo descarta lo en vuelo
+    parar, abortar = threading.Event(), threading.Event()
+
+    def _sigint(signum, frame):
+        if parar.is_set():
+            abortar.set()
+            print("\n⏹️  Descartando lo que está en vuelo; guardando checkpoint…")
+        else:
+            parar.set()
+            print("\n⏸️  Ctrl-C: termino lo que está en vuelo y guardo "
+                  "(otro Ctrl-C para cortar ya)")
+
+    anterior = None
+    if threading.current_thread() is threading.main_thread():
+        anterior = signal.signal(signal.SIGINT, _sigint)
+
+    ids = m.index
+    urls = m["URL detalle"].to_numpy()
+    cola = iter(orden)
     session = make_session(workers)
     t0 = time.time()
     hechos = con_datos = 0
-    with cf.ThreadPoolExecutor(max_workers=workers) as ex:
-        fut = {ex.submit(_fetch, session, u): idx
-               for idx, u in pend["URL detalle"].items()}
-        for f in cf.as_completed(fut):
-            idx = fut[f]
-            res = f.result()
-            if res is not None:                                # página bajada
-                m.at[idx, "_enriquecido"] = "1"
-                if res:
-                    con_datos += 1
-                    for k, v in res.items():
-                        m.at[idx, k] = v
-            hechos += 1
-            if hechos % guardar_cada == 0:
-                _guardar(m)
-                rate = hechos / (time.time() - t0)
-                eta = (total - hechos) / rate / 60
-                print(f"  {hechos:,}/{total:,}  ({con_datos:,} con datos)  "
-                      f"{rate:.0f}/s  ETA ~{eta:.0f} min")
+    ex = cf.ThreadPoolExecutor(max_workers=workers)
+    try:
+        fut: dict[cf.Future, object] = {}
+        while True:
+            # Rellena hasta `en_vuelo` con los siguientes ids de la cola
+            while not parar.is_set() and len(fut) < en_vuelo:
+                p = next(cola, None)
+                if p is None:
+                    break
+                fut[ex.submit(_fetch, session, urls[p])] = ids[p]
+            if not fut or abortar.is_set():
+                break
+            listos, _ = cf.wait(fut, timeout=1, return_when=cf.FIRST_COMPLETED)
+            for f in listos:
+                idx = fut.pop(f)
+                res = f.result()
+                if res is not None:                                # página bajada
+                    m.at[idx, "_enriquecido"] = "1"
+                    if res:
+                        con_datos += 1
+                        for k, v in res.items():
+                            m.at[idx, k] = v
+                hechos += 1
+                if hechos % guardar_cada == 0:
+                    _guardar(m)
+                    rate = hechos / (time.time() - t0)
+                    eta = (total - hechos) / rate / 60
+                    print(f"  {hechos:,}/{total:,}  ({con_datos:,} con datos)  "
+                          f"{rate:.0f}/s  ETA ~{eta:.0f} min")
+    finally:
+        ex.shutdown(wait=not abortar.is_set(), cancel_futures=True)
+        if anterior is not None:
+            signal.signal(signal.SIGINT, anterior)
 
     _guardar(m)
+    if parar.is_set():
+        print(f"⏸️  Interrumpido: {hechos:,} de {total:,} procesados, {con_datos:,} con "
+              f"ficha técnica → {M.MASTER_PATH} (vuelve a correrlo para seguir)")
+        return
     print(f"✅ Listo: {hechos:,} procesados, {con_datos:,} con ficha técnica "
           f"en {(time.time()-t0)/60:.1f} min → {M.MASTER_PATH}")
 
@@ -98,8 +176,13 @@ def main() -> None:
     p.add_argument("--workers", type=int, default=12)
     p.add_argument("--limit", type=int, default=None)
     p.add_argument("--guardar-cada", type=int, default=2000)
+    p.add_argument("--en-vuelo", type=int, default=None,
+                   help="Máximo de pedidos programados a la vez (por defecto 4 × workers)")
+    p.add_argument("--prioridad", choices=PRIORIDADES, default="recientes",
+                   help="Orden de la cola de pendientes")
     a = p.parse_args()
-    run(workers=a.workers, limit=a.limit, guardar_cada=a.guardar_cada)
+    run(workers=a.workers, limit=a.limit, guardar_cada=a.guardar_cada,
+        en_vuelo=a.en_vuelo, prioridad=a.prioridad)
 
 
 if __name__ == "__main__":
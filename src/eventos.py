@@ -0,0 +1,168 @@
+"""
+Bitácora de eventos del mercado, detectados en cada `master.upsert`.
+
+En vez de recalcular primeras/últimas apariciones sobre toda la historia, cada
+corrida compara lo que llegó contra el master previo y anota solo lo que cambió:
+
+  - nuevo    : id que el master no conocía.
+  - precio   : id conocido cuyo precio (numérico) cambió.
+  - no_visto : id que SÍ se vio la última vez que se scrapeó su alcance y esta
+               vez no, en un alcance que esta corrida scrapeó.
+
+El alcance es el departamento de 'Ubicación listado' (la unidad de la matriz del
+CI). Un departamento cuyo job falló no aporta filas → no se scrapeó → sus
+inmuebles no se marcan como no vistos (antes, la fecha global más reciente los
+daba a todos por eliminados). `no_visto` se anota una sola vez (en la corrida en
+que el inmueble deja de aparecer), no en cada corrida siguiente; con
+`--incremental` el scraper corta al llegar a lo ya conocido, así que es una
+señal de "ya no aparece entre lo reciente", no una baja confirmada.
+
+La bitácora es un dataset Parquet particionado por fecha de corrida
+(data/master/eventos/fecha=AAAA-MM-DD/*.parquet): cada upsert añade un archivo
+y las consultas por rango de fechas solo abren las particiones del rango; el
+resto de condiciones (`filtro`) se empujan al lector de pyarrow, que descarta
+row groups por estadísticas antes de pasar nada a pandas. Cada evento lleva
+Ciudad, Barrio y Tipo_propiedad ya extraídos para poder filtrar por ellos (los
+archivos anteriores a esas columnas las leen como nulas).
+
+    from src import eventos as EV
+    EV.leer(desde="2026-08-01", tipos=["precio"])
+    EV.leer(filtro=ds.field("Ciudad") == "Medellín")   # ver src/changes.py:consultar
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.config import BASE_DIR
+from src.preprocessing import (extraer_barrio, extraer_precio, extraer_tipo_propiedad,
+                                normalizar_ubicacion)
+
+EVENTOS_DIR = BASE_DIR / "data" / "master" / "eventos"
+TIPOS = ["nuevo", "precio", "no_visto"]
+
+ESQUEMA = pa.schema([
+    ("evento", pa.string()),
+    ("id_inmueble", pa.string()),
+    ("alcance", pa.string()),
+    ("Título", pa.string()),
+    ("Ciudad", pa.string()),
+    ("Barrio", pa.string()),
+    ("Tipo_propiedad", pa.string()),
+    ("precio_anterior", pa.float64()),
+    ("Precio", pa.float64()),
+])
+PARTICION = ds.partitioning(pa.schema([("fecha", pa.string())]), flavor="hive")
+
+
+def _por_unicos(s: pd.Series, fn) -> pd.Series:
+    """`fn` (vectorizada) sobre los valores distintos de `s`, mapeada a las filas."""
+    codigos, unicos = pd.factorize(s)
+    res = fn(pd.Series(unicos, dtype="string")).to_numpy(dtype=object)
+    return pd.Series(np.where(codigos < 0, None, res[codigos]) if len(res)
+                     else [None] * len(s), index=s.index)
+
+
+def alcance(ubicacion: pd.Series) -> pd.Series:
+    """Alcance de scraping de cada fila: lo que va tras la última coma de
+    'Ubicación listado' ("Casa enCali, Valle del cauca" → "valle del cauca")."""
+    return _por_unicos(ubicacion, lambda u: u.str.rsplit(",", n=1).str[-1]
+                       .str.strip().str.lower()).astype("string")
+
+
+def _precio(s: pd.Series) -> np.ndarray:
+    return _por_unicos(s, extraer_precio).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def detectar(master: pd.DataFrame, nuevos: pd.DataFrame, run_date: str) -> pd.DataFrame:
+    """Eventos de la corrida `run_date`: `nuevos` (lo scrapeado, ya tipado y sin
+    ids repetidos) contra el `master` previo al upsert."""
+    vacio = pd.DataFrame({c.name: pd.Series(dtype=c.type.to_pandas_dtype())
+                          for c in ESQUEMA})
+    if master.empty or "Ubicación listado" not in nuevos.columns:
+        return vacio   # siembra: el primer upsert no es "nuevo" respecto de nada
+    ids_m = master["id_inmueble"].astype(str)
+    ids_n = nuevos["id_inmueble"].astype(str)
+    alc_m = alcance(master["Ubicación listado"])
+    alc_n = alcance(nuevos["Ubicación listado"])
+
+    previo = pd.DataFrame({"id_inmueble": ids_m.to_numpy(),
+                           "precio_anterior": _precio(master["Precio listado"])})
+    llegan = pd.DataFrame({"id_inmueble": ids_n.to_numpy(), "alcance": alc_n.to_numpy(),
+                           "Título": nuevos["Título"].to_numpy(),
+                           "ubicacion": nuevos["Ubicación listado"].to_numpy(),
+                           "descripcion": (nuevos["Descripción breve"].to_numpy()
+                                           if "Descripción breve" in nuevos.columns else None),
+                           "Precio": _precio(nuevos["Precio listado"])})
+    cruce = llegan.merge(previo, on="id_inmueble", how="left", indicator=True)
+    es_nuevo = cruce["_merge"].eq("left_only")
+    cambio = (~es_nuevo & cruce["Precio"].notna() & cruce["precio_anterior"].notna()
+              & cruce["Precio"].ne(cruce["precio_anterior"]))
+
+    # No vistos: solo en alcances scrapeados hoy, y solo los que aparecieron en
+    # la corrida anterior de su alcance (su max(last_seen) en el master)
+    scrapeados = set(alc_n.dropna())
+    visto = master["last_seen"].astype("string").fillna("")
+    ultima_corrida = visto.groupby(alc_m.to_numpy()).max()
+    faltan = (alc_m.isin(scrapeados).fillna(False).to_numpy(dtype=bool)
+              & (visto.to_numpy() == alc_m.map(ultima_corrida).to_numpy())
+              & (visto < run_date).to_numpy(dtype=bool)
+              & (pd.Index(ids_n).get_indexer(ids_m) < 0))
+    perdidos = master[faltan]
+    no_vistos = pd.DataFrame({
+        "evento": "no_visto", "id_inmueble": ids_m[faltan].to_numpy(),
+        "alcance": alc_m[faltan].to_numpy(), "Título": perdidos["Título"].to_numpy(),
+        "ubicacion": perdidos["Ubicación listado"].to_numpy(),
+        "descripcion": (perdidos["Descripción breve"].to_numpy()
+                        if "Descripción breve" in perdidos.columns else None),
+        "precio_anterior": _precio(perdidos["Precio listado"])})
+
+    out = pd.concat([cruce[es_nuevo].assign(evento="nuevo", precio_anterior=float("nan")),
+                     cruce[cambio].assign(evento="precio"), no_vistos],
+                    ignore_index=True)
+    if out.empty:
+        return vacio
+    out["Ciudad"] = normalizar_ubicacion(out["ubicacion"])["Ciudad"]
+    out["Barrio"] = _por_unicos(out["descripcion"], extraer_barrio)
+    out["Tipo_propiedad"] = _por_unicos(out["Título"], extraer_tipo_propiedad)
+    return out[ESQUEMA.names].astype({"id_inmueble": str})
+
+
+def registrar(eventos: pd.DataFrame, run_date: str, dir_: Path | None = None) -> None:
+    """Añade los `eventos` de la corrida a la bitácora (un archivo nuevo en la
+    partición de `run_date`; nunca reescribe lo anterior)."""
+    if eventos.empty:
+        return
+    destino = Path(dir_ or EVENTOS_DIR) / f"fecha={run_date}"
+    destino.mkdir(parents=True, exist_ok=True)
+    n = len(list(destino.glob("*.parquet")))
+    tabla = pa.Table.from_pandas(eventos, schema=ESQUEMA, preserve_index=False)
+    pq.write_table(tabla, destino / f"parte-{n:04d}.parquet", compression="zstd")
+
+
+def leer(desde: str | None = None, hasta: str | None = None,
+         tipos: Sequence[str] | None = None, columnas: Iterable[str] | None = None,
+         dir_: Path | None = None, filtro: ds.Expression | None = None) -> pd.DataFrame:
+    """Eventos con fecha en [desde, hasta] (ambas opcionales, AAAA-MM-DD), de
+    los `tipos` pedidos y que cumplan `filtro` (expresión de pyarrow.dataset
+    sobre las columnas de ESQUEMA). El filtro de fecha poda particiones enteras;
+    solo se leen las `columnas` pedidas."""
+    raiz = Path(dir_ or EVENTOS_DIR)
+    nombres = ["fecha", *ESQUEMA.names] if columnas is None else list(columnas)
+    if not raiz.exists():
+        return pd.DataFrame(columns=nombres)
+    dataset = ds.dataset(raiz, format="parquet", schema=ESQUEMA.append(
+        pa.field("fecha", pa.string())), partitioning=PARTICION)
+    for cond in [ds.field("fecha") >= desde if desde else None,
+                 ds.field("fecha") <= hasta if hasta else None,
+                 ds.field("evento").isin(list(tipos)) if tipos else None]:
+        if cond is not None:
+            filtro = cond if filtro is None else filtro & cond
+    df = dataset.to_table(columns=nombres, filter=filtro).to_pandas()
+    orden = [c for c in ("fecha", "evento", "id_inmueble") if c in df.columns]
+    return df.sort_values(orden, kind="stable", ignore_index=True) if orden else df
@@ -0,0 +1,223 @@
+"""
+Índice diario del mercado, materializado: una fila por fecha × Ciudad × Barrio ×
+Tipo_propiedad con nº de avisos vigentes, p25/mediana/p75 del precio por m²,
+inmuebles nuevos y no vistos (data/master/indice_mercado.parquet).
+
+Vigentes a la fecha `d` de un alcance (departamento, ver `src.eventos`): los
+inmuebles del alcance vistos en los `VENTANA_DIAS` días hasta `d` (con
+`--incremental` el scraper no vuelve a ver todo cada día, así que "visto hoy"
+sería solo lo reciente). Los precios salen de las filas limpias de
+`build_app_dataset` y los nuevos/no vistos de la bitácora de eventos.
+
+Incremental: tras cada upsert (y `build_app_dataset`) solo se calculan las
+particiones que cambiaron, es decir los alcances scrapeados desde la última
+actualización, para su fecha de corrida; el resto del índice no se toca. El
+master guarda solo el estado actual, así que el índice de fechas pasadas no se
+puede reconstruir: `--full-rebuild` recalcula solo la última fecha de cada alcance.
+
+Cada fila lleva además un bosquejo de cuantiles fusionable (histograma en escala
+logarítmica con error relativo `ALFA`, como DDSketch): sumar los conteos de
+varias filas da el bosquejo de la unión, así `resumir` agrega por ciudad, por
+semana, etc. sin volver a las filas crudas.
+
+Uso:
+    python -m src.indice_mercado                 # actualiza lo pendiente
+    python -m src.indice_mercado --ciudad Cali   # + serie de la ciudad
+"""
+from __future__ import annotations
+import argparse
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src import eventos as EV
+from src import master as M
+from src.storage import escribir_parquet, leer_parquet
+
+INDICE_PATH = M.MASTER_PATH.parent / "indice_mercado.parquet"
+VENTANA_DIAS = 30
+ALFA = 0.01                                   # error relativo de los cuantiles del bosquejo
+GAMMA = (1 + ALFA) / (1 - ALFA)
+CUANTILES = {"p25": 0.25, "mediana": 0.5, "p75": 0.75}
+
+GRUPO = ["Ciudad", "Barrio", "Tipo_propiedad"]
+LLAVE = ["fecha", *GRUPO]
+# Mismos umbrales que el dashboard (avisos sin área/precio creíbles no cuentan)
+AREA_MIN, PRECIO_MIN = 10, 1e7
+
+
+# ───────────────────────────── bosquejo de cuantiles ─────────────────────────────
+
+def cubetas(valores: np.ndarray) -> np.ndarray:
+    """Cubeta logarítmica de cada valor (> 0): ceil(log_γ(x))."""
+    return np.ceil(np.log(valores) / np.log(GAMMA)).astype(np.int32)
+
+
+def _valor(cubeta: np.ndarray) -> np.ndarray:
+    """Representante de la cubeta: a menos de ALFA (relativo) de cualquier valor suyo."""
+    return 2 * GAMMA ** cubeta.astype(float) / (GAMMA + 1)
+
+
+def cuantiles_bosquejo(cub: np.ndarray, n: np.ndarray, qs: Sequence[float]) -> list:
+    """Cuantiles `qs` de un bosquejo (cubetas ordenadas + conteos)."""
+    acum = np.cumsum(n)
+    if not len(acum):
+        return [np.nan] * len(qs)
+    rangos = np.asarray(qs) * (acum[-1] - 1)
+    return list(_valor(cub[np.searchsorted(acum, rangos, side="right")]))
+
+
+def _bosquejos(grupos: pd.DataFrame, valores: pd.Series) -> pd.DataFrame:
+    """Bosquejo (listas de cubetas y conteos, ordenadas) por combinación de `grupos`."""
+    llaves = list(grupos.columns)
+    largo = grupos.assign(_cub=cubetas(valores.to_numpy(dtype=float)))
+    conteo = (largo.groupby([*llaves, "_cub"], observed=True, sort=True)
+              .size().rename("_n").reset_index())
+    return (conteo.groupby(llaves, observed=True, sort=False)
+            .agg(bosquejo_cubetas=("_cub", list), bosquejo_n=("_n", list))
+            .reset_index())
+
+
+# ─────────────────────────────── construcción ───────────────────────────────
+
+def _filas(fecha: str, alcance: str, vigentes: pd.DataFrame, todos: pd.DataFrame,
+           ev: pd.DataFrame) -> pd.DataFrame:
+    """Filas del índice de un alcance en `fecha`: precios de los `vigentes` y
+    eventos del día ubicados con la fila limpia del inmueble (en `todos`: un
+    no visto puede haber salido ya de la ventana)."""
+    pm2 = vigentes["Precio"] / vigentes["Area_m2"]
+    g = vigentes.groupby(GRUPO, observed=True, sort=True)["Precio"]
+    out = g.size().rename("avisos").to_frame()
+    por = pm2.groupby([vigentes[c] for c in GRUPO], observed=True, sort=True)
+    for nombre, q in CUANTILES.items():
+        out[f"precio_m2_{nombre}"] = por.quantile(q)
+    out = out.reset_index().merge(_bosquejos(vigentes[GRUPO], pm2), on=GRUPO, how="left")
+    # Nuevos / no vistos del día, por la zona y tipo de su fila limpia
+    for tipo, col in [("nuevo", "nuevos"), ("no_visto", "no_vistos")]:
+        ids = ev.loc[ev["evento"] == tipo, "id_inmueble"]
+        cnt = (todos[todos["id_inmueble"].isin(ids)]
+               .groupby(GRUPO, observed=True).size().rename(col).reset_index())
+        out = out.merge(cnt, on=GRUPO, how="outer")
+    out[["avisos", "nuevos", "no_vistos"]] = out[["avisos", "nuevos", "no_vistos"]] \
+        .fillna(0).astype("int64")
+    # Zonas sin vigentes (solo eventos): bosquejo vacío
+    for c in ["bosquejo_cubetas", "bosquejo_n"]:
+        out[c] = out[c].map(lambda v: v if isinstance(v, list) else [])
+    return out.assign(fecha=fecha, alcance=alcance)
+
+
+def _vigentes_limpios(master: pd.DataFrame, limpias: pd.DataFrame) -> pd.DataFrame:
+    """Master (id, last_seen, alcance) + columnas limpias; solo filas con precio/m² creíble."""
+    df = master.merge(limpias, on="id_inmueble", how="inner")
+    return df[(df["Area_m2"] > AREA_MIN) & (df["Precio"] > PRECIO_MIN)]
+
+
+def actualizar(full_rebuild: bool = False, limpias: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Añade al índice las particiones (fecha, alcance) pendientes y lo persiste.
+
+    `limpias` son las filas limpias del master (id_inmueble, Precio, Area_m2,
+    Ciudad, Barrio, Tipo_propiedad); por defecto se leen del store de
+    `build_app_dataset`.
+    """
+    from src.build_app_dataset import CLEAN_ROWS_PATH
+    master = M.cargar(["id_inmueble", "last_seen", "Ubicación listado"])
+    if master.empty:
+        raise FileNotFoundError(f"No hay master en {M.MASTER_PATH}. Corre `python -m src.ingest_master`.")
+    if limpias is None:
+        if not CLEAN_ROWS_PATH.exists():
+            raise FileNotFoundError(f"No existe {CLEAN_ROWS_PATH}. Corre `python -m src.build_app_dataset`.")
+        limpias = leer_parquet(CLEAN_ROWS_PATH, ["id_inmueble", "Precio", "Area_m2", *GRUPO])
+    master = pd.DataFrame({"id_inmueble": master["id_inmueble"].astype(str).to_numpy(),
+                           "last_seen": master["last_seen"].astype("string").to_numpy(),
+                           "alcance": EV.alcance(master["Ubicación listado"]).to_numpy()})
+    limpias = limpias.assign(id_inmueble=limpias["id_inmueble"].astype(str))
+
+    # Particiones cambiadas: la última corrida de cada alcance que el índice aún no tiene
+    corridas = master.dropna(subset=["last_seen", "alcance"]).groupby("alcance")["last_seen"].max()
+    previo = leer_parquet(INDICE_PATH) if INDICE_PATH.exists() else None
+    if previo is not None and not full_rebuild:
+        hechas = set(zip(previo["fecha"], previo["alcance"]))
+        corridas = corridas[[(f, a) not in hechas for a, f in corridas.items()]]
+    if corridas.empty:
+        print(f"✅ Índice de mercado al día ({INDICE_PATH})")
+        return previo
+
+    df = _vigentes_limpios(master[master["alcance"].isin(corridas.index)], limpias)
+    ev = EV.leer(corridas.min(), corridas.max(), columnas=["fecha", "evento", "id_inmueble"])
+    nuevas = []
+    for alcance, fecha in corridas.items():
+        desde = (pd.Timestamp(fecha) - pd.Timedelta(days=VENTANA_DIAS - 1)).strftime("%Y-%m-%d")
+        todos = df[df["alcance"] == alcance]
+        sub = todos[todos["last_seen"].between(desde, fecha)]
+        if len(sub):
+            nuevas.append(_filas(fecha, alcance, sub, todos, ev[ev["fecha"] == fecha]))
+    nuevas = pd.concat(nuevas, ignore_index=True) if nuevas else None
+
+    if previo is not None:
+        # Lo recalculado reemplaza a lo anterior; las demás particiones se conservan
+        rehechas = set(zip(corridas.to_numpy(), corridas.index))
+        previo = previo[[k not in rehechas for k in zip(previo["fecha"], previo["alcance"])]]
+    partes = [p for p in (previo, nuevas) if p is not None and len(p)]
+    indice = pd.concat(partes, ignore_index=True).sort_values(LLAVE, ignore_index=True)
+    escribir_parquet(indice, INDICE_PATH, orden=["fecha", "Ciudad"])
+    print(f"📊 Índice de mercado: {len(corridas)} partición(es) (fecha × departamento), "
+          f"{0 if nuevas is None else len(nuevas):,} filas nuevas → {INDICE_PATH}")
+    return indice
+
+
+# ─────────────────────────────── consultas ───────────────────────────────
+
+def cargar(ciudad: str | None = None, desde: str | None = None,
+           hasta: str | None = None) -> pd.DataFrame:
+    """Filas del índice (filtros empujados al lector del parquet)."""
+    filtros = [f for f in [("Ciudad", "==", ciudad) if ciudad else None,
+                           ("fecha", ">=", desde) if desde else None,
+                           ("fecha", "<=", hasta) if hasta else None] if f]
+    return leer_parquet(INDICE_PATH, filtros=filtros or None)
+
+
+def resumir(indice: pd.DataFrame, por: Sequence[str] = ("fecha",)) -> pd.DataFrame:
+    """Agrega filas del índice por `por` fusionando sus bosquejos: avisos,
+    nuevos, no vistos y p25/mediana/p75 del precio por m² (error relativo ≤ ALFA)."""
+    por = list(por)
+    if indice.empty:
+        return pd.DataFrame(columns=[*por, "avisos", "nuevos", "no_vistos",
+                                     *[f"precio_m2_{k}" for k in CUANTILES]])
+    tabla = pa.Table.from_pandas(indice[[*por, "bosquejo_cubetas", "bosquejo_n"]],
+                                 preserve_index=False)
+    fila = pc.list_parent_indices(tabla["bosquejo_cubetas"]).to_numpy()
+    largo = indice[por].iloc[fila].reset_index(drop=True).assign(
+        _cub=pc.list_flatten(tabla["bosquejo_cubetas"]).to_numpy(),
+        _n=pc.list_flatten(tabla["bosquejo_n"]).to_numpy())
+    conteo = largo.groupby([*por, "_cub"], observed=True, sort=True)["_n"].sum().reset_index()
+
+    res = indice.groupby(por, observed=True, sort=True)[["avisos", "nuevos", "no_vistos"]] \
+        .sum().reset_index()
+    qs = {}
+    for llave, g in conteo.groupby(por, observed=True, sort=False):
+        qs[llave if isinstance(llave, tuple) else (llave,)] = cuantiles_bosquejo(
+            g["_cub"].to_numpy(), g["_n"].to_numpy(), list(CUANTILES.values()))
+    valores = np.array([qs.get(tuple(r), [np.nan] * len(CUANTILES))
+                        for r in res[por].itertuples(index=False, name=None)])
+    for i, nombre in enumerate(CUANTILES):
+        res[f"precio_m2_{nombre}"] = valores[:, i] if len(valores) else np.nan
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Índice diario del mercado (incremental)")
+    p.add_argument("--full-rebuild", action="store_true",
+                   help="Recalcula la última fecha de cada departamento aunque ya esté")
+    p.add_argument("--ciudad", default=None, help="Imprime la serie de esta ciudad")
+    a = p.parse_args()
+    actualizar(a.full_rebuild)
+    if a.ciudad:
+        serie = resumir(cargar(a.ciudad), por=["fecha"])
+        print(serie.to_string(index=False, float_format=lambda x: f"{x:,.0f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,168 @@
 # src/ingest.py
+import argparse
+import tempfile
 import pandas as pd, os, joblib
+import pyarrow.parquet as pq
 from pathlib import Path
 from src.config import DATA_RAW, DATA_PROC          
-from src.preprocessing import preprocesar_datos_finca_raiz   # lo movemos a preprocessing.py
+from src import manifest as MF
+from src.preprocessing import preprocesar_datos_finca_raiz, columnas_crudas
+from src.raw_io import leer_tablas, listar_raw, unir
+from src.schema import CLEAN_SCHEMA, a_tabla_limpia
+from src.storage import EscritorParquet, escribir_parquet, ordenar
 
-def run():
-    """Consolida todos los snapshots de data/raw, limpia y genera dos Parquets:
+# Layout físico: agrupado por depto/ciudad → lectores que filtran una ciudad
+# solo tocan sus row groups (ver src/storage.py)
+ORDEN_HIST = ["Departamento", "Ciudad", "id_inmueble", "fecha_recoleccion"]
+ORDEN_CLEAN = ["Departamento", "Ciudad", "id_inmueble"]
+
+HIST_PATH = DATA_PROC / "housing_history.parquet"
+CLEAN_PATH = DATA_PROC / "housing_clean.parquet"
+MANIFEST_PATH = DATA_PROC / "raw_manifest.parquet"
+
+# Modo streaming: filas por tanda de limpieza
+FILAS_CHUNK = 50_000
+# Proyección al leer: solo las columnas crudas de las que sale la tabla limpia
+# (ni 'URL imagen' ni la ficha que la limpieza descarta se cargan)
+COLUMNAS = columnas_crudas()
+
+
+def _llave(df):
+    """Llave de la historia: (id_inmueble, fecha_recoleccion) como un solo string."""
+    return df["id_inmueble"].astype(str) + "|" + df["fecha_recoleccion"].astype(str)
+
+
+def _fecha_orden(fecha):
+    """Llave de orden de una fecha_recoleccion (nula = la más reciente, como
+    `sort_values` con los nulos al final)."""
+    return (True, "") if pd.isna(fecha) else (False, str(fecha))
+
+
+def _run_streaming(pend, full_rebuild, filas_chunk, n_jobs=1):
+    """Igual que el modo en memoria pero por tandas de `filas_chunk` filas.
+
+    1. Cada snapshot se lee solo, se parte en tandas y cada tanda se limpia por
+       separado (la limpieza es por fila salvo el dedup). El dedup
+       (id_inmueble, fecha_recoleccion) entre tandas usa un set de llaves: gana la
+       primera aparición, como en `drop_duplicates(keep='first')`. Sin la caché
+       persistente de normalización: crecería tanda a tanda y se reescribiría
+       a disco en cada una (cada tanda igual normaliza una vez por valor distinto).
+    2. Las filas limpias (y, si es incremental, la historia previa leída por
+       lotes sin las llaves re-leídas) se vuelcan a un parquet temporal por
+       Departamento.
+    3. Pasada final: cada departamento, en orden, se ordena por ORDEN_HIST y se
+       escribe como row groups de la historia y del estado actual
+       (`EscritorParquet`).
+
+    En memoria solo hay una tanda, un departamento y las llaves/última fecha por
+    inmueble; no la historia completa.
+    """
+    vistas = set()       # llaves (id|fecha) ya escritas
+    ultima = {}          # id_inmueble → llave de orden de su fecha más reciente
+    with tempfile.TemporaryDirectory(dir=DATA_PROC) as tmp:
+        cubetas = {}     # Departamento → EscritorParquet temporal
+
+        def volcar(df):
+            for depto, g in df.groupby("Departamento", dropna=False, sort=False):
+                depto = None if pd.isna(depto) else depto
+                if depto not in cubetas:
+                    cubetas[depto] = EscritorParquet(
+                        Path(tmp) / f"{len(cubetas)}.parquet", CLEAN_SCHEMA)
+                cubetas[depto].escribir(a_tabla_limpia(g))
+            for i, f in zip(df["id_inmueble"], df["fecha_recoleccion"]):
+                k = _fecha_orden(f)
+                if i not in ultima or k > ultima[i]:
+                    ultima[i] = k
+
+        for e in pend:
+            tabla = leer_tablas([e["file"]], COLUMNAS)[0]
+            e["rows"] = tabla.num_rows
+            for ini in range(0, tabla.num_rows, filas_chunk):
+                df = preprocesar_datos_finca_raiz(tabla.slice(ini, filas_chunk).to_pandas(),
+                                                  usar_cache=False, n_jobs=n_jobs)
+                llaves = _llave(df)
+                nueva = ~llaves.map(vistas.__contains__).astype(bool)
+                vistas.update(llaves[nueva])
+                volcar(df[nueva.to_numpy()])
+
+        if not full_rebuild:
+            # Historia previa por lotes; las observaciones re-leídas la reemplazan
+            for lote in pq.ParquetFile(HIST_PATH).iter_batches(batch_size=filas_chunk):
+                previa = lote.to_pandas()
+                volcar(previa[~_llave(previa).map(vistas.__contains__).astype(bool).to_numpy()])
+
+        for w in cubetas.values():
+            w.cerrar()
+
+        # Pasada final (nulos al final, como `ordenar`)
+        hist_tmp, clean_tmp = HIST_PATH.with_suffix(".tmp"), CLEAN_PATH.with_suffix(".tmp")
+        with EscritorParquet(hist_tmp, CLEAN_SCHEMA, orden=ORDEN_HIST) as hist, \
+             EscritorParquet(clean_tmp, CLEAN_SCHEMA, orden=ORDEN_CLEAN) as clean:
+            for depto in sorted(cubetas, key=lambda d: (d is None, d or "")):
+                df = ordenar(pq.read_table(cubetas[depto].path).to_pandas(), ORDEN_HIST)
+                hist.escribir(a_tabla_limpia(df))
+                es_ultima = [ultima[i] == _fecha_orden(f)
+                             for i, f in zip(df["id_inmueble"], df["fecha_recoleccion"])]
+                clean.escribir(a_tabla_limpia(df[es_ultima]))
+        hist_tmp.replace(HIST_PATH)
+        clean_tmp.replace(CLEAN_PATH)
+    return hist.filas, clean.filas
+
+
+def run(full_rebuild: bool = False, streaming: bool = False, filas_chunk: int = FILAS_CHUNK,
+        n_jobs: int = 1):
+    """Consolida los snapshots de data/raw, limpia y genera dos Parquets:
 
     - housing_history.parquet : toda la historia (una fila por inmueble y fecha).
     - housing_clean.parquet   : estado actual (último snapshot de cada inmueble).
+
+    Solo lee y limpia los snapshots nuevos o cambiados (según el manifiesto) y los
+    añade a la historia existente; `full_rebuild=True` la reconstruye desde cero.
+    Con `streaming=True` trabaja por tandas de `filas_chunk` filas y la memoria no
+    crece con la historia acumulada (ver `_run_streaming`). `n_jobs` > 1 limpia
+    en varios procesos (-1 = todos los núcleos).
     """
-    # rglob → lee tanto los CSV sueltos (lote inicial) como las carpetas data/raw/<fecha>/
-    files = sorted(DATA_RAW.rglob("*.csv"))
+    # rglob → lee tanto los snapshots sueltos (lote inicial) como las carpetas
+    # data/raw/<fecha>/, en CSV o Parquet
+    files = listar_raw(DATA_RAW)
     if not files:
-        raise FileNotFoundError(f"No hay CSV en {DATA_RAW}")
-    df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
-    df = preprocesar_datos_finca_raiz(df)
+        raise FileNotFoundError(f"No hay snapshots en {DATA_RAW}")
+
+    manifest = MF.cargar(MANIFEST_PATH)
+    full_rebuild = full_rebuild or not HIST_PATH.exists()
+    tocados = []     # mismo contenido, otro mtime: solo se refresca el manifiesto
+    pend = MF.pendientes(files, manifest.iloc[0:0] if full_rebuild else manifest, DATA_RAW,
+                         tocados)
+    if not pend:
+        MF.registrar(MANIFEST_PATH, manifest, tocados, pd.Timestamp.now().strftime("%Y-%m-%d"))
+        print(f"✅ Sin snapshots nuevos en {DATA_RAW}; la historia está al día.")
+        return
 
     DATA_PROC.mkdir(parents=True, exist_ok=True)
+    if streaming:
+        n_hist, n_clean = _run_streaming(pend, full_rebuild, filas_chunk, n_jobs)
+        MF.registrar(MANIFEST_PATH, manifest, pend + tocados,
+                     pd.Timestamp.now().strftime("%Y-%m-%d"))
+        print(f"📥 {len(pend)} snapshot(s) nuevos/cambiados de {len(files)} (streaming)")
+        print(f"✅ Historia   → {HIST_PATH} — {n_hist:,} filas")
+        print(f"✅ Estado actual → {CLEAN_PATH} — {n_clean:,} inmuebles únicos")
+        return
+
+    tablas = leer_tablas([e["file"] for e in pend], COLUMNAS)
+    for e, t in zip(pend, tablas):
+        e["rows"] = t.num_rows
+    df = preprocesar_datos_finca_raiz(unir(tablas).to_pandas(), n_jobs=n_jobs)
+
+    if not full_rebuild:
+        # Las observaciones re-leídas (CSV cambiado) reemplazan a las anteriores
+        previa = pd.read_parquet(HIST_PATH)
+        previa = previa[~_llave(previa).isin(_llave(df))]
+        df = pd.concat([previa, df], ignore_index=True)
 
-    # 1) Historia completa: todas las observaciones (id + fecha)
-    hist_out = DATA_PROC / "housing_history.parquet"
-    df.to_parquet(hist_out, index=False)
+    # 1) Historia completa: todas las observaciones (id + fecha). Con el esquema
+    #    fijo (categóricas → dictionary) aunque la historia previa y lo nuevo
+    #    traigan categorías distintas
+    escribir_parquet(a_tabla_limpia(ordenar(df, ORDEN_HIST)), HIST_PATH, orden=ORDEN_HIST)
 
     # 2) Estado actual: la observación más reciente de cada inmueble
     latest = (
@@ -30,14 +171,33 @@ def run():
           .tail(1)
           .reset_index(drop=True)
     )
-    clean_out = DATA_PROC / "housing_clean.parquet"
-    latest.to_parquet(clean_out, index=False)
+    escribir_parquet(a_tabla_limpia(ordenar(latest, ORDEN_CLEAN)), CLEAN_PATH,
+                     orden=ORDEN_CLEAN)
+    MF.registrar(MANIFEST_PATH, manifest, pend + tocados,
+                 pd.Timestamp.now().strftime("%Y-%m-%d"))
+
+    print(f"📥 {len(pend)} snapshot(s) nuevos/cambiados de {len(files)}")
+    print(f"✅ Historia   → {HIST_PATH} — {len(df):,} filas")
+    print(f"✅ Estado actual → {CLEAN_PATH} — {len(latest):,} inmuebles únicos")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="Ignora el manifiesto y reconstruye la historia con todo data/raw")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Limpia por tandas con memoria acotada (historias grandes)")
+    parser.add_argument("--filas-chunk", type=int, default=FILAS_CHUNK,
+                        help="Filas por tanda en modo --streaming")
+    parser.add_argument("--n-jobs", type=int, default=1,
+                        help="Procesos para la limpieza (-1 = todos los núcleos)")
+    args = parser.parse_args()
+    run(full_rebuild=args.full_rebuild, streaming=args.streaming,
+        filas_chunk=args.filas_chunk, n_jobs=args.n_jobs)
 
-    print(f"✅ Historia   → {hist_out} — {len(df):,} filas")
-    print(f"✅ Estado actual → {clean_out} — {len(latest):,} inmuebles únicos")
 
 if __name__ == "__main__":
-    run()
+    main()
 
 
 
@@ -1,27 +1,52 @@
 """
 Upsert de lo scrapeado en el store maestro incremental.
 
-Lee los CSV de data/raw/ (las corridas del scraper) y los inserta/actualiza en
+Lee los snapshots de data/raw/ (las corridas del scraper, Parquet o CSV) y los inserta/actualiza en
 data/master/listings.parquet por `id_inmueble`. Pensado para correr una sola vez
-en el job `merge` (con los CSV de todos los departamentos ya consolidados), o en
+en el job `merge` (con los snapshots de todos los departamentos ya consolidados), o en
 local tras `python -m src.scraper --incremental`.
 
+Solo lee los snapshots nuevos o cambiados desde la última corrida (ver
+`src.manifest`); `--full-rebuild` vuelve a upsertar todo data/raw.
+
 Uso:
     python -m src.ingest_master
+    python -m src.ingest_master --full-rebuild
 """
+import argparse
 from pathlib import Path
 import pandas as pd
 
 from src.config import DATA_RAW
+from src import manifest as MF
 from src import master as M
+from src.raw_io import leer_tablas, listar_raw, unir
+
+MANIFEST_PATH = M.MASTER_PATH.parent / "manifest.parquet"
 
 
-def run() -> None:
-    files = sorted(Path(DATA_RAW).rglob("*.csv"))
+def run(full_rebuild: bool = False) -> None:
+    files = listar_raw(DATA_RAW)
     if not files:
-        print(f"⚠️  No hay CSV en {DATA_RAW}; nada que upsertar.")
+        print(f"⚠️  No hay snapshots en {DATA_RAW}; nada que upsertar.")
+        return
+    manifest = MF.cargar(MANIFEST_PATH)
+    # Sin master (borrado/primera vez) el manifiesto no sirve: se re-siembra todo
+    full_rebuild = full_rebuild or not M.MASTER_PATH.exists()
+    tocados = []     # mismo contenido, otro mtime: solo se refresca el manifiesto
+    pend = MF.pendientes(files, manifest.iloc[0:0] if full_rebuild else manifest,
+                         Path(DATA_RAW), tocados)
+    if not pend:
+        MF.registrar(MANIFEST_PATH, manifest, tocados, pd.Timestamp.now().strftime("%Y-%m-%d"))
+        print(f"✅ Sin snapshots nuevos en {DATA_RAW} ({len(files)} ya aplicados).")
         return
-    df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+    print(f"📥 {len(pend)} snapshot(s) nuevos/cambiados de {len(files)} en {DATA_RAW}")
+
+    # Lo que el master descarta (texto largo, basura) ni se carga
+    tablas = leer_tablas([e["file"] for e in pend], excluir=M.DROP_COLS)
+    for e, t in zip(pend, tablas):
+        e["rows"] = t.num_rows
+    df = unir(tablas).to_pandas()
 
     # Los CSV viejos no traen id_inmueble → lo derivamos de la URL (último segmento),
     # idéntico a lo que hace el scraper/limpieza. Así se pueden sembrar en el master.
@@ -32,10 +57,25 @@ def run() -> None:
 
     run_date = pd.Timestamp.now().strftime("%Y-%m-%d")
     stats = M.upsert(df, run_date)
+    # El manifiesto se escribe DESPUÉS del upsert: si algo falla, se reintenta todo
+    MF.registrar(MANIFEST_PATH, manifest, pend + tocados, run_date)
     print(f"🗄️  Master actualizado → {M.MASTER_PATH}")
     print(f"   +{stats['nuevos']} nuevos · {stats['actualizados']} actualizados · "
           f"{stats['total']} inmuebles en total")
+    if stats.get("eventos"):
+        print("   📒 Eventos: " + " · ".join(f"{n} {t}" for t, n in stats["eventos"].items()))
+    for col, r in stats.get("reporte", {}).items():
+        print(f"   ⚠️  {col}: {r['invalidos']} valores fuera del esquema "
+              f"(quedan nulos), p. ej. {r['ejemplos']}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--full-rebuild", action="store_true",
+                   help="Ignora el manifiesto y vuelve a upsertar todo data/raw")
+    a = p.parse_args()
+    run(full_rebuild=a.full_rebuild)
 
 
 if __name__ == "__main__":
-    run()
+    main()
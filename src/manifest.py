@@ -0,0 +1,81 @@
+"""
+Manifiesto de snapshots crudos ya aplicados.
+
+Registra, por cada archivo de data/raw que ya se procesó: ruta (relativa a
+data/raw), tamaño, mtime, hash del contenido, nº de filas y fecha de la corrida.
+Con eso `ingest_master` / `ingest` leen solo lo nuevo o cambiado en vez de todo
+el histórico (`--full-rebuild` ignora el manifiesto).
+
+Un archivo se considera sin cambios si coincide tamaño+mtime; si no, se compara
+el hash (p. ej. el mismo CSV copiado de nuevo en CI con otro mtime). Los que
+solo cambiaron de mtime se devuelven aparte (`tocados`) para que `registrar`
+guarde el mtime nuevo y la corrida siguiente no los vuelva a hashear.
+"""
+from __future__ import annotations
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+COLS = ["path", "size", "mtime", "hash", "rows", "run_date"]
+
+
+def cargar(path: Path) -> pd.DataFrame:
+    """Manifiesto actual (vacío si aún no existe)."""
+    if Path(path).exists():
+        return pd.read_parquet(path)
+    return pd.DataFrame(columns=COLS)
+
+
+def hash_archivo(f: Path, bloque: int = 1 << 20) -> str:
+    """Hash (blake2b) del contenido, leído por bloques."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(f, "rb") as fh:
+        while chunk := fh.read(bloque):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def pendientes(files: Iterable[Path], manifest: pd.DataFrame, raiz: Path,
+               tocados: List[Dict] | None = None) -> List[Dict]:
+    """Entradas (sin `rows`/`run_date`) de los archivos nuevos o cambiados.
+
+    Si se pasa `tocados`, se le añaden las entradas de los archivos con otro
+    tamaño/mtime pero el mismo hash (con `rows`/`run_date` de su registro
+    previo): no hay que re-ingerirlos, solo refrescarlos con `registrar`.
+    """
+    previos = {r.path: r for r in manifest.itertuples(index=False)}
+    out = []
+    for f in files:
+        st = Path(f).stat()
+        rel = Path(f).relative_to(raiz).as_posix()
+        ent = {"path": rel, "size": st.st_size, "mtime": st.st_mtime, "file": Path(f)}
+        prev = previos.get(rel)
+        if prev is not None and prev.size == st.st_size and prev.mtime == st.st_mtime:
+            continue
+        ent["hash"] = hash_archivo(f)
+        if prev is not None and prev.hash == ent["hash"]:
+            if tocados is not None:
+                tocados.append({**ent, "rows": prev.rows, "run_date": prev.run_date})
+            continue
+        out.append(ent)
+    return out
+
+
+def registrar(path: Path, manifest: pd.DataFrame, entradas: List[Dict],
+              run_date: str) -> pd.DataFrame:
+    """Añade/reemplaza `entradas` (ya con `rows`) en el manifiesto y lo persiste.
+
+    Las entradas sin `run_date` propio (las recién aplicadas) llevan `run_date`."""
+    nuevas = pd.DataFrame([{**{k: e.get(k) for k in COLS},
+                            "run_date": e.get("run_date") or run_date}
+                           for e in entradas], columns=COLS)
+    if nuevas.empty:
+        return manifest
+    resto = manifest[~manifest["path"].isin(nuevas["path"])]
+    out = pd.concat([resto, nuevas], ignore_index=True) if len(resto) else nuevas
+    out = out.astype({"size": "int64", "mtime": "float64", "rows": "int64"})
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    out.to_parquet(path, index=False)
+    return out
@@ -4,14 +4,22 @@ Store maestro incremental de inmuebles, keyed por `id_inmueble`.
 Guarda un parquet (data/master/listings.parquet) con una fila por inmueble
 (los campos crudos del scraper) + `first_seen` / `last_seen`. El scraper lo lee
 para saber qué ya conoce (y así cortar la paginación), y el `upsert` lo actualiza
-con lo nuevo/cambiado de cada corrida.
+con lo nuevo/cambiado de cada corrida, anotando en la bitácora de eventos
+(`src.eventos`) los inmuebles nuevos, con cambio de precio y no vistos.
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src import eventos as EV
 from src.config import BASE_DIR
+from src.raw_io import listas
+from src.schema import a_tabla, conformar, decodificar, tipo_columna
+from src.storage import escribir_parquet
 
 MASTER_PATH = BASE_DIR / "data" / "master" / "listings.parquet"
 
@@ -26,11 +34,36 @@ DROP_COLS = {
 # (los captura la ficha técnica del detalle) → son features de alto valor.
 
 
-def cargar() -> pd.DataFrame:
-    """Devuelve el master actual (DataFrame vacío si aún no existe)."""
-    if MASTER_PATH.exists():
-        return pd.read_parquet(MASTER_PATH)
-    return pd.DataFrame()
+def cargar(columnas: Sequence[str] | None = None) -> pd.DataFrame:
+    """Devuelve el master actual (DataFrame vacío si aún no existe).
+
+    `columnas` proyecta al leer: solo se decodifican esas (las que el master no
+    tenga se ignoran).
+    """
+    if not MASTER_PATH.exists():
+        return pd.DataFrame()
+    if columnas is not None:
+        presentes = set(pq.read_schema(MASTER_PATH).names)
+        columnas = [c for c in columnas if c in presentes]
+    tabla = decodificar(pq.read_table(MASTER_PATH, columns=columnas))
+    df = tabla.to_pandas()
+    # Masters escritos antes de las listas nativas guardan 'Etiquetas' como texto
+    for f in tabla.schema:
+        if pa.types.is_list(tipo_columna(f.name)) and not pa.types.is_list(f.type):
+            df[f.name] = listas(df[f.name])
+    # Masters escritos antes del esquema declarado guardan el id como texto: se
+    # tipa en memoria con la misma conversión que `conformar` (el próximo
+    # `upsert`/`guardar` lo persiste ya tipado; leer no reescribe el master)
+    if "id_inmueble" in df.columns and not pa.types.is_integer(
+            tabla.schema.field("id_inmueble").type):
+        ids = pd.to_numeric(df["id_inmueble"], errors="coerce").astype("Int64")
+        malos = df["id_inmueble"].notna() & ids.isna()
+        if malos.any():
+            print(f"⚠️  {int(malos.sum()):,} fila(s) del master con id_inmueble no numérico "
+                  f"se descartan: {df.loc[malos, 'id_inmueble'].astype(str).unique()[:5].tolist()}")
+        df = df[ids.notna().to_numpy()].assign(
+            id_inmueble=ids.dropna().astype("int64").to_numpy()).reset_index(drop=True)
+    return df
 
 
 def precios_conocidos(master: pd.DataFrame | None = None) -> Dict[str, str]:
@@ -46,22 +79,28 @@ def precios_conocidos(master: pd.DataFrame | None = None) -> Dict[str, str]:
 def upsert(rows: List[Dict] | pd.DataFrame, run_date: str) -> Dict[str, int]:
     """Inserta/actualiza filas por `id_inmueble` y persiste el master.
 
-    Devuelve conteos {nuevos, actualizados, total}.
+    Devuelve conteos {nuevos, actualizados, total, invalidos}, los eventos
+    anotados por tipo en `eventos` y, si hubo valores que no encajan en el
+    esquema declarado, el detalle en `reporte`.
     """
-    nuevos = pd.DataFrame(rows) if not isinstance(rows, pd.DataFrame) else rows.copy()
+    nuevos = pd.DataFrame(rows) if not isinstance(rows, pd.DataFrame) else rows
     if nuevos.empty or "id_inmueble" not in nuevos.columns:
-        return {"nuevos": 0, "actualizados": 0, "total": len(cargar())}
+        return {"nuevos": 0, "actualizados": 0, "total": len(cargar()), "invalidos": 0,
+                "eventos": {}}
 
-    nuevos["id_inmueble"] = nuevos["id_inmueble"].astype(str)
+    # Quitar columnas pesadas/basura antes de tipar (el master queda liviano)
+    nuevos = nuevos.drop(columns=[c for c in DROP_COLS if c in nuevos.columns])
+    # Frontera de ingesta: se tipa una sola vez con el esquema declarado del master
+    nuevos, reporte = conformar(nuevos)
     nuevos = nuevos.drop_duplicates(subset="id_inmueble", keep="last")
     nuevos["last_seen"] = run_date
 
     master = cargar()
+    eventos = EV.detectar(master, nuevos, run_date)
     if master.empty:
         nuevos["first_seen"] = run_date
         combinado, n_new, n_upd = nuevos, len(nuevos), 0
     else:
-        master["id_inmueble"] = master["id_inmueble"].astype(str)
         prev_ids = set(master["id_inmueble"])
         first_seen = dict(zip(master["id_inmueble"],
                               master.get("first_seen", pd.Series(index=master.index, dtype=str))))
@@ -72,16 +111,27 @@ def upsert(rows: List[Dict] | pd.DataFrame, run_date: str) -> Dict[str, int]:
         n_new = len(set(nuevos["id_inmueble"]) - prev_ids)
         n_upd = len(nuevos) - n_new
 
-    # Quitar columnas pesadas/basura para mantener el master liviano
-    combinado = combinado.drop(columns=[c for c in DROP_COLS if c in combinado.columns])
-
-    # pyarrow no tolera columnas 'object' con tipos mezclados (texto + float NaN),
-    # frecuente en los CSV viejos (Financiación, Formas de pago…). Convertimos los
-    # valores NO nulos a str para que el parquet tenga un tipo consistente.
-    for c in combinado.select_dtypes(include="object").columns:
-        notna = combinado[c].notna()
-        combinado.loc[notna, c] = combinado.loc[notna, c].astype(str)
-
-    MASTER_PATH.parent.mkdir(parents=True, exist_ok=True)
-    combinado.to_parquet(MASTER_PATH, index=False)
-    return {"nuevos": n_new, "actualizados": n_upd, "total": len(combinado)}
+    guardar(combinado)
+    # Después de persistir el master: si algo falla antes, no quedan eventos huérfanos
+    EV.registrar(eventos, run_date)
+    stats = {"nuevos": n_new, "actualizados": n_upd, "total": len(combinado),
+             "invalidos": sum(r["invalidos"] for r in reporte.values()),
+             "eventos": eventos["evento"].value_counts().to_dict()}
+    if reporte:
+        stats["reporte"] = reporte
+    return stats
+
+
+def guardar(df: pd.DataFrame) -> None:
+    """Persiste el master con el esquema declarado (ver `src.schema`) y el layout
+    de `src.storage`: agrupado por departamento y, dentro, ordenado por id."""
+    ordenado = df
+    if "Ubicación listado" in df.columns:
+        # El master es crudo (no tiene Departamento): el depto es lo que va tras
+        # la última coma de 'Ubicación listado' (el alcance de `src.eventos`).
+        ordenado = df.assign(_depto=EV.alcance(df["Ubicación listado"])).sort_values(
+            ["_depto", "id_inmueble"], kind="stable", na_position="last",
+            ignore_index=True).drop(columns="_depto")
+    elif "id_inmueble" in df.columns:
+        ordenado = df.sort_values("id_inmueble", kind="stable", ignore_index=True)
+    escribir_parquet(a_tabla(ordenado), MASTER_PATH)
@@ -5,6 +5,13 @@ Lee un extract de Colombia (.pbf de Geofabrik, en data/osm/) con DuckDB, extrae
 los POIs relevantes y calcula features de "servicios cercanos" por inmueble
 (conteos en radios + distancia a la más cercana de cada categoría).
 
+Los POIs no son solo nodos: parques, centros comerciales u hospitales suelen
+estar mapeados como áreas (ways o relaciones), que se reducen a su centroide
+(promedio de sus vértices; el de una relación, el de sus ways). Se guardan como
+dataset Parquet particionado por categoría y por tesela de TESELA_GRADOS grados
+(data/osm/pois/categoria=…/tesela=…/): `leer_pois(bbox=…)` abre solo las
+teselas que cubren una zona.
+
 Uso:
     # 1) (una vez) construir el parquet de POIs desde el .pbf
     python -m src.osm_pois
@@ -12,19 +19,73 @@ Uso:
     # 2) en código / notebook
     from src.osm_pois import features_servicios
     df = features_servicios(df)   # añade columnas serv_*/n_*/dist_*
+    df = features_servicios(df, n_jobs=-1, filas_chunk=50_000)   # por tandas, en paralelo
+    df = features_servicios(df_medellin, region=True)   # solo las teselas de la zona
+    df = features_servicios(df, motor="ckdtree", n_jobs=-1)   # KD-tree 3-D multihilo
+
+    # reconstruir solo el índice espacial (p. ej. tras actualizar scikit-learn)
+    python -m src.osm_pois --solo-indice
+
+Los BallTree (uno con todos los POIs y uno por categoría) se construyen una vez,
+al crear el dataset, y se guardan junto a él en data/osm/pois_indice/ con un
+sello (`version.json`: hash de ruta, tamaño y mtime de cada parquet del dataset
+—no de su contenido: comprobarlo no relee los POIs—, versión de scikit-learn y
+del formato).
+`features_servicios` los carga con joblib memory-mapped (no relee los POIs ni
+reconstruye nada); si el sello no coincide con el dataset actual, se reconstruyen.
+Con los BallTree se guardan también cKDTree de scipy sobre vectores unitarios
+3-D (`motor="ckdtree"`): la distancia euclídea entre dos puntos de la esfera es
+la cuerda 2·sin(θ/2) del arco θ, así que un radio en km se convierte a cuerda y
+la distancia vuelve a km sin trigonometría en cada nodo, y las consultas usan
+varios hilos (`workers`). Da los mismos conteos y distancias (a tolerancia de
+coma flotante) que el BallTree haversine.
+Con el índice se guarda también la grilla de densidad de `src.poi_grilla`, que
+responde los conteos sumando celdas (`features_servicios(..., conteo="exacto")`).
+
+Las features ya calculadas viven en una tabla lateral (data/master/servicios.parquet:
+id_inmueble, hash de lat/lon, versión de los POIs y las columnas serv_*/n_*/dist_*).
+`con_servicios(df)` la une a `df` y solo calcula los inmuebles nuevos, los que
+cambiaron de coordenadas o los calculados contra otro parquet de POIs; la usan
+`build_app_dataset` (si hay POIs) y `train --servicios`.
 """
 from __future__ import annotations
+import argparse
 import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
+from typing import Sequence
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from src import master as M, poi_grilla
 from src.config import BASE_DIR
+from src.storage import escribir_parquet, leer_parquet
 
 OSM_DIR = BASE_DIR / "data" / "osm"
-POIS_PARQUET = OSM_DIR / "pois_colombia.parquet"
+POIS_DIR = OSM_DIR / "pois"
+POIS_PARQUET_PLANO = OSM_DIR / "pois_colombia.parquet"   # formato anterior (se migra)
+TESELA_GRADOS = 1.0    # lado de las teselas del dataset de POIs
+MARGEN_REGION_KM = 50  # alrededor de la zona, en features_servicios(region=True)
+PARTICION_POIS = ds.partitioning(pa.schema([("categoria", pa.string()),
+                                            ("tesela", pa.string())]), flavor="hive")
+INDICE_DIR = OSM_DIR / "pois_indice"
+INDICE_FORMATO = 4   # súbelo si cambia lo que se guarda en INDICE_DIR
+RADIO_TIERRA_KM = 6371
+FILAS_CHUNK = 50_000   # inmuebles por tanda en features_servicios
+
+# Tabla lateral de features por inmueble (junto al master: el CI la versiona con él)
+SERVICIOS_PATH = M.MASTER_PATH.parent / "servicios.parquet"
+COLUMNA_SERVICIO = re.compile(r"^(serv_\d+m|n_.+_1km|dist_.+_km)$")
 
-# Categoría lógica → condición sobre los tags de OSM (nodos)
+# Categoría lógica → condición sobre los tags de OSM (nodos, ways y relaciones)
 CATEGORIAS = {
     "educacion":    "tags['amenity'] IN ('school','university','college','kindergarten')",
     "salud":        "tags['amenity'] IN ('hospital','clinic','pharmacy','doctors')",
@@ -37,10 +98,117 @@ CATEGORIAS = {
 }
 
 
+def _consulta(fuente: str) -> str:
+    """SQL de los POIs sobre `fuente` (ST_ReadOSM o una tabla con sus columnas).
+
+    Los nodos traen lat/lon; los ways, el promedio de sus nodos; las relaciones,
+    el de los centroides de sus ways miembro.
+    """
+    conds = " OR ".join(f"({c})" for c in CATEGORIAS.values())
+    cat_case = " ".join(f"WHEN {c} THEN '{n}'" for n, c in CATEGORIAS.items())
+    return f"""
+        WITH cand AS (
+            SELECT kind, id, refs, ref_types, lat, lon, CASE {cat_case} END AS categoria
+            FROM {fuente}
+            WHERE kind IN ('node', 'way', 'relation') AND ({conds})
+        ),
+        miembros AS (
+            SELECT id AS rel, unnest(refs) AS way, unnest(ref_types) AS tipo
+            FROM cand WHERE kind = 'relation'
+        ),
+        ways AS (
+            SELECT id AS way FROM cand WHERE kind = 'way'
+            UNION SELECT way FROM miembros WHERE tipo = 'way'
+        ),
+        way_nodos AS (
+            SELECT DISTINCT o.id AS way, unnest(o.refs) AS nodo
+            FROM {fuente} o SEMI JOIN ways w ON o.id = w.way
+            WHERE o.kind = 'way'
+        ),
+        nodos AS (
+            SELECT o.id AS nodo, o.lat, o.lon
+            FROM {fuente} o SEMI JOIN way_nodos n ON o.id = n.nodo
+            WHERE o.kind = 'node'
+        ),
+        centro_way AS (
+            SELECT wn.way, avg(n.lat) AS lat, avg(n.lon) AS lon
+            FROM way_nodos wn JOIN nodos n USING (nodo) GROUP BY wn.way
+        ),
+        centro_rel AS (
+            SELECT m.rel, avg(c.lat) AS lat, avg(c.lon) AS lon
+            FROM miembros m JOIN centro_way c ON m.tipo = 'way' AND m.way = c.way
+            GROUP BY m.rel
+        )
+        SELECT c.kind::VARCHAR AS origen, c.id AS osm_id, c.categoria,
+               coalesce(c.lat, w.lat, r.lat) AS lat, coalesce(c.lon, w.lon, r.lon) AS lon
+        FROM cand c
+        LEFT JOIN centro_way w ON c.kind = 'way' AND c.id = w.way
+        LEFT JOIN centro_rel r ON c.kind = 'relation' AND c.id = r.rel
+        WHERE c.categoria IS NOT NULL
+        ORDER BY c.categoria, c.kind, c.id
+    """
+
+
+def tesela(lat, lon) -> np.ndarray:
+    """Tesela "fila_columna" (celdas de TESELA_GRADOS grados) de cada punto."""
+    i = np.floor(np.asarray(lat, dtype="float64") / TESELA_GRADOS).astype(np.int64)
+    j = np.floor(np.asarray(lon, dtype="float64") / TESELA_GRADOS).astype(np.int64)
+    return (pd.Series(i).astype(str) + "_" + pd.Series(j).astype(str)).to_numpy(dtype=object)
+
+
+def teselas_bbox(lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+                 margen_km: float = 0.0) -> list[str]:
+    """Teselas que cubren el rectángulo (ampliado `margen_km` por cada lado)."""
+    d_lat = margen_km / (np.pi / 180 * RADIO_TIERRA_KM)
+    cos = np.cos(np.radians(min(max(abs(lat_min), abs(lat_max)) + d_lat, 89.0)))
+    d_lon = d_lat / cos
+    filas = range(int(np.floor((lat_min - d_lat) / TESELA_GRADOS)),
+                  int(np.floor((lat_max + d_lat) / TESELA_GRADOS)) + 1)
+    cols = range(int(np.floor((lon_min - d_lon) / TESELA_GRADOS)),
+                 int(np.floor((lon_max + d_lon) / TESELA_GRADOS)) + 1)
+    return [f"{i}_{j}" for i in filas for j in cols]
+
+
+def guardar_pois(pois: pd.DataFrame) -> None:
+    """Reescribe el dataset de POIs (lat, lon, categoria y lo demás que traiga)
+    particionado por categoría y tesela."""
+    import shutil
+    shutil.rmtree(POIS_DIR, ignore_errors=True)
+    tabla = pa.Table.from_pandas(pois.assign(tesela=tesela(pois["lat"], pois["lon"])),
+                                 preserve_index=False)
+    ds.write_dataset(tabla, POIS_DIR, format="parquet", partitioning=PARTICION_POIS,
+                     basename_template="parte-{i}.parquet", max_partitions=1 << 16,
+                     file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"))
+
+
+def categorias_disponibles() -> list[str]:
+    return sorted(p.name.split("=", 1)[1] for p in POIS_DIR.glob("categoria=*"))
+
+
+def leer_pois(bbox: tuple[float, float, float, float] | None = None, margen_km: float = 0.0,
+              categorias: Sequence[str] | None = None,
+              columnas: Sequence[str] = ("lat", "lon", "categoria")) -> pd.DataFrame:
+    """POIs del dataset; con `bbox` = (lat_min, lat_max, lon_min, lon_max) solo
+    se abren las teselas que lo cubren (más `margen_km`)."""
+    filtro = None
+    if bbox is not None:
+        filtro = ds.field("tesela").isin(teselas_bbox(*bbox, margen_km=margen_km))
+    if categorias is not None:
+        cond = ds.field("categoria").isin(list(categorias))
+        filtro = cond if filtro is None else filtro & cond
+    dataset = ds.dataset(POIS_DIR, format="parquet", partitioning=PARTICION_POIS)
+    return dataset.to_table(columns=list(columnas), filter=filtro).to_pandas()
+
+
 def extraer_pois(pbf: str | None = None, force: bool = False) -> pd.DataFrame:
-    """Extrae los POIs del .pbf a un parquet cacheado (lat, lon, categoria)."""
-    if POIS_PARQUET.exists() and not force:
-        return pd.read_parquet(POIS_PARQUET)
+    """Extrae los POIs del .pbf al dataset particionado (cacheado) y construye
+    el índice espacial. Devuelve todos los POIs (lat, lon, categoria)."""
+    if not force and not POIS_DIR.exists() and POIS_PARQUET_PLANO.exists():
+        # Parquet plano de versiones anteriores (solo nodos): se particiona sin releer el .pbf
+        print(f"📦 Particionando {POIS_PARQUET_PLANO} → {POIS_DIR}")
+        guardar_pois(pd.read_parquet(POIS_PARQUET_PLANO))
+    if POIS_DIR.exists() and not force:
+        return leer_pois()
 
     import duckdb
     if pbf is None:
@@ -51,40 +219,317 @@ def extraer_pois(pbf: str | None = None, force: bool = False) -> pd.DataFrame:
 
     con = duckdb.connect()
     con.execute("INSTALL spatial; LOAD spatial;")
-    conds = " OR ".join(f"({c})" for c in CATEGORIAS.values())
-    cat_case = " ".join(f"WHEN {c} THEN '{n}'" for n, c in CATEGORIAS.items())
-    q = f"""
-        SELECT lat, lon, CASE {cat_case} END AS categoria
-        FROM ST_ReadOSM('{pbf}')
-        WHERE kind = 'node' AND lat IS NOT NULL AND ({conds})
-    """
-    df = con.execute(q).df().dropna(subset=["categoria"]).reset_index(drop=True)
+    df = con.execute(_consulta(f"ST_ReadOSM('{pbf}')")).df()
+    df = df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
     OSM_DIR.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(POIS_PARQUET, index=False)
-    print(f"✅ {len(df):,} POIs → {POIS_PARQUET}")
-    print(df["categoria"].value_counts().to_string())
-    return df
+    guardar_pois(df)
+    print(f"✅ {len(df):,} POIs → {POIS_DIR}")
+    print(pd.crosstab(df["categoria"], df["origen"]).to_string())
+    pois = leer_pois()
+    construir_indice(pois)
+    return pois
+
+
+def _sello() -> dict:
+    """Lo que identifica un índice válido para el dataset de POIs actual.
+
+    Solo mira los metadatos de los archivos (ruta, tamaño, mtime): `guardar_pois`
+    los reescribe todos, así que un dataset nuevo siempre cambia el sello."""
+    import sklearn
+    h = hashlib.sha1()
+    for parte in sorted(POIS_DIR.rglob("*.parquet")):
+        st = parte.stat()
+        h.update(f"{parte.relative_to(POIS_DIR).as_posix()}|{st.st_size}|{st.st_mtime_ns}\n"
+                 .encode())
+    return {"formato": INDICE_FORMATO, "pois_sha1": h.hexdigest(),
+            "sklearn": sklearn.__version__}
+
+
+def xyz(lat, lon) -> np.ndarray:
+    """Vectores unitarios 3-D de puntos en grados (n × 3)."""
+    la, lo = np.radians(np.asarray(lat, dtype="float64")), np.radians(np.asarray(lon, dtype="float64"))
+    return np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)])
+
+
+def cuerda(km) -> np.ndarray:
+    """Radio en km sobre la esfera → cuerda entre vectores unitarios."""
+    return 2 * np.sin(np.asarray(km) / RADIO_TIERRA_KM / 2)
+
+
+def arco_km(c) -> np.ndarray:
+    """Cuerda entre vectores unitarios → distancia en km sobre la esfera."""
+    return 2 * np.arcsin(np.clip(np.asarray(c) / 2, 0, 1)) * RADIO_TIERRA_KM
+
+
+def _arboles(pois: pd.DataFrame, motor: str = "balltree") -> dict:
+    """{"todos": árbol, categoría: árbol} de `pois`: BallTree haversine sobre
+    radianes o cKDTree sobre vectores unitarios. Las categorías sin POIs no
+    tienen árbol."""
+    if motor == "ckdtree":
+        from scipy.spatial import cKDTree
+        puntos, crear = xyz(pois["lat"], pois["lon"]), cKDTree
+    else:
+        from sklearn.neighbors import BallTree
+        puntos = np.radians(pois[["lat", "lon"]].to_numpy(dtype="float64"))
+        crear = lambda p: BallTree(p, metric="haversine")
+    cats = pois["categoria"].astype(str).to_numpy()
+    arboles = {"todos": crear(puntos)} if len(puntos) else {}
+    for cat in sorted(set(cats)):
+        arboles[cat] = crear(puntos[cats == cat])
+    return arboles
 
 
-def features_servicios(listings: pd.DataFrame, radios_km=(0.5, 1.0)) -> pd.DataFrame:
+def construir_indice(pois: pd.DataFrame | None = None) -> dict:
+    """Construye y persiste los BallTree (todos + uno por categoría) del dataset
+    de POIs. El sello se escribe al final: un índice a medias no vale."""
+    import joblib
+
+    if pois is None:
+        pois = extraer_pois()
+    INDICE_DIR.mkdir(parents=True, exist_ok=True)
+    (INDICE_DIR / "version.json").unlink(missing_ok=True)
+    for viejo in [*INDICE_DIR.glob("*.joblib"), *INDICE_DIR.glob("grilla*")]:
+        viejo.unlink()
+
+    arboles = _arboles(pois)
+    for nombre, arbol in arboles.items():
+        joblib.dump(arbol, INDICE_DIR / f"{nombre}.joblib")
+    for nombre, arbol in _arboles(pois, "ckdtree").items():
+        joblib.dump(arbol, INDICE_DIR / f"kd_{nombre}.joblib")
+    categorias = [c for c in arboles if c != "todos"]
+    poi_grilla.construir(pois, categorias, INDICE_DIR)
+
+    sello = {**_sello(), "n_pois": int(len(pois)), "categorias": categorias,
+             "creado": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+    (INDICE_DIR / "version.json").write_text(json.dumps(sello, indent=2), encoding="utf-8")
+    _cargar.cache_clear()
+    _cargar_grilla.cache_clear()
+    print(f"🌳 Índice de {len(pois):,} POIs ({len(categorias)} categorías) → {INDICE_DIR}")
+    return sello
+
+
+@lru_cache(maxsize=2)
+def _cargar(pois_sha1: str, motor: str) -> dict:
+    import joblib
+    sello = json.loads((INDICE_DIR / "version.json").read_text(encoding="utf-8"))
+    prefijo = "kd_" if motor == "ckdtree" else ""
+    return {nombre: joblib.load(INDICE_DIR / f"{prefijo}{nombre}.joblib", mmap_mode="r")
+            for nombre in ["todos", *sello["categorias"]]}
+
+
+@lru_cache(maxsize=1)
+def _cargar_grilla(pois_sha1: str) -> poi_grilla.Grilla:
+    return poi_grilla.Grilla(INDICE_DIR)
+
+
+def _vigente() -> str:
+    """Asegura que el índice en INDICE_DIR corresponde al dataset actual (otro
+    extract, otra versión de scikit-learn o del formato → lo reconstruye) y
+    devuelve el hash del dataset."""
+    if not POIS_DIR.exists():
+        extraer_pois()   # crea el dataset y, con él, el índice
+    actual = _sello()
+    marca = INDICE_DIR / "version.json"
+    guardado = json.loads(marca.read_text(encoding="utf-8")) if marca.exists() else {}
+    if {k: guardado.get(k) for k in actual} != actual:
+        print("♻️  Índice de POIs ausente o desactualizado: reconstruyendo…")
+        construir_indice()
+    return actual["pois_sha1"]
+
+
+def cargar_indice(motor: str = "balltree", version: str | None = None) -> dict:
+    """{"todos": árbol, categoría: árbol} memory-mapped desde INDICE_DIR
+    (BallTree haversine o, con motor="ckdtree", cKDTree 3-D). `version` es la
+    de `_vigente()` si quien llama ya la comprobó."""
+    return _cargar(version or _vigente(), motor)
+
+
+def cargar_grilla(version: str | None = None) -> poi_grilla.Grilla:
+    """Grilla de densidad de POIs (conteos por celda, ver src/poi_grilla.py)."""
+    return _cargar_grilla(version or _vigente())
+
+
+def _columnas(categorias: list[str], radios_km, n: int) -> dict[str, np.ndarray]:
+    """Arreglos de salida ya reservados, en el orden de columnas de siempre."""
+    cols = {f"serv_{int(r*1000)}m": np.empty(n, dtype=np.int64) for r in radios_km}
+    for cat in categorias:
+        cols[f"n_{cat}_1km"] = np.empty(n, dtype=np.int64)
+        cols[f"dist_{cat}_km"] = np.empty(n, dtype=np.float64)
+    return cols
+
+
+def features_servicios(listings: pd.DataFrame, radios_km=(0.5, 1.0),
+                       conteo: str = "arbol", n_jobs: int = 1,
+                       filas_chunk: int = FILAS_CHUNK, region: bool = False,
+                       motor: str = "balltree", version: str | None = None) -> pd.DataFrame:
     """Añade a cada inmueble: nº total de servicios por radio, nº por categoría a
-    1 km y distancia (km) a la más cercana de cada categoría."""
-    from sklearn.neighbors import BallTree
+    1 km y distancia (km) a la más cercana de cada categoría.
+
+    `conteo` elige cómo se cuentan los POIs en cada radio: "arbol" (BallTree),
+    "exacto" (grilla con refinamiento del borde; mismos números que el árbol) o
+    "grilla" (solo celdas: aproximado, el más rápido). Las distancias siempre
+    salen del árbol.
+
+    Los inmuebles se procesan por tandas de `filas_chunk` filas (0 = todo de una
+    vez) en `n_jobs` hilos (-1 = todos los núcleos): las consultas a los árboles
+    y la grilla sueltan el GIL y los índices memory-mapped se comparten sin
+    copiarse. Cada tanda escribe en su tramo de arreglos reservados de antemano,
+    que se añaden como columnas nuevas sin copiar `listings`.
+
+    `motor` = "ckdtree" cambia los BallTree haversine por cKDTree sobre vectores
+    unitarios (radios como cuerdas); sus consultas ya usan `n_jobs` hilos, así
+    que las tandas corren una tras otra.
+
+    Con `region=True` no se usa el índice de todo el país: se leen solo las
+    teselas que cubren los inmuebles (más MARGEN_REGION_KM) y se arman los
+    árboles en memoria; sirve para enriquecer una ciudad sin cargar Colombia.
+    Los conteos son los mismos; una distancia mayor que el margen es solo una
+    cota superior (el más cercano podría estar fuera de la zona leída).
+
+    `version` (de `_vigente()`) evita volver a comprobar el sello del índice.
+    """
+    if conteo not in ("arbol", "exacto", "grilla"):
+        raise ValueError(f"conteo desconocido: {conteo!r} (arbol, exacto o grilla)")
+    if motor not in ("balltree", "ckdtree"):
+        raise ValueError(f"motor desconocido: {motor!r} (balltree o ckdtree)")
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    kd = motor == "ckdtree"
+    lat = listings["Latitud"].to_numpy(dtype="float64")
+    lon = listings["Longitud"].to_numpy(dtype="float64")
+    if region:
+        if conteo != "arbol":
+            raise ValueError("region=True solo admite conteo='arbol'")
+        if not POIS_DIR.exists():
+            extraer_pois()
+        bbox = ((np.nanmin(lat), np.nanmax(lat), np.nanmin(lon), np.nanmax(lon))
+                if np.isfinite(lat).any() else None)
+        arboles = _arboles(leer_pois(bbox, margen_km=MARGEN_REGION_KM), motor) if bbox else {}
+        categorias = categorias_disponibles()
+    else:
+        version = version or _vigente()
+        arboles = cargar_indice(motor, version)
+        categorias = [c for c in arboles if c != "todos"]
+    grilla = cargar_grilla(version or _vigente()) if conteo != "arbol" else None
+    cols = _columnas(categorias, radios_km, len(listings))
+
+    def tanda(ini: int, fin: int) -> None:
+        if kd:
+            coords = xyz(lat[ini:fin], lon[ini:fin])
+        else:
+            coords = np.radians(np.column_stack([lat[ini:fin], lon[ini:fin]]))
+        hechos: dict[float, dict] = {}   # la grilla cuenta todas las categorías de una vez
+
+        def contar(r: float, nombre: str) -> np.ndarray:
+            if nombre not in arboles:   # región sin POIs de la categoría
+                return np.zeros(fin - ini, dtype=np.int64)
+            if grilla is None and kd:
+                return arboles[nombre].query_ball_point(coords, r=cuerda(r), workers=n_jobs,
+                                                        return_length=True)
+            if grilla is None:
+                return arboles[nombre].query_radius(coords, r=r / RADIO_TIERRA_KM,
+                                                    count_only=True)
+            if r not in hechos:
+                hechos[r] = grilla.contar(lat[ini:fin], lon[ini:fin], r,
+                                          exacto=conteo == "exacto")
+            return hechos[r][nombre]
+
+        for r in radios_km:
+            cols[f"serv_{int(r*1000)}m"][ini:fin] = contar(r, "todos")
+        for cat in categorias:
+            cols[f"n_{cat}_1km"][ini:fin] = contar(1.0, cat)
+            if cat not in arboles:
+                cols[f"dist_{cat}_km"][ini:fin] = np.nan
+            elif kd:
+                cols[f"dist_{cat}_km"][ini:fin] = arco_km(
+                    arboles[cat].query(coords, k=1, workers=n_jobs)[0])
+            else:
+                cols[f"dist_{cat}_km"][ini:fin] = (
+                    arboles[cat].query(coords, k=1)[0][:, 0] * RADIO_TIERRA_KM)
+
+    paso = filas_chunk if filas_chunk and filas_chunk > 0 else max(len(listings), 1)
+    tramos = [(ini, min(ini + paso, len(listings))) for ini in range(0, len(listings), paso)]
+    if n_jobs > 1 and len(tramos) > 1 and not kd:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(tramos))) as ex:
+            list(ex.map(lambda t: tanda(*t), tramos))   # list(): propaga excepciones
+    else:
+        for t in tramos:
+            tanda(*t)
+    return listings.assign(**cols)
+
+
+def _hash_coords(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(
+        df[["Latitud", "Longitud"]].astype("float64"), index=False).to_numpy()
+
+
+def servicios(df: pd.DataFrame, full_rebuild: bool = False, n_jobs: int = 1,
+              conteo: str = "arbol") -> pd.DataFrame:
+    """Features de servicios de los inmuebles de `df` (id_inmueble, Latitud,
+    Longitud) desde la tabla lateral, actualizándola antes.
+
+    Solo se calculan los inmuebles sin fila, con otras coordenadas (hash) o
+    calculados contra otra versión de los POIs; los que no tienen coordenadas
+    quedan sin features. Las filas de otros inmuebles se conservan.
+    """
+    version = _vigente()
+    pedidos = df[["id_inmueble", "Latitud", "Longitud"]].drop_duplicates(
+        "id_inmueble", keep="last")
+    ids = pedidos["id_inmueble"].astype(str).to_numpy()
+    llave = pd.DataFrame({"id_inmueble": ids, "hash_coords": _hash_coords(pedidos),
+                          "pois_version": version})
+
+    previo = None
+    if not full_rebuild and SERVICIOS_PATH.exists():
+        previo = leer_parquet(SERVICIOS_PATH)
+    if previo is None:
+        vigente = np.zeros(len(llave), dtype=bool)
+    else:
+        cruce = llave.merge(previo[["id_inmueble", "hash_coords", "pois_version"]],
+                            on=["id_inmueble", "hash_coords", "pois_version"],
+                            how="left", indicator=True)
+        vigente = cruce["_merge"].eq("both").to_numpy()
+    con_coords = pedidos[["Latitud", "Longitud"]].notna().all(axis=1).to_numpy()
+    calcular = ~vigente & con_coords
+
+    nuevas = features_servicios(
+        pedidos.loc[calcular, ["Latitud", "Longitud"]].astype("float64"),
+        n_jobs=n_jobs, conteo=conteo, version=version).drop(columns=["Latitud", "Longitud"])
+    nuevas.insert(0, "id_inmueble", ids[calcular])
+    nuevas.insert(1, "hash_coords", llave["hash_coords"].to_numpy()[calcular])
+    nuevas.insert(2, "pois_version", version)
+    if previo is not None and calcular.any():
+        fuera = pd.Index(nuevas["id_inmueble"]).get_indexer(previo["id_inmueble"]) < 0
+        tabla = pd.concat([previo[fuera], nuevas], ignore_index=True)
+    else:
+        tabla = nuevas if previo is None else previo
+    if previo is None or calcular.any():
+        escribir_parquet(tabla, SERVICIOS_PATH, orden=["id_inmueble"])
+    print(f"🗺️  Servicios: calculados {int(calcular.sum()):,} de {len(llave):,} inmuebles "
+          f"({int(vigente.sum()):,} reutilizados, {int((~con_coords).sum()):,} sin coordenadas)")
+    feats = tabla.set_index("id_inmueble").reindex(ids)
+    feats = feats[[c for c in feats.columns if COLUMNA_SERVICIO.match(c)]]
+    # Sin coordenadas no se calcula nada (ni vale una fila de coordenadas viejas)
+    feats.loc[~con_coords] = np.nan
+    return feats
+
 
-    pois = extraer_pois()
-    out = listings.copy()
-    coords = np.radians(out[["Latitud", "Longitud"]].values)
+def con_servicios(df: pd.DataFrame, **kw) -> pd.DataFrame:
+    """`df` con las columnas serv_*/n_*/dist_* de la tabla lateral (ver `servicios`)."""
+    feats = servicios(df, **kw).reindex(df["id_inmueble"].astype(str).to_numpy())
+    return df.assign(**{c: feats[c].to_numpy() for c in feats.columns})
 
-    tree_all = BallTree(np.radians(pois[["lat", "lon"]].values), metric="haversine")
-    for r in radios_km:
-        out[f"serv_{int(r*1000)}m"] = tree_all.query_radius(coords, r=r / 6371, count_only=True)
 
-    for cat, g in pois.groupby("categoria"):
-        t = BallTree(np.radians(g[["lat", "lon"]].values), metric="haversine")
-        out[f"n_{cat}_1km"] = t.query_radius(coords, r=1 / 6371, count_only=True)
-        out[f"dist_{cat}_km"] = t.query(coords, k=1)[0][:, 0] * 6371
-    return out
+def main() -> None:
+    p = argparse.ArgumentParser(description="POIs de OSM (.pbf) → parquet + índice espacial")
+    p.add_argument("--pbf", default=None, help="Extract .pbf (por defecto, el primero en data/osm/)")
+    p.add_argument("--solo-indice", action="store_true",
+                   help="No relee el .pbf: reconstruye el índice desde el parquet existente")
+    a = p.parse_args()
+    if a.solo_indice:
+        construir_indice()
+    else:
+        extraer_pois(a.pbf, force=True)
 
 
 if __name__ == "__main__":
-    extraer_pois(force=True)
+    main()
@@ -0,0 +1,193 @@
+"""
+Densidad de POIs precalculada en una grilla multirresolución (estilo geohash).
+
+Los conteos `serv_*` / `n_{cat}_1km` salían de recorrer un BallTree por punto,
+radio y categoría. Aquí se precalcula, para varios tamaños de celda, cuántos POIs
+de cada categoría caen en cada celda; contar los POIs a r km de un punto es sumar
+las celdas que el círculo cubre enteras:
+
+  - grilla (aproximado): las celdas del borde del círculo cuentan enteras si su
+    centro cae dentro del radio.
+  - exacto: las celdas del borde se refinan mirando sus POIs uno a uno
+    (haversine); el resultado coincide con `BallTree.query_radius`.
+
+Nivel k = celdas de PASO_BASE·2^k grados. Las celdas se numeran por curva de
+Morton (Z-order) sobre el nivel 0, así que una celda de cualquier nivel es un
+rango contiguo de los POIs ordenados por su llave: con un solo orden se sirven
+todos los niveles.
+
+Se construye junto al índice de `src.osm_pois` (mismo sello) en
+data/osm/pois_indice/:
+    grilla.parquet     nivel, celda, total, <categoría>…  (conteos; cabe en el dashboard)
+    grilla_z.npy       llave de Morton de cada POI (ordenada)
+    grilla_latlon.npy  lat/lon en radianes, en ese orden
+    grilla_cat.npy     código de categoría, en ese orden
+
+    from src.osm_pois import cargar_grilla
+    g = cargar_grilla()
+    g.contar(lat, lon, radio_km=1.0, exacto=True)   # {"todos": …, "banco": …}
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+PASO_BASE = 0.0005          # grados del nivel 0 (~55 m)
+NIVELES = 8                 # hasta PASO_BASE·2^7 ≈ 0.064° (~7 km)
+RADIO_TIERRA_KM = 6371
+KM_POR_GRADO = np.pi / 180 * RADIO_TIERRA_KM
+CELDAS_POR_RADIO = 4        # el nivel se elige para que el radio mida ~4 celdas
+PARES_POR_BLOQUE = 4_000_000   # (inmueble, POI) evaluados a la vez en modo exacto
+
+
+def _ij(lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Fila/columna de nivel 0 (origen en -90, -180: siempre no negativas)."""
+    return (np.floor((np.asarray(lat) + 90) / PASO_BASE).astype(np.int64),
+            np.floor((np.asarray(lon) + 180) / PASO_BASE).astype(np.int64))
+
+
+def _separar(x: np.ndarray) -> np.ndarray:
+    """Intercala ceros entre los bits de `x` (< 2^32): …b2b1b0 → …0b20b10b0."""
+    x = x.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for desp, mascara in [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                          (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333),
+                          (1, 0x5555555555555555)]:
+        x = (x | (x << np.uint64(desp))) & np.uint64(mascara)
+    return x
+
+
+def morton(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Llave Z-order de la celda (i, j): las celdas hijas de una celda de nivel
+    k son el rango [llave << 2k, (llave + 1) << 2k) del nivel 0."""
+    return (_separar(i) << np.uint64(1) | _separar(j)).astype(np.int64)
+
+
+def paso_km(nivel: int) -> float:
+    return PASO_BASE * 2 ** nivel * KM_POR_GRADO
+
+
+def nivel_para(radio_km: float) -> int:
+    """Nivel cuyo lado de celda es el más cercano a radio / CELDAS_POR_RADIO."""
+    lados = np.array([paso_km(k) for k in range(NIVELES)])
+    return int(np.argmin(np.abs(np.log(lados / (radio_km / CELDAS_POR_RADIO)))))
+
+
+def construir(pois: pd.DataFrame, categorias: Sequence[str], destino: Path) -> None:
+    """Escribe la grilla de `pois` (lat, lon, categoria) en `destino`."""
+    lat = pois["lat"].to_numpy(dtype="float64")
+    lon = pois["lon"].to_numpy(dtype="float64")
+    cat = pd.Categorical(pois["categoria"].astype(str), categories=list(categorias)).codes
+    z = morton(*_ij(lat, lon))
+    orden = np.argsort(z, kind="stable")
+    z, cat = z[orden], cat[orden].astype(np.int8)
+    np.save(destino / "grilla_z.npy", z)
+    np.save(destino / "grilla_latlon.npy", np.radians(np.column_stack([lat, lon])[orden]))
+    np.save(destino / "grilla_cat.npy", cat)
+
+    partes = []
+    for k in range(NIVELES):
+        celda = z >> np.int64(2 * k)
+        tabla = pd.crosstab(celda, cat).reindex(columns=range(len(categorias)), fill_value=0)
+        tabla.columns = list(categorias)
+        tabla.insert(0, "total", tabla.sum(axis=1))
+        partes.append(tabla.rename_axis("celda").reset_index().assign(nivel=k))
+    grilla = pd.concat(partes, ignore_index=True)
+    grilla = grilla[["nivel", "celda", "total", *categorias]].astype(
+        {"nivel": "int8", **{c: "int32" for c in ["total", *categorias]}})
+    grilla.to_parquet(destino / "grilla.parquet", index=False)
+
+
+class Grilla:
+    """Conteos precalculados + POIs en orden de Morton (memory-mapped)."""
+
+    def __init__(self, origen: Path):
+        tabla = pd.read_parquet(origen / "grilla.parquet")
+        self.categorias = [c for c in tabla.columns if c not in ("nivel", "celda", "total")]
+        self._niveles = {}
+        for k, g in tabla.groupby("nivel", sort=True):
+            conteos = g[["total", *self.categorias]].to_numpy(dtype=np.int64)
+            # Fila extra de ceros: las celdas vacías (get_indexer → -1) caen ahí
+            self._niveles[int(k)] = (pd.Index(g["celda"].to_numpy()),
+                                     np.vstack([conteos, np.zeros((1, conteos.shape[1]), np.int64)]))
+        self.z = np.load(origen / "grilla_z.npy", mmap_mode="r")
+        self.latlon = np.load(origen / "grilla_latlon.npy", mmap_mode="r")
+        self.cat = np.load(origen / "grilla_cat.npy", mmap_mode="r")
+
+    def contar(self, lat, lon, radio_km: float, exacto: bool = False,
+               nivel: int | None = None) -> dict[str, np.ndarray]:
+        """POIs a ≤ `radio_km` (haversine) de cada punto: {"todos": …, cat: …}."""
+        lat = np.asarray(lat, dtype="float64")
+        lon = np.asarray(lon, dtype="float64")
+        k = nivel_para(radio_km) if nivel is None else nivel
+        llaves, conteos = self._niveles[k]
+        paso = PASO_BASE * 2 ** k
+        i, j = _ij(lat, lon)
+        i, j = i >> k, j >> k
+        coslat = np.cos(np.radians(lat))
+        cos_min = np.nanmin(coslat, initial=1.0)
+        # Holgura para que la aproximación plana nunca clasifique mal una celda
+        holgura = 1e-3 * radio_km + 2e-3
+        di = int(np.ceil(radio_km / paso_km(k))) + 1
+        dj = int(np.ceil(radio_km / (paso_km(k) * max(cos_min, 0.05)))) + 1
+
+        total = np.zeros((len(lat), conteos.shape[1]), dtype=np.int64)
+        borde_pt, borde_celda = [], []
+        for a in range(-di, di + 1):
+            lat0 = (i + a) * paso - 90
+            dy_min = np.maximum.reduce([lat0 - lat, np.zeros_like(lat), lat - (lat0 + paso)])
+            dy_max = np.maximum(np.abs(lat - lat0), np.abs(lat - (lat0 + paso)))
+            for b in range(-dj, dj + 1):
+                lon0 = (j + b) * paso - 180
+                dx_min = np.maximum.reduce([lon0 - lon, np.zeros_like(lon), lon - (lon0 + paso)])
+                dx_max = np.maximum(np.abs(lon - lon0), np.abs(lon - (lon0 + paso)))
+                d_min = np.hypot(dy_min, dx_min * coslat) * KM_POR_GRADO
+                d_max = np.hypot(dy_max, dx_max * coslat) * KM_POR_GRADO
+                dentro = d_max <= radio_km - holgura
+                borde = ~dentro & (d_min <= radio_km + holgura)
+                if not (dentro.any() or borde.any()):
+                    continue
+                celda = morton(i + a, j + b)
+                if exacto:
+                    pos = llaves.get_indexer(celda[dentro])
+                    total[dentro] += conteos[pos]
+                    borde_pt.append(np.flatnonzero(borde))
+                    borde_celda.append(celda[borde])
+                else:
+                    centro = np.hypot(lat0 + paso / 2 - lat,
+                                      (lon0 + paso / 2 - lon) * coslat) * KM_POR_GRADO
+                    usa = dentro | (borde & (centro <= radio_km))
+                    total[usa] += conteos[llaves.get_indexer(celda[usa])]
+        if exacto and borde_pt:
+            self._refinar(total, np.concatenate(borde_pt), np.concatenate(borde_celda),
+                          k, lat, lon, radio_km)
+        return {"todos": total[:, 0],
+                **{c: total[:, n + 1] for n, c in enumerate(self.categorias)}}
+
+    def _refinar(self, total, pt, celda, k, lat, lon, radio_km) -> None:
+        """Suma a `total` los POIs de las celdas de borde que están a ≤ radio."""
+        ini = np.searchsorted(self.z, celda << np.int64(2 * k), side="left")
+        fin = np.searchsorted(self.z, (celda + 1) << np.int64(2 * k), side="left")
+        n = fin - ini
+        pt, ini, n = pt[n > 0], ini[n > 0], n[n > 0]
+        if not len(pt):
+            return
+        lat_r, lon_r = np.radians(lat), np.radians(lon)
+        acum = np.cumsum(n)
+        cortes = np.searchsorted(acum, np.arange(PARES_POR_BLOQUE, acum[-1], PARES_POR_BLOQUE))
+        ncat = total.shape[1] - 1
+        for bloque in np.split(np.arange(len(pt)), cortes):
+            cuantos = n[bloque]
+            p = np.repeat(pt[bloque], cuantos)
+            # Índice de cada POI: ini de su celda + posición dentro de ella
+            desde = np.repeat(ini[bloque] - np.cumsum(cuantos) + cuantos, cuantos)
+            poi = desde + np.arange(len(p))
+            plat, plon = self.latlon[poi, 0], self.latlon[poi, 1]
+            h = (np.sin((plat - lat_r[p]) / 2) ** 2
+                 + np.cos(lat_r[p]) * np.cos(plat) * np.sin((plon - lon_r[p]) / 2) ** 2)
+            cerca = 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1))) <= radio_km / RADIO_TIERRA_KM
+            p, c = p[cerca], self.cat[poi[cerca]].astype(np.int64)
+            total[:, 0] += np.bincount(p, minlength=len(total))
+            total[:, 1:] += np.bincount(p * ncat + c, minlength=len(total) * ncat
+                                        ).reshape(len(total), ncat)
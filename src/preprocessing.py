@@ -1,30 +1,327 @@
 # preprocessing.py
-import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error
-
-import pandas as pd
-import pandas as pd
-import numpy as np
-import re
 import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.config import BASE_DIR
+from src.raw_io import listas
+from src.schema import a_tabla_limpia, categorizar
+
+# Columnas crudas que la limpieza descarta (los lectores pueden ni cargarlas)
+COLUMNAS_DESECHAR = [
+    'Financiación', 'Formas de pago',
+    'Cuota inicial', 'Pisos interiores', 'Aplica subsidio',
+    'Unidades', 'Error detalle'
+]
+
+# Proyección al leer: columnas crudas que la limpieza siempre lee (id, dedup,
+# precio/área —filtran filas—, ubicación, barrio, tipo y etiquetas)…
+ENTRADAS_BASE = ['URL detalle', 'fecha_recoleccion', 'Precio listado', 'Tipología listado',
+                 'Ubicación listado', 'Descripción breve', 'Título', 'Etiquetas']
+# …y las que solo pasan a la salida: si no se leen, la columna limpia sale nula
+# (Descripción completa: se rellena con la breve)
+ENTRADAS_OPCIONALES = ['Descripción completa', 'Publicante', 'Estrato', 'Parqueaderos',
+                       'Piso', 'Antiguedad', 'Estado', 'Latitud', 'Longitud']
+
+
+def columnas_crudas(salida=None):
+    """Columnas crudas a leer para producir las columnas limpias `salida`
+    (todas si es None). Pasarlas a `raw_io.leer_raw(columnas=...)` /
+    `master.cargar(columnas=...)` evita materializar lo que la etapa no usa."""
+    opcionales = ENTRADAS_OPCIONALES if salida is None else \
+        [c for c in ENTRADAS_OPCIONALES if c in set(salida)]
+    return ENTRADAS_BASE + opcionales
+
+# Todo el motor es vectorizado (Series.str.* / numpy): nada de .apply por fila
+# ni de construir un pd.Series por fila. Además, cada normalizador corre solo
+# sobre los valores DISTINTOS de su columna (pocos frente a las filas). Los de
+# entradas de baja cardinalidad (precio, tipología, ubicación) guardan además el
+# resultado en una caché persistente texto crudo → campos normalizados; los que
+# dependen del título o la descripción (≈ uno por inmueble) no: la caché
+# crecería con el master y casi no tendría aciertos.
+
+# Súbelo al cambiar CUALQUIER regla de normalización: invalida la caché en disco.
+REGLAS_VERSION = "1"
+CACHE_DIR = BASE_DIR / "data" / "master" / "norm_cache"   # el CI la versiona con el master
+CACHE_MAX = 100_000   # entradas por caché (se descartan las más antiguas)
+_CACHES = {}       # nombre → DataFrame indexado por el texto crudo (caché en memoria)
+_NUEVAS = {}       # nombre → entradas nuevas (DataFrames) aún no escritas a disco
+
+# ---- Tipología: "10 Habs. 4 Baños 432 m²" ----
+# Usar SIEMPRE el número que captura cada patrón (no el primero del string):
+# "10 Habs. 4 Baños 432 m²" → Habitaciones=10, Baños=4, Area=432
+PATRONES_TIPOLOGIA = {
+    'Habitaciones': r'(\d+)\s*(?:Habs?\.?|Habitaciones?)',
+    'Baños': r'(\d+)\s*(?:Baños?|Banos?)',
+    'Area_m2': r'(\d+\.\d+|\d+)\s*(?:m²|m2|metros)'
+}
+
+DEPTO_NORM = {'D.C.': 'Bogotá D.C.', 'Dc': 'Bogotá D.C.', 'Bogota D.C.': 'Bogotá D.C.'}
+
+ETIQUETAS_COMUNES = ['Proyecto', 'Destacado', 'Nuevo', 'Oportunidad']
+
+TIPOS_VALIDOS = {
+    "apartamento", "apartamentos", "apartaestudio", "apartaestudios",
+    "casa", "casas", "cabaña", "finca", "oficina", "oficinas",
+    "consultorio", "bodega", "edificio", "local", "locales", "lote",
+    "habitación", "habitaciones"
+}
+
+MAPA_NORMALIZACION = {
+    'Apartamento': 'Apartamento',
+    'Apartamentos': 'Apartamento',
+    'Apartaestudio': 'Apartaestudio',
+    'Apartaestudios': 'Apartaestudio',
+    'Casa': 'Casa',
+    'Casas': 'Casa',
+    'Cabaña': 'Cabaña',
+    'Finca': 'Finca',
+    'Oficina': 'Oficina',
+    'Oficinas': 'Oficina',
+    'Consultorio': 'Consultorio',
+    'Bodega': 'Bodega',
+    'Edificio': 'Edificio',
+    'Local': 'Local',
+    'Locales': 'Local',
+    'Lote': 'Lote',
+    'Habitación': 'Habitación',
+}
+
+# Primera palabra del título (en minúsculas) que sea un tipo conocido. Los más
+# largos primero para que "apartamentos" no se corte en "apartamento".
+_RE_TIPO = r'\b(' + '|'.join(sorted(TIPOS_VALIDOS, key=len, reverse=True)) + r')\b'
+
+
+def _texto(s: pd.Series) -> pd.Series:
+    """Columna como texto (los no-string quedan nulos, como en la versión por fila)."""
+    if pd.api.types.infer_dtype(s, skipna=True) in ('string', 'empty'):
+        return s.astype('string')
+    return s.where(s.map(lambda v: isinstance(v, str)), None).astype('string')
+
+
+def _salida(s: pd.Series) -> pd.Series:
+    """Texto ya sin nulos → dtype de texto por defecto de pandas (el que daba .apply)."""
+    return pd.Series(s.to_numpy(dtype=object), index=s.index, name=s.name)
+
+
+def extraer_precio(s: pd.Series) -> pd.Series:
+    """'Desde $ 309.900.000' → 309900000.0 (NaN si no hay número)."""
+    # Tras el último '$', solo dígitos y puntos; los puntos son separadores de miles
+    num = (_texto(s).str.split('$', regex=False).str[-1]
+           .str.replace(r'[^\d.]', '', regex=True)
+           .str.replace('.', '', regex=False))
+    return pd.to_numeric(num.mask(num == ''), errors='coerce').astype('float64')
+
+
+def extraer_tipologia(s: pd.Series) -> pd.DataFrame:
+    """Habitaciones, Baños y Area_m2 desde 'Tipología listado'."""
+    txt = _texto(s)
+    return pd.DataFrame({
+        k: pd.to_numeric(txt.str.extract(pat, flags=re.IGNORECASE, expand=False),
+                         errors='coerce').astype('float64')
+        for k, pat in PATRONES_TIPOLOGIA.items()
+    }, index=s.index)
+
+
+def normalizar_ubicacion(s: pd.Series) -> pd.DataFrame:
+    """Ciudad y Departamento desde 'Ubicación listado'.
+
+    Soporta dos formatos:
+      VIEJO (2 partes): "Ciudad, Departamento"            -> ["Armenia", "Quindio"]
+      NUEVO (3 partes): "{Tipo} en{Ciudad}, {Ciudad}, {Depto}"
+                        -> ["Apartamento enBogotá", "Bogotá", "d.c."]
+      En el nuevo, la ciudad es la penúltima parte y el departamento la última.
+    """
+    # Partes sin espacios alrededor y sin partes vacías: " , a,, b " → "a,b"
+    txt = (_texto(s).str.replace(r'\s*,\s*', ',', regex=True).str.strip()
+           .str.replace(r',{2,}', ',', regex=True).str.strip(',').str.strip())
+    n_partes = (txt.str.count(',') + 1).fillna(0).to_numpy(dtype='int64')
+
+    # El formato nuevo puede venir como "{Tipo} en{Ciudad}" pegado
+    # (p. ej. "Apartaestudio enBarranquilla"); quitamos ese prefijo.
+    primera = txt.str.split(',', n=1, regex=False).str[0]
+    sin_prefijo = primera.str.replace(r'^.*\ben(?=[A-ZÁÉÍÓÚÑ])', '', regex=True).str.strip()
+    primera = sin_prefijo.mask(sin_prefijo == '', primera)
+
+    ultimas = txt.str.rsplit(',', n=2)
+    penultima, ultima = ultimas.str[-2], ultimas.str[-1]
+
+    ciudad = pd.Series(np.select([n_partes >= 3, n_partes == 2],
+                                 [penultima.to_numpy(object), primera.to_numpy(object)],
+                                 primera.to_numpy(object)),
+                       index=s.index, dtype='string')
+    depto = pd.Series(np.where(n_partes >= 2, ultima.to_numpy(object), 'Desconocido'),
+                      index=s.index, dtype='string')
+
+    vacio = txt.isna() | (txt == '')
+    ciudad = ciudad.str.title().mask(vacio, 'Desconocido')
+    depto = depto.str.title().replace(DEPTO_NORM).mask(vacio, 'Desconocido')
+    return pd.DataFrame({'Ciudad': _salida(ciudad), 'Departamento': _salida(depto)},
+                        index=s.index)
+
+
+def extraer_barrio(s: pd.Series) -> pd.Series:
+    """Barrio desde 'Descripción breve' ("… en venta en Chicó, Bogotá" → "Chicó")."""
+    txt = _texto(s)
+    # Patrón 1: después de 'venta en' y antes de la coma
+    con_coma = txt.str.extract(r'venta en\s+([^\.,]+?),', flags=re.IGNORECASE, expand=False)
+    # Patrón 2: después de 'venta en' hasta el final (sin coma)
+    sin_coma = txt.str.extract(r'venta en\s+([^\.,]+)$', flags=re.IGNORECASE, expand=False)
+    barrio = con_coma.fillna(sin_coma).str.strip().str.title()
+    return _salida(barrio.fillna('Desconocido'))
+
+
+def extraer_tipo_propiedad(s: pd.Series) -> pd.Series:
+    """Tipo de propiedad más probable desde el título.
+
+    Prioriza palabras conocidas en lugar de posición y normaliza plurales
+    ("Apartamentos" → "Apartamento"); lo no reconocido queda 'Desconocido'.
+    """
+    tipo = _texto(s).str.lower().str.extract(_RE_TIPO, expand=False).str.title()
+    return _salida(tipo.map(MAPA_NORMALIZACION).fillna('Desconocido'))
+
 
+def codificar_etiquetas(etiquetas: pd.Series, vocabulario=None):
+    """Multi-hot disperso de la columna de listas de etiquetas.
 
-def preprocesar_datos_finca_raiz(df):
+    Devuelve `(matriz, vocabulario)`: `matriz` es CSR (filas × etiquetas, int8)
+    y `vocabulario` la etiqueta de cada columna. Sin `vocabulario` se arma con
+    todas las del dataset (las comunes primero, el resto por frecuencia); con
+    él, las etiquetas que no están se ignoran. Todo en una pasada sobre las
+    etiquetas aplanadas (Arrow), sin un recorrido por etiqueta.
+    """
+    from scipy import sparse
+
+    arr = pa.array(etiquetas.tolist(), type=pa.list_(pa.string()))
+    largo = arr.value_lengths().fill_null(0).to_numpy(zero_copy_only=False)
+    plano = arr.flatten()
+    if vocabulario is None:
+        cuenta = pc.value_counts(plano).to_pandas() if len(plano) else []
+        resto = sorted(((-int(c['counts']), c['values']) for c in cuenta
+                        if c['values'] is not None and c['values'] not in ETIQUETAS_COMUNES))
+        vocabulario = list(ETIQUETAS_COMUNES) + [v for _, v in resto]
+    vocabulario = list(vocabulario)
+
+    col = pc.index_in(plano, value_set=pa.array(vocabulario, pa.string()))
+    col = col.fill_null(-1).to_numpy(zero_copy_only=False)
+    fila = np.repeat(np.arange(len(etiquetas)), largo)
+    hay = col >= 0
+    matriz = sparse.csr_matrix(
+        (np.ones(hay.sum(), dtype=np.int8), (fila[hay], col[hay])),
+        shape=(len(etiquetas), len(vocabulario)))
+    matriz.sum_duplicates()
+    matriz.data[:] = 1          # una etiqueta repetida en la lista cuenta una vez
+    return matriz, vocabulario
+
+
+def dummies_etiquetas(etiquetas: pd.Series, nombres=ETIQUETAS_COMUNES) -> pd.DataFrame:
+    """Columnas Etiqueta_<nombre> (0/1) de compatibilidad, desde el multi-hot."""
+    matriz, nombres = codificar_etiquetas(etiquetas, nombres)
+    densa = matriz.toarray().astype('int64')
+    return pd.DataFrame({f'Etiqueta_{n}': densa[:, i] for i, n in enumerate(nombres)},
+                        index=etiquetas.index)
+
+
+def _leer_cache(nombre):
+    """Caché `nombre` (memoria → disco); vacía si no existe o es de otra versión."""
+    if nombre not in _CACHES:
+        path = CACHE_DIR / f"{nombre}.parquet"
+        cache = None
+        if path.exists():
+            tabla = pq.read_table(path)
+            meta = tabla.schema.metadata or {}
+            if meta.get(b'reglas_version') == REGLAS_VERSION.encode():
+                cache = tabla.to_pandas().set_index('entrada')
+        _CACHES[nombre] = cache
+    return _CACHES[nombre]
+
+
+def guardar_caches():
+    """Escribe a disco las cachés que recibieron entradas nuevas."""
+    for nombre in sorted(_NUEVAS):
+        tabla = pa.Table.from_pandas(_CACHES[nombre].rename_axis('entrada').reset_index(),
+                                     preserve_index=False)
+        tabla = tabla.replace_schema_metadata({'reglas_version': REGLAS_VERSION})
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        pq.write_table(tabla, CACHE_DIR / f"{nombre}.parquet", compression='zstd')
+    _NUEVAS.clear()
+
+
+def _incorporar(nombre, nuevos):
+    """Añade a la caché `nombre` entradas calculadas en otro proceso."""
+    cache = _leer_cache(nombre)
+    if cache is not None:
+        nuevos = nuevos[cache.index.get_indexer(nuevos.index) < 0]
+    if len(nuevos):
+        _ampliar(nombre, cache, nuevos)
+
+
+def _ampliar(nombre, cache, nuevos):
+    """Añade `nuevos` a la caché `nombre`, acotada a las últimas CACHE_MAX entradas."""
+    cache = nuevos if cache is None else pd.concat([cache, nuevos])
+    _CACHES[nombre] = cache.iloc[-CACHE_MAX:] if len(cache) > CACHE_MAX else cache
+    _NUEVAS.setdefault(nombre, []).append(nuevos)
+    return cache
+
+
+def _como_tabla(res):
+    return res.to_frame('valor') if isinstance(res, pd.Series) else res
+
+
+def _por_unicos(s, fn, nombre=None):
+    """Aplica `fn` (vectorizada) solo a los valores distintos de `s` y mapea de
+    vuelta a las filas. Con `nombre`, reutiliza y amplía la caché persistente."""
+    codigos, unicos = pd.factorize(_texto(s))
+    entradas = pd.Series(unicos, dtype='string')
+
+    if nombre is None:
+        res = _como_tabla(fn(entradas))
+    else:
+        cache = _leer_cache(nombre)
+        # get_indexer usa la tabla hash del índice (Series.isin de strings Arrow
+        # recorre la caché entera en Python en cada llamada)
+        claves = entradas.to_numpy(dtype=object)
+        faltan = entradas if cache is None else entradas[cache.index.get_indexer(claves) < 0]
+        if len(faltan) or cache is None:
+            nuevos = _como_tabla(fn(faltan.reset_index(drop=True)))
+            nuevos.index = pd.Index(faltan.to_numpy(dtype=object), name='entrada')
+            # `cache` (sin recortar) sirve a esta llamada; la guardada queda acotada
+            cache = _ampliar(nombre, cache, nuevos) if len(faltan) else nuevos
+        res = cache.iloc[cache.index.get_indexer(claves)].reset_index(drop=True)
+
+    # Los nulos (código -1) van a una fila extra calculada sobre un texto nulo
+    nulo = _como_tabla(fn(pd.Series([pd.NA], dtype='string')))
+    tabla = pd.concat([res, nulo], ignore_index=True)
+    out = tabla.iloc[np.where(codigos < 0, len(res), codigos)].set_axis(s.index)
+    return out['valor'].rename(s.name) if isinstance(out, pd.DataFrame) and \
+        list(out.columns) == ['valor'] else out
+
+
+def preprocesar_datos_finca_raiz(df, usar_cache=True, n_jobs=1):
     """
     Preprocesa un DataFrame de propiedades inmobiliarias con estructura específica
+
+    Con `usar_cache` los normalizadores de texto reutilizan la caché persistente
+    de data/master/norm_cache/ (ver REGLAS_VERSION); sin ella igual calculan
+    una sola vez por valor distinto.
+
+    Con `n_jobs` > 1 (-1 = todos los núcleos) la limpieza corre en un pool de
+    procesos por departamento (ver `_limpiar_paralelo`). Ambos caminos salen
+    tipados con `schema.CLEAN_SCHEMA`: mismas filas, valores y dtypes.
+
+    Las columnas de baja cardinalidad (`schema.CATEGORICAS`) salen categóricas.
     """
     # ---- 1. Limpieza inicial ----
     # Eliminar columnas no deseadas
-    columnas_desechar = [
-        'Financiación', 'Formas de pago',
-        'Cuota inicial', 'Pisos interiores', 'Aplica subsidio',
-        'Unidades', 'Error detalle'
-    ]
-    df = df.drop(columns=[col for col in columnas_desechar if col in df.columns], errors='ignore')
+    df = df.drop(columns=[col for col in COLUMNAS_DESECHAR if col in df.columns], errors='ignore')
 
     # ---- Retrocompatibilidad: id_inmueble y fecha_recoleccion ----
     # Los CSV antiguos no traen estas columnas; las derivamos/creamos.
@@ -41,212 +338,57 @@ def preprocesar_datos_finca_raiz(df):
     # (conserva la historia: un mismo id en fechas distintas NO se elimina)
     df = df.drop_duplicates(subset=['id_inmueble', 'fecha_recoleccion'], keep='first')
 
-    # ---- 2. Transformar precio ----
-    def extraer_precio(valor):
-        if pd.isna(valor):
-            return np.nan
-        try:
-            # Extraer solo dígitos y puntos, eliminar palabras
-            num_str = re.sub(r'[^\d.]', '', valor.split('$')[-1])
-            # Convertir a float y manejar valores grandes
-            return float(num_str.replace('.', ''))
-        except:
-            return np.nan
-        
-
-    df['Precio'] = df['Precio listado'].apply(extraer_precio)
-    df = df.drop(columns=['Precio listado'])
-
-    # ---- 3. Transformar tipología ----
-    def extraer_tipologia(valor):
-        resultado = {
-            'Habitaciones': np.nan,
-            'Baños': np.nan,
-            'Area_m2': np.nan,
-            'Tipo_propiedad': np.nan
-        }
-        
-        if pd.isna(valor):
-            return pd.Series(resultado)
-
-        # Patrones de búsqueda
-        patrones = {
-            'Habitaciones': r'(\d+)\s*(?:Habs?\.?|Habitaciones?)',
-            'Baños': r'(\d+)\s*(?:Baños?|Banos?)',
-            'Area_m2': r'(\d+\.\d+|\d+)\s*(?:m²|m2|metros)'
-        }
-
-        # Usar SIEMPRE el número que captura cada patrón (no el primero del string):
-        # "10 Habs. 4 Baños 432 m²" → Habitaciones=10, Baños=4, Area=432
-        for key, pat in patrones.items():
-            match = re.search(pat, valor, re.IGNORECASE)
-            if match:
-                resultado[key] = float(match.group(1))
-
-        return pd.Series(resultado)
-        
-    # Aplicar y combinar resultados
-    tipologia_df = df['Tipología listado'].apply(extraer_tipologia)
-    df = pd.concat([df, tipologia_df], axis=1)
-    # df = df.drop(columns=['Tipología listado'])
-
-    # ---- 4. Normalizar ubicación ----
-    # Soporta dos formatos de 'Ubicación listado':
-    #   VIEJO (2 partes): "Ciudad, Departamento"            -> ["Armenia", "Quindio"]
-    #   NUEVO (3 partes): "{Tipo} en{Ciudad}, {Ciudad}, {Depto}"
-    #                     -> ["Apartamento enBogotá", "Bogotá", "d.c."]
-    #   En el nuevo, la ciudad es la penúltima parte y el departamento la última.
-    depto_norm = {'D.C.': 'Bogotá D.C.', 'Dc': 'Bogotá D.C.', 'Bogota D.C.': 'Bogotá D.C.'}
-
-    def normalizar_ubicacion(ubicacion):
-        if pd.isna(ubicacion):
-            return pd.Series({'Ciudad': 'Desconocido', 'Departamento': 'Desconocido'})
-
-        partes = [p.strip() for p in str(ubicacion).split(',') if p.strip()]
-        if not partes:
-            return pd.Series({'Ciudad': 'Desconocido', 'Departamento': 'Desconocido'})
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    if n_jobs > 1 and len(df):
+        df = _limpiar_paralelo(df, usar_cache, n_jobs)
+    else:
+        df = a_tabla_limpia(_limpiar(df, usar_cache)).to_pandas()
 
-        # El formato nuevo puede venir como "{Tipo} en{Ciudad}" pegado
-        # (p. ej. "Apartaestudio enBarranquilla"); quitamos ese prefijo.
-        partes[0] = re.sub(r'^.*\ben(?=[A-ZÁÉÍÓÚÑ])', '', partes[0]).strip() or partes[0]
+    if usar_cache:
+        guardar_caches()
 
-        if len(partes) >= 3:                       # formato nuevo
-            ciudad, departamento = partes[-2], partes[-1]
-        elif len(partes) == 2:                     # formato viejo
-            ciudad, departamento = partes[0], partes[1]
-        else:                                      # solo ciudad
-            ciudad, departamento = partes[0], 'Desconocido'
+    # Ciudad, Barrio, Tipo_propiedad… como categóricas (ver schema.CATEGORICAS)
+    return categorizar(df.reset_index(drop=True))
 
-        ciudad = ciudad.title()
-        departamento = departamento.title()
-        departamento = depto_norm.get(departamento, departamento)
 
-        return pd.Series({'Ciudad': ciudad, 'Departamento': departamento})
+def _limpiar(df, usar_cache):
+    """Pasos 2-7 y ficha técnica: todo por fila (el dedup ya se hizo)."""
+    c = (lambda nombre: nombre) if usar_cache else (lambda nombre: None)
 
-    # Aplicar la función
-    ubicacion_df = df['Ubicación listado'].apply(normalizar_ubicacion)
-    df = pd.concat([df, ubicacion_df], axis=1)
+    # ---- 2. Transformar precio ----
+    df['Precio'] = _por_unicos(df['Precio listado'], extraer_precio, c('precio'))
+    df = df.drop(columns=['Precio listado'])
 
-    # df = df.drop(columns=['Ubicación listado'])
+    # ---- 3. Transformar tipología ----
+    df = pd.concat([df, _por_unicos(df['Tipología listado'], extraer_tipologia,
+                                    c('tipologia'))], axis=1)
 
+    # ---- 4. Normalizar ubicación ----
+    df = pd.concat([df, _por_unicos(df['Ubicación listado'], normalizar_ubicacion,
+                                    c('ubicacion'))], axis=1)
 
     # ---- 5. Extraer Barrio ----
-    def extraer_barrio(descripcion):
-        if pd.isna(descripcion):
-            return 'Desconocido'
-
-        # Patrón 1: después de 'venta en' y antes de la coma
-        match_con_coma = re.search(r'venta en\s+([^\.,]+?),', descripcion, re.IGNORECASE)
-        if match_con_coma:
-            return match_con_coma.group(1).strip().title()
-
-        # Patrón 2: después de 'venta en' hasta el final (sin coma)
-        match_sin_coma = re.search(r'venta en\s+([^\.,]+)$', descripcion, re.IGNORECASE)
-        if match_sin_coma:
-            return match_sin_coma.group(1).strip().title()
-
-        return 'Desconocido'
-
-    df['Barrio'] = df['Descripción breve'].apply(extraer_barrio)
+    df['Barrio'] = _por_unicos(df['Descripción breve'], extraer_barrio)
 
     # ---- 6. Procesar etiquetas ----
-    def procesar_etiquetas(etiquetas_str):
-        if pd.isna(etiquetas_str) or etiquetas_str == '[]':
-            return []
-        
-        try:
-            # Convertir string de lista a lista real
-            return eval(etiquetas_str)
-        except:
-            # Manejar formato incorrecto
-            return [x.strip() for x in etiquetas_str.strip("[]").split(',')]
-
-    df['Etiquetas'] = df['Etiquetas'].apply(procesar_etiquetas)
-
-    # Crear columnas dummy para etiquetas importantes
-    etiquetas_comunes = ['Proyecto', 'Destacado', 'Nuevo', 'Oportunidad']
-    for etiqueta in etiquetas_comunes:
-        df[f'Etiqueta_{etiqueta}'] = df['Etiquetas'].apply(lambda x: 1 if etiqueta in x else 0)
-
-    # ---- 6. Procesar tipo de propiedad ----
-
-    tipos_validos = {
-        "apartamento", "apartamentos", "apartaestudio", "apartaestudios",
-        "casa", "casas", "cabaña", "finca", "oficina", "oficinas",
-        "consultorio", "bodega", "edificio", "local", "locales", "lote",
-        "habitación", "habitaciones"
-    }
-
-    def extraer_tipo_propiedad(titulo: str) -> str:
-        """
-        Extrae el tipo de propiedad más probable a partir del título.
-        Prioriza palabras conocidas en lugar de posición.
-        
-        Args:
-            titulo (str): Texto del título.
-        
-        Returns:
-            str: Tipo de propiedad (capitalizado) o 'Desconocido'.
-        """
-        if pd.isna(titulo) or not str(titulo).strip():
-            return 'Desconocido'
-        
-        titulo = titulo.lower().strip()
-        palabras = re.findall(r'\b[\wáéíóúñ]+\b', titulo)
-        
-        for palabra in palabras:
-            if palabra in tipos_validos:
-                return palabra.title()
-
-        return 'Desconocido'
-
-    df['Tipo_propiedad'] = df['Título'].apply(extraer_tipo_propiedad)
-
-    mapa_normalizacion = {
-        'Apartamento': 'Apartamento',
-        'Apartamentos': 'Apartamento',
-        'Apartaestudio': 'Apartaestudio',
-        'Apartaestudios': 'Apartaestudio',
-        'Casa': 'Casa',
-        'Casas': 'Casa',
-        'Cabaña': 'Cabaña',
-        'Finca': 'Finca',
-        'Oficina': 'Oficina',
-        'Oficinas': 'Oficina',
-        'Consultorio': 'Consultorio',
-        'Bodega': 'Bodega',
-        'Edificio': 'Edificio',
-        'Local': 'Local',
-        'Locales': 'Local',
-        'Lote': 'Lote',
-        'Habitación': 'Habitación',
-    }
-
-    # ---- 6. Procesar tipo de propiedad ----
-    def normalizar_tipo_propiedad(tipo: str) -> str:
-        """
-        Normaliza los valores de tipo de propiedad para unificar categorías comunes
-        y filtrar valores no válidos (e.g. nombres de proyectos).
-        
-        Args:
-            tipo (str): Tipo de propiedad detectado.
-        
-        Returns:
-            str: Tipo de propiedad normalizado o 'Desconocido' si no se reconoce.
-        """
-        if pd.isna(tipo) or not str(tipo).strip():
-            return 'Desconocido'
-        
-        tipo = tipo.strip().title()
-        return mapa_normalizacion.get(tipo, 'Desconocido')
-
-    df['Tipo_propiedad'] = df['Tipo_propiedad'].apply(normalizar_tipo_propiedad)
+    # Lista nativa (snapshots Parquet) o texto "['a', 'b']" (CSV) → lista; se
+    # conserva en la salida para codificar TODAS las etiquetas
+    # (`codificar_etiquetas`). Las columnas dummy de las comunes se mantienen:
+    df['Etiquetas'] = listas(df['Etiquetas']).map(lambda x: x or [])
+    df = pd.concat([df, dummies_etiquetas(df['Etiquetas'])], axis=1)
+
+    # ---- 7. Procesar tipo de propiedad ----
+    df['Tipo_propiedad'] = _por_unicos(df['Título'], extraer_tipo_propiedad)
 
     # ---- Atributos de la ficha técnica del detalle (alto valor) ----
     # Se crean si faltan (datos viejos) y se limpian a numérico donde aplica.
     for c in ['Estrato', 'Parqueaderos', 'Piso', 'Antiguedad', 'Estado']:
         if c not in df.columns:
             df[c] = np.nan
+    # Columnas de paso que la etapa no pidió leer (ver `columnas_crudas`)
+    for c in ['Publicante', 'Latitud', 'Longitud']:
+        if c not in df.columns:
+            df[c] = np.nan
     for c in ['Estrato', 'Parqueaderos', 'Piso']:
         df[c] = pd.to_numeric(df[c].astype(str).str.extract(r'(\d+)')[0], errors='coerce')
 
@@ -255,9 +397,9 @@ def preprocesar_datos_finca_raiz(df):
         'Habitaciones', 'Baños', 'Area_m2', 'Tipo_propiedad',
         'Ciudad', 'Departamento', 'Barrio',
         'Estrato', 'Parqueaderos', 'Piso', 'Antiguedad', 'Estado',
-        'Etiqueta_Proyecto',
+        'Etiquetas', 'Etiqueta_Proyecto',
         'Etiqueta_Destacado', 'Etiqueta_Nuevo', 'Etiqueta_Oportunidad', 'Latitud','Longitud']
-    
+
     # 1. Eliminar registros con NA en 'Area_m2' o 'Precio'
     df = df.dropna(subset=['Area_m2', 'Precio'])
     # df['Area_m2'] = df['Area_m2'].fillna(df['Area_m2'].median())
@@ -273,4 +415,84 @@ def preprocesar_datos_finca_raiz(df):
     df['Habitaciones'] = df['Habitaciones'].fillna(0)
     df['Baños'] = df['Baños'].fillna(0)
 
-    return df[columnas].reset_index(drop=True)
+    return df[columnas]
+
+
+def _departamento_crudo(ubicacion):
+    """Llave de partición: último tramo de 'Ubicación listado' (≈ departamento)."""
+    return _texto(ubicacion).str.rsplit(',', n=1).str[-1].str.strip().str.lower()
+
+
+def _escribir_ipc(tabla, path):
+    with pa.OSFile(str(path), 'wb') as f, pa.ipc.new_file(f, tabla.schema) as w:
+        w.write_table(tabla)
+
+
+def _leer_ipc(path):
+    """Tabla Arrow de un archivo IPC, mapeada en memoria (sin copiar)."""
+    return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+
+
+def _limpiar_particion(entrada, salida, usar_cache):
+    """Tarea del pool: limpia la partición del archivo Arrow `entrada` (con
+    `_fila`) y deja el resultado en `salida`.
+
+    Devuelve las entradas nuevas de caché; el proceso hijo nunca escribe la
+    caché a disco, lo hace el padre al reunir.
+    """
+    df = _leer_ipc(entrada).to_pandas()
+    df.index = df.pop('_fila').to_numpy()
+    out = _limpiar(df, usar_cache)
+    _escribir_ipc(a_tabla_limpia(out).append_column('_fila', pa.array(out.index, pa.int64())),
+                  salida)
+    nuevas = {n: pa.Table.from_pandas(pd.concat(v).rename_axis('entrada').reset_index(),
+                                      preserve_index=False)
+              for n, v in _NUEVAS.items()}
+    _NUEVAS.clear()
+    return nuevas
+
+
+def _a_arrow(parte):
+    """Partición → tabla Arrow con su posición original en `_fila`."""
+    parte = parte.assign(_fila=parte.index)
+    try:
+        return pa.Table.from_pandas(parte, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # CSV leído con pandas: columnas object con tipos mezclados → texto
+        mixtas = [c for c in parte.columns
+                  if parte[c].dtype == object and c != 'Etiquetas']
+        return pa.Table.from_pandas(parte.astype({c: 'string' for c in mixtas}),
+                                    preserve_index=False)
+
+
+def _limpiar_paralelo(df, usar_cache, n_jobs):
+    """Limpia `df` en `n_jobs` procesos, partido por departamento.
+
+    Las particiones viajan como archivos Arrow IPC que cada proceso mapea en
+    memoria (sin serializar objeto por objeto ni copiar por el pipe) y las
+    grandes se trocean para repartir la carga. Al reunir, las filas vuelven a su
+    orden original (`_fila`) → salida determinista e igual a la limpieza en un
+    solo proceso.
+    """
+    df = df.reset_index(drop=True)
+    llave = _por_unicos(df['Ubicación listado'], _departamento_crudo).fillna('')
+    tamano = max(1, -(-len(df) // n_jobs))
+
+    with tempfile.TemporaryDirectory(prefix='limpieza_') as tmp:
+        entradas, salidas = [], []
+        for _, filas in sorted(llave.groupby(llave, sort=False).indices.items()):
+            for ini in range(0, len(filas), tamano):
+                path = Path(tmp) / f'in_{len(entradas)}.arrow'
+                _escribir_ipc(_a_arrow(df.iloc[filas[ini:ini + tamano]]), path)
+                entradas.append(path)
+                salidas.append(Path(tmp) / f'out_{len(salidas)}.arrow')
+
+        with ProcessPoolExecutor(max_workers=min(n_jobs, max(1, len(entradas)))) as ex:
+            nuevas = list(ex.map(_limpiar_particion, entradas, salidas,
+                                 [usar_cache] * len(entradas)))
+
+        for por_cache in nuevas:
+            for nombre, t in por_cache.items():
+                _incorporar(nombre, t.to_pandas().set_index('entrada'))
+        limpia = pa.concat_tables([_leer_ipc(p) for p in salidas]).sort_by('_fila')
+        return limpia.drop_columns(['_fila']).to_pandas()
@@ -0,0 +1,183 @@
+"""
+Lectura/escritura compartida de los snapshots crudos (data/raw/<fecha>/).
+
+El scraper escribe Parquet (por defecto) o CSV; los lectores aceptan ambos
+formatos de forma transparente y devuelven siempre los mismos tipos:
+  - `Etiquetas` como list<string> y `Unidades` como list<map<string,string>>
+    (en los CSV vienen como texto "['a', 'b']" y se parsean una vez por valor
+    distinto, sin `eval`).
+  - Coordenadas float64; el resto string (sin inferencia por archivo).
+
+Los archivos se leen en paralelo (el lector CSV de pyarrow además es multihilo)
+y con proyección de columnas: las pesadas que una etapa no usa (`Descripción
+completa`, `Unidades`…) ni se materializan. Devuelve una tabla Arrow (las tablas
+por archivo se concatenan sin copiar) o un DataFrame.
+
+    from src.raw_io import listar_raw, leer_raw
+    df = leer_raw(listar_raw(DATA_RAW), excluir={"Descripción completa", "Unidades"})
+"""
+from __future__ import annotations
+import ast
+import concurrent.futures as cf
+import csv
+from pathlib import Path
+from typing import Collection, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+FORMATOS = ("parquet", "csv")
+
+# Tipos fijos de las columnas crudas; las no listadas se leen como string
+# (id_inmueble también: los CSV viejos no lo traen y se deriva de la URL como texto)
+RAW_TYPES = {
+    "Latitud": pa.float64(), "Longitud": pa.float64(),
+    "Etiquetas": pa.list_(pa.string()),
+    "Unidades": pa.list_(pa.map_(pa.string(), pa.string())),
+}
+
+# Columnas pesadas que casi ninguna etapa necesita
+COLS_PESADAS = {"Descripción completa", "Unidades", "URL imagen"}
+
+MAX_HILOS = 8
+
+
+def _tipo(col: str) -> pa.DataType:
+    return RAW_TYPES.get(col, pa.string())
+
+
+def parsear_lista(valor) -> list | None:
+    """Texto "['a', 'b']" (o ya una lista/array) → lista de Python; nulo → None."""
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return list(valor)
+    if not isinstance(valor, str) and pd.isna(valor):
+        return None
+    s = str(valor).strip()
+    if s in ("", "[]"):
+        return []
+    try:
+        out = ast.literal_eval(s)
+        return list(out) if isinstance(out, (list, tuple)) else [out]
+    except (ValueError, SyntaxError):
+        # Formato incorrecto: partir por comas
+        return [x.strip().strip("'\"") for x in s.strip("[]").split(",") if x.strip()]
+
+
+def listas(s: pd.Series) -> pd.Series:
+    """Normaliza una columna a listas de Python, parseando cada texto distinto una vez."""
+    es_txt = s.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    out = pd.Series(None, index=s.index, dtype=object)
+    if es_txt.any():
+        txt = s[es_txt]
+        out[es_txt] = txt.map({u: parsear_lista(u) for u in pd.unique(txt)})
+    if (~es_txt).any():
+        out[~es_txt] = s[~es_txt].map(parsear_lista)
+    return out
+
+
+def _listas_arrow(col: pa.ChunkedArray, tipo: pa.DataType) -> pa.Array:
+    """Columna de texto con listas serializadas → lista Arrow nativa."""
+    return pa.array(listas(col.to_pandas()).tolist(), type=tipo)
+
+
+def _encabezado(f: Path) -> List[str]:
+    with open(f, newline="", encoding="utf-8") as fh:
+        return next(csv.reader(fh), [])
+
+
+def _leer_csv(f: Path, incluir: List[str]) -> pa.Table:
+    t = pacsv.read_csv(
+        f,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        # La descripción completa trae saltos de línea dentro de comillas
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            # las listas llegan como texto y se parsean abajo
+            column_types={c: pa.string() if pa.types.is_list(_tipo(c)) else _tipo(c)
+                          for c in incluir},
+            include_columns=incluir,
+            include_missing_columns=True,   # columnas pedidas que el CSV no trae → nulas
+            strings_can_be_null=True,
+        ),
+    )
+    for i, c in enumerate(t.column_names):
+        if pa.types.is_list(_tipo(c)):
+            t = t.set_column(i, c, _listas_arrow(t[c], _tipo(c)))
+    return t
+
+
+def _leer_parquet(f: Path, incluir: List[str]) -> pa.Table:
+    presentes = set(pq.read_schema(f).names)
+    t = pq.read_table(f, columns=[c for c in incluir if c in presentes])
+    cols = [t[c].cast(_tipo(c)) if c in presentes else pa.nulls(t.num_rows, _tipo(c))
+            for c in incluir]
+    return pa.table(cols, names=incluir)
+
+
+def _leer(f: Path, columnas: Sequence[str] | None, excluir: Collection[str]) -> pa.Table:
+    parquet = f.suffix == ".parquet"
+    nombres = pq.read_schema(f).names if parquet else _encabezado(f)
+    incluir = [c for c in (columnas or nombres) if c not in excluir]
+    return _leer_parquet(f, incluir) if parquet else _leer_csv(f, incluir)
+
+
+def listar_raw(raiz: Path) -> List[Path]:
+    """Todos los snapshots (CSV y Parquet) bajo `raiz`, ordenados por ruta (fecha)."""
+    raiz = Path(raiz)
+    return sorted([*raiz.rglob("*.csv"), *raiz.rglob("*.parquet")])
+
+
+def escribir_snapshot(df: pd.DataFrame, path: Path) -> None:
+    """Escribe un snapshot del scraper en `path` (.parquet o .csv según el sufijo).
+
+    En Parquet las listas quedan como tipos nativos y se comprime con zstd; en
+    CSV se serializan como texto (formato histórico).
+    """
+    path = Path(path)
+    if path.suffix != ".parquet":
+        df.to_csv(path, index=False, encoding="utf-8")
+        return
+    cols = {}
+    for c in df.columns:
+        tipo = _tipo(c)
+        if pa.types.is_list(tipo):
+            cols[c] = pa.array(listas(df[c]).tolist(), type=tipo)
+        elif pa.types.is_floating(tipo):
+            cols[c] = pa.array(pd.to_numeric(df[c], errors="coerce"), type=tipo)
+        else:
+            cols[c] = pa.array(df[c].astype("string"), type=tipo)
+    pq.write_table(pa.table(cols), path, compression="zstd")
+
+
+def leer_tablas(files: Iterable[Path], columnas: Sequence[str] | None = None,
+                excluir: Collection[str] = ()) -> List[pa.Table]:
+    """Una tabla Arrow por archivo (mismo orden que `files`), leídas en paralelo.
+
+    `columnas` proyecta a esas columnas (las que falten quedan nulas); sin ella se
+    leen todas menos las de `excluir`.
+    """
+    files = list(files)
+    if not files:
+        return []
+    with cf.ThreadPoolExecutor(max_workers=min(MAX_HILOS, len(files))) as ex:
+        return list(ex.map(lambda f: _leer(Path(f), columnas, excluir), files))
+
+
+def unir(tablas: List[pa.Table]) -> pa.Table:
+    """Concatena sin copiar; columnas ausentes en algún archivo quedan nulas."""
+    return pa.concat_tables(tablas, promote_options="default")
+
+
+def leer_raw_tabla(files: Iterable[Path], columnas: Sequence[str] | None = None,
+                   excluir: Collection[str] = ()) -> pa.Table:
+    """Todos los `files` en una sola tabla Arrow."""
+    return unir(leer_tablas(files, columnas, excluir))
+
+
+def leer_raw(files: Iterable[Path], columnas: Sequence[str] | None = None,
+             excluir: Collection[str] = ()) -> pd.DataFrame:
+    """Todos los `files` en un solo DataFrame (una única conversión Arrow → pandas)."""
+    return leer_raw_tabla(files, columnas, excluir).to_pandas()
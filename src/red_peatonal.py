@@ -0,0 +1,274 @@
+"""
+Distancia caminando a los servicios, sobre la red vial de OpenStreetMap (offline).
+
+`dist_{cat}_km` de `src.osm_pois` es distancia en línea recta: un inmueble al
+otro lado de un río, una autopista o un conjunto cerrado queda "cerca" de
+servicios a los que en realidad hay que dar la vuelta. Aquí:
+
+  1. `construir`: del mismo .pbf de data/osm/ se extraen las vías caminables de
+     una región (bbox) y se guardan como grafo CSR no dirigido (indptr, indices,
+     pesos en km) + coordenadas de los nodos, en data/osm/red_peatonal/<region>/.
+  2. `etiquetar`: para cada categoría de POI, un Dijkstra multi-origen (un nodo
+     virtual unido a todos los POIs de la categoría, pegados a su nodo más
+     cercano) deja en cada nodo de la red su distancia por la red al POI más
+     cercano, hasta LIMITE_KM. Se rehace sola si cambia el dataset de POIs.
+  3. `features_red`: cada inmueble se pega a su nodo más cercano (cKDTree 3-D)
+     y su distancia es la del tramo hasta el nodo + la etiqueta del nodo: una
+     búsqueda y un acceso a arreglo por inmueble.
+
+Uso:
+    python -m src.red_peatonal --region antioquia --departamento Antioquia
+    python -m src.red_peatonal --region medellin --bbox 6.15 6.35 -75.65 -75.50
+
+    from src.red_peatonal import features_red
+    df = features_red(df, "antioquia")   # añade dist_red_{cat}_km
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src import osm_pois as O
+from src.config import DATA_PROC
+
+RED_DIR = O.OSM_DIR / "red_peatonal"
+LIMITE_KM = 5.0        # más allá, la distancia por la red queda NaN
+PEGADO_MAX_KM = 0.5    # POI o inmueble a más de esto de la red no se pega
+MARGEN_KM = LIMITE_KM  # la red se extrae con este margen alrededor del bbox
+
+# Vías por las que se puede caminar (sin autopistas ni troncales)
+CAMINABLES = ("footway", "path", "pedestrian", "steps", "living_street", "residential",
+              "service", "unclassified", "track", "cycleway", "tertiary", "tertiary_link",
+              "secondary", "secondary_link", "primary", "primary_link", "corridor")
+
+
+def _consulta(fuente: str, bbox: tuple[float, float, float, float]) -> str:
+    """SQL de los nodos de las vías caminables en `bbox`, en orden de vía y
+    posición (dos filas seguidas de la misma vía con posiciones consecutivas
+    son un tramo)."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    caminables = ", ".join(f"'{c}'" for c in CAMINABLES)
+    return f"""
+        WITH vias AS (
+            SELECT id, refs FROM {fuente}
+            WHERE kind = 'way' AND tags['highway'] IN ({caminables})
+              AND coalesce(tags['foot'], '') NOT IN ('no', 'private')
+              AND coalesce(tags['access'], '') NOT IN ('no', 'private')
+        ),
+        tramos AS (
+            SELECT id AS via, unnest(refs) AS nodo, generate_subscripts(refs, 1) AS pos
+            FROM vias
+        ),
+        nodos AS (
+            SELECT o.id AS nodo, o.lat, o.lon
+            FROM {fuente} o SEMI JOIN tramos t ON o.id = t.nodo
+            WHERE o.kind = 'node' AND o.lat BETWEEN {lat_min} AND {lat_max}
+              AND o.lon BETWEEN {lon_min} AND {lon_max}
+        )
+        SELECT t.via, t.pos, t.nodo, n.lat, n.lon
+        FROM tramos t JOIN nodos n USING (nodo)
+        ORDER BY t.via, t.pos
+    """
+
+
+def _haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    la1, lo1, la2, lo2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    h = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin((lo2 - lo1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1))) * O.RADIO_TIERRA_KM
+
+
+def grafo(puntos: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Arreglos CSR (simétricos) de las filas (via, pos, nodo, lat, lon) de `_consulta`."""
+    ids, compacto = np.unique(puntos["nodo"].to_numpy(), return_inverse=True)
+    coords = np.zeros((len(ids), 2))
+    coords[compacto] = puntos[["lat", "lon"]].to_numpy(dtype="float64")
+
+    via, pos = puntos["via"].to_numpy(), puntos["pos"].to_numpy()
+    # Tramo = filas seguidas de la misma vía y posiciones contiguas (un nodo
+    # fuera del bbox corta la vía)
+    tramo = (via[1:] == via[:-1]) & (pos[1:] == pos[:-1] + 1)
+    u, v = compacto[:-1][tramo], compacto[1:][tramo]
+    w = _haversine_km(coords[u, 0], coords[u, 1], coords[v, 0], coords[v, 1])
+    u, v, w = np.r_[u, v], np.r_[v, u], np.r_[w, w]
+    sin_lazos = u != v
+    u, v, w = u[sin_lazos], v[sin_lazos], w[sin_lazos]
+    # Aristas repetidas (dos vías que comparten tramo): se queda la más corta
+    orden = np.lexsort((w, v, u))
+    u, v, w = u[orden], v[orden], w[orden]
+    primera = np.r_[True, (u[1:] != u[:-1]) | (v[1:] != v[:-1])]
+    u, v, w = u[primera], v[primera], w[primera]
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=len(ids)), out=indptr[1:])
+    return {"indptr": indptr, "indices": v.astype(np.int32), "pesos": w.astype(np.float32),
+            "nodos": coords, "osm_ids": ids.astype(np.int64)}
+
+
+def construir(region: str, bbox: tuple[float, float, float, float],
+              pbf: str | None = None, fuente: str | None = None, con=None) -> Path:
+    """Extrae la red caminable de `bbox` (+ MARGEN_KM) a RED_DIR/<region>/ y la
+    etiqueta. `fuente`/`con` permiten leer de otra tabla (pruebas)."""
+    if fuente is None:
+        import duckdb
+        if pbf is None:
+            pbfs = sorted(glob.glob(str(O.OSM_DIR / "*.pbf")))
+            if not pbfs:
+                raise FileNotFoundError(f"No hay .pbf en {O.OSM_DIR} (descárgalo de Geofabrik).")
+            pbf = pbfs[0]
+        con = duckdb.connect()
+        con.execute("INSTALL spatial; LOAD spatial;")
+        fuente = f"ST_ReadOSM('{pbf}')"
+    ampliado = _ampliar(bbox, MARGEN_KM)
+    g = grafo(con.execute(_consulta(fuente, ampliado)).df())
+    if len(g["nodos"]) == 0:
+        raise ValueError(f"No hay vías caminables en {bbox}")
+
+    destino = RED_DIR / region
+    shutil.rmtree(destino, ignore_errors=True)
+    destino.mkdir(parents=True)
+    for nombre, arr in g.items():
+        np.save(destino / f"{nombre}.npy", arr)
+    meta = {"region": region, "bbox": list(bbox), "bbox_red": list(ampliado),
+            "nodos": int(len(g["nodos"])), "aristas": int(len(g["indices"]) // 2),
+            "pbf": Path(pbf).name if pbf else None,
+            "creado": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+    (destino / "red.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    print(f"🛣️  Red caminable '{region}': {meta['nodos']:,} nodos, "
+          f"{meta['aristas']:,} tramos → {destino}")
+    etiquetar(region)
+    return destino
+
+
+def _ampliar(bbox, margen_km: float) -> tuple[float, float, float, float]:
+    lat_min, lat_max, lon_min, lon_max = bbox
+    d_lat = margen_km / (np.pi / 180 * O.RADIO_TIERRA_KM)
+    d_lon = d_lat / np.cos(np.radians(min(max(abs(lat_min), abs(lat_max)) + d_lat, 89.0)))
+    return (lat_min - d_lat, lat_max + d_lat, lon_min - d_lon, lon_max + d_lon)
+
+
+def _pegar(nodos: np.ndarray, lat, lon) -> tuple[np.ndarray, np.ndarray]:
+    """(nodo más cercano, distancia en km) de cada punto."""
+    from scipy.spatial import cKDTree
+    arbol = cKDTree(O.xyz(nodos[:, 0], nodos[:, 1]))
+    c, nodo = arbol.query(O.xyz(lat, lon), k=1)
+    return nodo, O.arco_km(c)
+
+
+def etiquetar(region: str, version: str | None = None) -> None:
+    """Distancia por la red desde cada nodo al POI más cercano de cada categoría
+    (distancias.npy, nodos × categorías) con los POIs actuales (`version`, de
+    `osm_pois._vigente()`, si quien llama ya la comprobó)."""
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import dijkstra
+
+    destino = RED_DIR / region
+    meta = json.loads((destino / "red.json").read_text(encoding="utf-8"))
+    indptr = np.load(destino / "indptr.npy")
+    indices = np.load(destino / "indices.npy")
+    pesos = np.load(destino / "pesos.npy").astype(np.float64)
+    nodos = np.load(destino / "nodos.npy")
+    n = len(nodos)
+    filas = np.repeat(np.arange(n), np.diff(indptr))
+
+    version = version or O._vigente()
+    categorias = O.categorias_disponibles()
+    pois = O.leer_pois(tuple(meta["bbox_red"]))
+    nodo_poi, pegado = _pegar(nodos, pois["lat"], pois["lon"])
+    cerca = pegado <= PEGADO_MAX_KM
+    cats = pois["categoria"].astype(str).to_numpy()
+
+    dist = np.full((n, len(categorias)), np.nan, dtype=np.float32)
+    for k, cat in enumerate(categorias):
+        sel = cerca & (cats == cat)
+        if not sel.any():
+            continue
+        # Nodo virtual n → nodo de cada POI, con peso = tramo POI–red: un solo
+        # Dijkstra da, en cada nodo, la distancia al POI más cercano
+        tramo = np.full(n, np.inf)
+        np.minimum.at(tramo, nodo_poi[sel], pegado[sel])   # varios POIs en un nodo: el más cerca
+        destinos = np.flatnonzero(np.isfinite(tramo))
+        tramo = tramo[destinos]
+        m = sp.csr_matrix((np.r_[pesos, tramo + 1e-9],
+                           (np.r_[filas, np.full(len(destinos), n)],
+                            np.r_[indices, destinos])), shape=(n + 1, n + 1))
+        d = dijkstra(m, directed=True, indices=n, limit=LIMITE_KM)[:n]
+        dist[:, k] = np.where(np.isfinite(d), d, np.nan)
+    np.save(destino / "distancias.npy", dist)
+    meta.update({"pois_sha1": version, "categorias": categorias, "limite_km": LIMITE_KM,
+                 "pegado_max_km": PEGADO_MAX_KM})
+    (destino / "red.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    print(f"🏷️  '{region}': distancias por la red a {len(categorias)} categorías "
+          f"({int(cerca.sum()):,} POIs pegados a la red)")
+
+
+def features_red(listings: pd.DataFrame, region: str) -> pd.DataFrame:
+    """Añade `dist_red_{cat}_km` (distancia caminando, km) a cada inmueble.
+
+    NaN si el inmueble está a más de PEGADO_MAX_KM de la red de la región o si
+    no hay un POI de la categoría a menos de LIMITE_KM por la red.
+    """
+    destino = RED_DIR / region
+    if not (destino / "red.json").exists():
+        raise FileNotFoundError(f"No hay red '{region}' en {RED_DIR}. "
+                                f"Corre `python -m src.red_peatonal --region {region} …`.")
+    meta = json.loads((destino / "red.json").read_text(encoding="utf-8"))
+    version = O._vigente()
+    if meta.get("pois_sha1") != version or meta.get("limite_km") != LIMITE_KM:
+        print(f"♻️  Etiquetas de la red '{region}' desactualizadas: recalculando…")
+        etiquetar(region, version)
+        meta = json.loads((destino / "red.json").read_text(encoding="utf-8"))
+    nodos = np.load(destino / "nodos.npy", mmap_mode="r")
+    dist = np.load(destino / "distancias.npy", mmap_mode="r")
+
+    lat = listings["Latitud"].to_numpy(dtype="float64")
+    lon = listings["Longitud"].to_numpy(dtype="float64")
+    ok = np.isfinite(lat) & np.isfinite(lon)
+    cols = {f"dist_red_{c}_km": np.full(len(listings), np.nan) for c in meta["categorias"]}
+    if ok.any():
+        nodo, pegado = _pegar(np.asarray(nodos), lat[ok], lon[ok])
+        valido = pegado <= PEGADO_MAX_KM
+        filas = np.flatnonzero(ok)[valido]
+        for k, c in enumerate(meta["categorias"]):
+            cols[f"dist_red_{c}_km"][filas] = pegado[valido] + dist[nodo[valido], k]
+    return listings.assign(**cols)
+
+
+def _bbox_departamento(departamento: str) -> tuple[float, float, float, float]:
+    """bbox de los inmuebles limpios del departamento (data/processed)."""
+    df = pd.read_parquet(DATA_PROC / "housing_clean.parquet",
+                         columns=["Departamento", "Latitud", "Longitud"])
+    df = df[df["Departamento"].astype(str).str.lower() == departamento.lower()]
+    df = df.dropna(subset=["Latitud", "Longitud"])
+    if df.empty:
+        raise ValueError(f"No hay inmuebles con coordenadas en '{departamento}'")
+    return (float(df["Latitud"].min()), float(df["Latitud"].max()),
+            float(df["Longitud"].min()), float(df["Longitud"].max()))
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Red caminable de OSM → distancias a servicios")
+    p.add_argument("--region", required=True, help="Nombre de la red (carpeta en data/osm/red_peatonal/)")
+    zona = p.add_mutually_exclusive_group()
+    zona.add_argument("--bbox", type=float, nargs=4,
+                      metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"))
+    zona.add_argument("--departamento", help="bbox = el de sus inmuebles (data/processed)")
+    p.add_argument("--pbf", default=None, help="Extract .pbf (por defecto, el primero en data/osm/)")
+    p.add_argument("--solo-etiquetar", action="store_true",
+                   help="No relee el .pbf: recalcula las distancias con los POIs actuales")
+    a = p.parse_args()
+    if a.solo_etiquetar:
+        etiquetar(a.region)
+        return
+    if a.bbox is None and a.departamento is None:
+        p.error("indica --bbox o --departamento")
+    bbox = tuple(a.bbox) if a.bbox else _bbox_departamento(a.departamento)
+    construir(a.region, bbox, a.pbf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Esquema declarado (Arrow) del store maestro.
+
+Un solo lugar define el tipo de cada columna del master:
+  - `id_inmueble` como int64 (la llave; último segmento numérico de la URL).
+  - Coordenadas como float64.
+  - Campos de baja cardinalidad (Publicante, Estado, Estrato, fechas…) como
+    strings con *dictionary encoding* → parquet más chico y lecturas más rápidas.
+  - El resto (títulos, URLs, textos del listado) como string.
+
+La conversión se hace UNA vez, en la frontera de ingesta (`conformar`), y devuelve
+un reporte con los valores que no encajan en el tipo declarado. Al escribir,
+`a_tabla` arma la tabla Arrow con este esquema sin recorrer columna por columna.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable
+
+import pandas as pd
+import pyarrow as pa
+
+from src.raw_io import listas
+
+DICT = pa.dictionary(pa.int32(), pa.string())
+
+MASTER_SCHEMA = pa.schema([
+    ("id_inmueble", pa.int64()),
+    ("Título", pa.string()),
+    ("URL detalle", pa.string()),
+    ("Etiquetas", pa.list_(pa.string())),
+    ("Precio listado", pa.string()),      # texto crudo ("Desde $ 309.900.000"): el
+                                          # scraper incremental lo compara tal cual
+    ("Tipología listado", pa.string()),
+    ("Descripción breve", pa.string()),
+    ("Ubicación listado", DICT),
+    ("Publicante", DICT),
+    ("Porcentaje terminado", DICT),
+    ("Porcentaje vendido", DICT),
+    ("Ocupación", DICT),
+    ("Desarrollador", DICT),
+    ("Cantidad de pisos", DICT),
+    ("Fecha de Finalización", DICT),
+    ("Estado", DICT),
+    ("Estrato", DICT),
+    ("Parqueaderos", DICT),
+    ("Piso", DICT),
+    ("Antiguedad", DICT),
+    ("Area_construida", pa.string()),
+    ("Area_privada", pa.string()),
+    ("Latitud", pa.float64()),
+    ("Longitud", pa.float64()),
+    ("fecha_recoleccion", DICT),
+    ("first_seen", DICT),
+    ("last_seen", DICT),
+    ("_enriquecido", DICT),
+])
+
+# Salida de `preprocesar_datos_finca_raiz` (historia y estado actual de `ingest`).
+# Fijo para que cada tanda de la escritura por streaming tenga el mismo esquema,
+# aunque en una tanda una columna venga toda nula o sin decimales. Las columnas
+# de `CATEGORICAS` van como dictionary (en pandas, categóricas).
+CLEAN_SCHEMA = pa.schema([
+    ("id_inmueble", pa.string()),
+    ("fecha_recoleccion", pa.string()),
+    ("Precio", pa.float64()),
+    ("Título", pa.string()),
+    ("URL detalle", pa.string()),
+    ("Descripción breve", pa.string()),
+    ("Descripción completa", pa.string()),
+    ("Publicante", DICT),
+    ("Habitaciones", pa.float64()),
+    ("Baños", pa.float64()),
+    ("Area_m2", pa.float64()),
+    ("Tipo_propiedad", DICT),
+    ("Ciudad", DICT),
+    ("Departamento", DICT),
+    ("Barrio", DICT),
+    ("Estrato", pa.float64()),
+    ("Parqueaderos", pa.float64()),
+    ("Piso", pa.float64()),
+    ("Antiguedad", pa.string()),
+    ("Estado", DICT),
+    ("Etiquetas", pa.list_(pa.string())),
+    ("Etiqueta_Proyecto", pa.int64()),
+    ("Etiqueta_Destacado", pa.int64()),
+    ("Etiqueta_Nuevo", pa.int64()),
+    ("Etiqueta_Oportunidad", pa.int64()),
+    ("Latitud", pa.float64()),
+    ("Longitud", pa.float64()),
+])
+
+# Baja cardinalidad en la salida limpia: categóricas en memoria, dictionary en
+# parquet → filtros y groupby sobre códigos enteros, no sobre objetos string
+CATEGORICAS = ["Ciudad", "Departamento", "Barrio", "Tipo_propiedad", "Estado", "Publicante"]
+
+
+def tipo_columna(col: str) -> pa.DataType:
+    """Tipo declarado de `col` (las columnas no declaradas se guardan como string)."""
+    i = MASTER_SCHEMA.get_field_index(col)
+    return MASTER_SCHEMA.field(i).type if i >= 0 else pa.string()
+
+
+def esquema_para(columnas: Iterable[str]) -> pa.Schema:
+    """Esquema Arrow para un subconjunto/orden concreto de columnas."""
+    return pa.schema([(c, tipo_columna(c)) for c in columnas])
+
+
+def conformar(df: pd.DataFrame) -> tuple[pd.DataFrame, Dict[str, Dict]]:
+    """Convierte `df` a los tipos declarados del master.
+
+    Devuelve `(df_tipado, reporte)`. El reporte lista, por columna, cuántos
+    valores no nulos no se pudieron convertir (quedan nulos) y algunos ejemplos.
+    Las filas cuyo `id_inmueble` no es numérico se descartan (no tienen llave).
+    """
+    out = {}
+    reporte: Dict[str, Dict] = {}
+    for c in df.columns:
+        s, tipo = df[c], tipo_columna(c)
+        if pa.types.is_integer(tipo):
+            conv = pd.to_numeric(s, errors="coerce").astype("Int64")
+        elif pa.types.is_floating(tipo):
+            conv = pd.to_numeric(s, errors="coerce").astype("float64")
+        elif pa.types.is_list(tipo):
+            conv = listas(s)
+        else:
+            # astype("string") resuelve columnas object con tipos mezclados
+            # (texto + float NaN de los CSV viejos) en una sola pasada vectorizada.
+            conv = s.astype("string")
+        malos = s.notna() & conv.isna()
+        if malos.any():
+            reporte[c] = {"invalidos": int(malos.sum()),
+                          "ejemplos": s[malos].astype(str).unique()[:5].tolist()}
+        out[c] = conv
+
+    tipado = pd.DataFrame(out, index=df.index)
+    if "id_inmueble" in tipado.columns:
+        tipado = tipado[tipado["id_inmueble"].notna()]
+        tipado["id_inmueble"] = tipado["id_inmueble"].astype("int64")
+    return tipado, reporte
+
+
+def decodificar(tabla: pa.Table) -> pa.Table:
+    """Convierte las columnas dictionary a string plano.
+
+    El dictionary encoding es para el disco; en memoria el master se maneja con
+    strings normales (pandas no admite valores nuevos en una categórica con `.at`).
+    """
+    plano = pa.schema([pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type)
+                       else f for f in tabla.schema])
+    return tabla.cast(plano)
+
+
+def a_tabla(df: pd.DataFrame) -> pa.Table:
+    """DataFrame (ya conformado o leído del master) → tabla Arrow con el esquema declarado."""
+    return pa.Table.from_pandas(df, schema=esquema_para(df.columns), preserve_index=False)
+
+
+def a_tabla_limpia(df: pd.DataFrame) -> pa.Table:
+    """Salida de la limpieza → tabla Arrow con `CLEAN_SCHEMA` (columnas ausentes → nulas)."""
+    cols = {}
+    for f in CLEAN_SCHEMA:
+        if f.name not in df.columns:
+            cols[f.name] = pa.nulls(len(df), f.type)
+        elif isinstance(df[f.name].dtype, pd.CategoricalDtype):
+            cols[f.name] = pa.array(df[f.name], from_pandas=True).cast(f.type)
+        elif pa.types.is_string(f.type) or pa.types.is_dictionary(f.type):
+            # Antiguedad/Estado llegan como float NaN si en la tanda son todo nulos
+            texto = pa.array(df[f.name].astype("string"), type=pa.string())
+            cols[f.name] = texto.dictionary_encode() if pa.types.is_dictionary(f.type) else texto
+        elif pa.types.is_list(f.type):
+            cols[f.name] = pa.array(listas(df[f.name]).tolist(), type=f.type)
+        else:
+            cols[f.name] = pa.array(df[f.name], type=f.type, from_pandas=True)
+    return pa.table(cols, schema=CLEAN_SCHEMA)
+
+
+def categorizar(df: pd.DataFrame, columnas: Iterable[str] = CATEGORICAS) -> pd.DataFrame:
+    """Pasa `columnas` (las presentes) a categóricas con categorías ordenadas y
+    sin categorías sin uso → mismo dtype sin importar de dónde venga el frame."""
+    for c in columnas:
+        if c not in df.columns:
+            continue
+        s = df[c]
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        s = s.cat.remove_unused_categories()
+        df[c] = s.cat.reorder_categories(sorted(s.cat.categories))
+    return df
@@ -1,7 +1,8 @@
 """
-Scraper de FincaRaiz → genera CSV en data/raw/.
+Scraper de FincaRaiz → genera snapshots Parquet (o CSV) en data/raw/.
 Uso:
     python -m src.scraper --max-pages 30 --headless
+    python -m src.scraper --format csv      # formato histórico
 """
 
 from __future__ import annotations
@@ -21,6 +22,8 @@ import requests
 from requests.adapters import HTTPAdapter, Retry
 import json
 
+from src.raw_io import FORMATOS, escribir_snapshot
+
 
 # ───────────────────────────────────────── driver ──────────────────────────────────────────
 
@@ -331,11 +334,13 @@ def scrape_multiple_pages(
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--url-file", default="urls_fincaraiz.txt", help="archivo con URLs (una por línea)")
-    parser.add_argument("--out-dir", default="data/raw", help="directorio destino CSV")
+    parser.add_argument("--out-dir", default="data/raw", help="directorio destino de los snapshots")
+    parser.add_argument("--format", choices=FORMATOS, default="parquet",
+                        help="Formato del snapshot: parquet (listas nativas, zstd) o csv")
     parser.add_argument("--max-pages", type=int, default=50)
     parser.add_argument("--delay", type=float, default=0.0)
     parser.add_argument("--headless", action="store_true")
-    parser.add_argument("--overwrite", action="store_true", help="Vuelve a scrapear aunque el CSV exista")
+    parser.add_argument("--overwrite", action="store_true", help="Vuelve a scrapear aunque el snapshot exista")
     parser.add_argument("--workers", type=int, default=8, help="Hilos para detalles en paralelo")
     parser.add_argument("--recycle-every", type=int, default=25,
                         help="Reinicia Chrome cada N URLs para evitar fugas de memoria (0 = nunca)")
@@ -371,10 +376,10 @@ def main() -> None:
         #   .../venta/apartamentos/bogota/bogota-dc -> venta_apartamentos_bogota_bogota-dc
         path = u.split("//", 1)[-1].split("/", 1)[-1] if "//" in u else u
         fname = path.strip("/").replace("/", "_")
-        csv_path = out_dir / f"{fname}.csv"
+        out_path = out_dir / f"{fname}.{args.format}"
 
-        if csv_path.exists() and not args.overwrite:
-            logging.info("⏭️  %s ya existe (%s); omito scraping", fname, csv_path)
+        if out_path.exists() and not args.overwrite:
+            logging.info("⏭️  %s ya existe (%s); omito scraping", fname, out_path)
             continue
 
         # Reciclar Chrome cada N URLs para liberar memoria (evita timeouts del renderer)
@@ -402,12 +407,12 @@ def main() -> None:
 
         df_out = pd.DataFrame(rows)
         df_out["fecha_recoleccion"] = run_date  # fecha en que se recolectó el dato
-        df_out.to_csv(csv_path, index=False, encoding="utf-8")
-        logging.info("✅ %d filas → %s", len(rows), csv_path)
+        escribir_snapshot(df_out, out_path)
+        logging.info("✅ %d filas → %s", len(rows), out_path)
 
     driver.quit()
     # El upsert del master se hace aparte con `python -m src.ingest_master`
-    # (así el job "merge" lo hace una sola vez desde los CSV de todos los deptos).
+    # (así el job "merge" lo hace una sola vez desde los snapshots de todos los deptos).
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+"""
+Escritura/lectura de parquet con un layout físico deliberado.
+
+Todos los parquet del pipeline (master, housing_history, housing_clean del app)
+se escriben igual:
+  - Filas ordenadas por llaves de agrupación (Departamento/Ciudad → id) para que
+    las estadísticas min/max de cada row group sean estrechas.
+  - Compresión zstd y row groups de tamaño acotado (`FILAS_POR_GRUPO`).
+  - Estadísticas por columna + page index.
+  - Bloom filter sobre `id_inmueble` (búsqueda puntual de un id).
+
+Así, un lector que filtra una ciudad o busca un id solo toca los row groups que
+pueden contenerlo (`leer_parquet(..., filtros=[("Ciudad", "==", "Cali")])`).
+Para salidas más grandes que la memoria, `EscritorParquet` escribe con las mismas
+opciones por tandas (el llamador entrega las tandas ya en orden).
+Comparativa contra el layout anterior: `python -m src.benchmarks layout`.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+COMPRESION = "zstd"
+NIVEL_ZSTD = 6              # buen punto tamaño/velocidad; la lectura no se penaliza
+FILAS_POR_GRUPO = 16_384    # grupos chicos → poda fina por ciudad/id sin inflar metadatos
+ID_COL = "id_inmueble"
+FPP_BLOOM = 0.01
+
+
+def ordenar(df: pd.DataFrame, orden: Sequence[str]) -> pd.DataFrame:
+    """Ordena por las columnas de `orden` presentes (estable, nulos al final)."""
+    cols = [c for c in orden if c in df.columns]
+    if not cols:
+        return df
+    return df.sort_values(cols, kind="stable", na_position="last", ignore_index=True)
+
+
+def _opciones(nombres: Sequence[str], orden: Sequence[str], filas: int) -> dict:
+    """Opciones de escritura del layout para columnas `nombres` (~`filas` por grupo)."""
+    nombres = list(nombres)
+    cols = [c for c in orden if c in nombres]
+    opciones = dict(
+        compression=COMPRESION,
+        compression_level=NIVEL_ZSTD,
+        write_statistics=True,
+        write_page_index=True,
+        sorting_columns=[pq.SortingColumn(nombres.index(c)) for c in cols] or None,
+    )
+    if ID_COL in nombres:
+        ndv = max(1, filas)   # el filtro es por row group
+        opciones["bloom_filter_options"] = {ID_COL: {"ndv": ndv, "fpp": FPP_BLOOM}}
+    return opciones
+
+
+def escribir_parquet(datos: pd.DataFrame | pa.Table, path: Path, *,
+                     orden: Sequence[str] = (),
+                     filas_por_grupo: int = FILAS_POR_GRUPO) -> None:
+    """Escribe `datos` en `path` con el layout del pipeline.
+
+    Si `datos` es un DataFrame se ordena por `orden` antes de escribir; una tabla
+    Arrow se asume ya ordenada (el llamador decide y declara `orden`).
+    """
+    if isinstance(datos, pd.DataFrame):
+        datos = pa.Table.from_pandas(ordenar(datos, orden), preserve_index=False)
+    opciones = _opciones(datos.column_names, orden, min(len(datos), filas_por_grupo))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        pq.write_table(datos, path, row_group_size=filas_por_grupo, **opciones)
+    except TypeError:
+        # pyarrow sin soporte de Bloom filters al escribir: mismo layout sin el filtro
+        opciones.pop("bloom_filter_options", None)
+        pq.write_table(datos, path, row_group_size=filas_por_grupo, **opciones)
+
+
+class EscritorParquet:
+    """`ParquetWriter` con el layout del pipeline, para escribir por tandas.
+
+    Cada `escribir(tabla)` añade row groups de hasta `filas_por_grupo` filas; el
+    orden global (`orden`) es responsabilidad del llamador.
+
+        with EscritorParquet(path, esquema, orden=["Ciudad"]) as w:
+            for t in tandas:
+                w.escribir(t)
+    """
+
+    def __init__(self, path: Path, esquema: pa.Schema, *, orden: Sequence[str] = (),
+                 filas_por_grupo: int = FILAS_POR_GRUPO):
+        self.path = Path(path)
+        self.esquema = esquema
+        self.filas_por_grupo = filas_por_grupo
+        self.filas = 0
+        opciones = _opciones(esquema.names, orden, filas_por_grupo)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._w = pq.ParquetWriter(self.path, esquema, **opciones)
+        except TypeError:
+            opciones.pop("bloom_filter_options", None)
+            self._w = pq.ParquetWriter(self.path, esquema, **opciones)
+
+    def escribir(self, datos: pd.DataFrame | pa.Table) -> None:
+        if isinstance(datos, pd.DataFrame):
+            datos = pa.Table.from_pandas(datos, schema=self.esquema, preserve_index=False)
+        if datos.num_rows:
+            self._w.write_table(datos.cast(self.esquema), row_group_size=self.filas_por_grupo)
+            self.filas += datos.num_rows
+
+    def cerrar(self) -> None:
+        self._w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def leer_parquet(path: Path, columnas: Sequence[str] | None = None,
+                 filtros: list | None = None) -> pd.DataFrame:
+    """Lee `path` empujando proyección (`columnas`) y predicados (`filtros`,
+    formato DNF de pyarrow) al lector → solo se decodifican los row groups útiles."""
+    return pq.read_table(path, columns=list(columnas) if columnas else None,
+                         filters=filtros).to_pandas()
@@ -0,0 +1,310 @@
+"""
+Generador de datos sintéticos con la forma de los snapshots crudos del scraper.
+
+Produce frames con las mismas columnas y formatos de texto que data/raw/ para
+medir cómo escala el pipeline (100k, 1M, 10M filas…):
+  - Tipología en sus variantes ("3 Habs. 2 Baños 80 m²", "1 Hab 1 Baño 27 m²",
+    "2 Ambientes 1 Baño 85.78 m²", "1400 m²").
+  - Ubicación "Apartamento enCali, Valle del cauca" (Bogotá con tres partes).
+  - Precios "$ 450.000.000" / "Desde $ 207.800.000" (proyectos) y algunos nulos.
+  - Etiquetas como listas, ficha técnica con "¡Pregúntale!", coordenadas.
+  - Historia de varias fechas: en cada corrida se dan de baja y aparecen
+    inmuebles (`rotacion`) y una fracción cambia de precio (`repreciados`).
+
+El inventario vive como arreglos numpy (códigos); los strings se materializan
+por fecha y ciudad, así 10M filas no necesitan todo el texto en memoria a la vez.
+
+Uso:
+    python -m src.synthetic --filas 1000000 --fechas 5 --out /tmp/raw_sintetico
+    python -m src.synthetic --filas 100000 --formato csv --out /tmp/raw_csv
+"""
+from __future__ import annotations
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.raw_io import FORMATOS, escribir_snapshot
+
+# (ciudad, texto de departamento como lo muestra el portal, lat, lon, peso)
+CIUDADES = [
+    ("Bogotá", "Bogotá, d.c.", 4.65, -74.08, 20), ("Medellín", "Antioquia", 6.24, -75.58, 12),
+    ("Cali", "Valle del cauca", 3.43, -76.52, 10), ("Barranquilla", "Atlantico", 10.98, -74.80, 7),
+    ("Cartagena", "Bolivar", 10.40, -75.51, 6), ("Bucaramanga", "Santander", 7.12, -73.12, 5),
+    ("Pereira", "Risaralda", 4.81, -75.69, 4), ("Manizales", "Caldas", 5.07, -75.51, 3),
+    ("Cúcuta", "Norte de santander", 7.89, -72.50, 3), ("Ibagué", "Tolima", 4.44, -75.23, 3),
+    ("Villavicencio", "Meta", 4.14, -73.63, 3), ("Santa Marta", "Magdalena", 11.24, -74.20, 3),
+    ("Armenia", "Quindio", 4.53, -75.68, 2), ("Neiva", "Huila", 2.93, -75.28, 2),
+    ("Pasto", "Nariño", 1.21, -77.28, 2), ("Montería", "Cordoba", 8.75, -75.88, 2),
+    ("Popayán", "Cauca", 2.44, -76.61, 1), ("Tunja", "Boyaca", 5.53, -73.36, 1),
+    ("Valledupar", "Cesar", 10.46, -73.25, 1), ("Envigado", "Antioquia", 6.17, -75.59, 2),
+    ("Chía", "Cundinamarca", 4.86, -74.06, 1), ("Palmira", "Valle del cauca", 3.54, -76.30, 1),
+]
+
+# (tipo, peso, tiene habitaciones, precio base por m² en millones)
+TIPOS = [
+    ("Apartamento", 55, True, 5.0), ("Casa", 18, True, 3.8), ("Apartaestudio", 5, True, 6.0),
+    ("Lote", 5, False, 0.8), ("Oficina", 4, False, 5.5), ("Local Comercial", 4, False, 6.5),
+    ("Bodega", 2, False, 2.5), ("Casa Campestre", 3, True, 3.0), ("Finca", 1, False, 0.5),
+    ("Edificio", 1, False, 4.0), ("Consultorio", 1, False, 6.0), ("Casa Lote", 1, True, 2.0),
+]
+
+ETIQUETAS = ["Proyecto", "Destacado", "Nuevo", "Oportunidad", "Precio negociable",
+             "Vista exterior", "Piscina", "Conjunto cerrado", "Estrenar", "Remodelado"]
+
+PREFIJOS = ["El", "La", "Los", "San", "Santa", "Villa", "Nuevo", "Alto", "Jardines de",
+            "Portal de", "Ciudad", "Bosques de", "Altos de", "Mirador de"]
+NOMBRES = ["Poblado", "Prado", "Bosque", "Rosal", "Lago", "Castillo", "Recreo", "Country",
+           "Cedro", "Salitre", "Laureles", "Belén", "Cabecera", "Centro", "Norte", "Sur",
+           "Palmas", "Pinares", "Granada", "Normandía", "Chicó", "Lili", "Ingenio", "Limonar"]
+PREGUNTALE = "¡Pregúntale!"
+FICHA_NULA = 0.85           # fracción sin ficha técnica (como en los datos reales)
+
+
+def _slug(s: pd.Series) -> pd.Series:
+    return (s.str.lower().str.normalize("NFKD").str.encode("ascii", "ignore")
+             .str.decode("ascii").str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-"))
+
+
+def _miles(v: np.ndarray) -> np.ndarray:
+    """Enteros → "450.000.000", formateando cada valor distinto una vez."""
+    u, inv = np.unique(v, return_inverse=True)
+    return np.array([f"{x:,}".replace(",", ".") for x in u], dtype=object)[inv]
+
+
+class Inventario:
+    """Inventario sintético: cada inmueble es una posición en arreglos numpy."""
+
+    def __init__(self, semilla: int = 0, barrios_por_ciudad: int = 60):
+        self.rng = np.random.default_rng(semilla)
+        self.barrios = []          # (ciudad_idx, nombre)
+        for ci, _ in enumerate(CIUDADES):
+            nombres = {f"{self.rng.choice(PREFIJOS)} {self.rng.choice(NOMBRES)}"
+                       for _ in range(barrios_por_ciudad * 2)}
+            self.barrios += [(ci, n) for n in sorted(nombres)[:barrios_por_ciudad]]
+        self.barrio_ciudad = np.array([c for c, _ in self.barrios])
+        self.siguiente_id = 190_000_000
+        self.cols = {k: np.empty(0, dtype=t) for k, t in [
+            ("id", np.int64), ("barrio", np.int32), ("tipo", np.int8), ("habs", np.int8),
+            ("banos", np.int8), ("area", np.float64), ("precio", np.int64),
+            ("proyecto", bool), ("publicante", np.int32), ("etiquetas", np.int16),
+            ("estrato", np.int8), ("lat", np.float64), ("lon", np.float64)]}
+
+    def __len__(self) -> int:
+        return len(self.cols["id"])
+
+    def altas(self, n: int) -> None:
+        """Añade `n` inmuebles nuevos."""
+        r = self.rng
+        pesos_c = np.array([c[4] for c in CIUDADES], float)
+        ciudad = r.choice(len(CIUDADES), n, p=pesos_c / pesos_c.sum())
+        # barrio al azar dentro de la ciudad
+        inicio = np.searchsorted(self.barrio_ciudad, ciudad)
+        fin = np.searchsorted(self.barrio_ciudad, ciudad, side="right")
+        barrio = (inicio + (r.random(n) * (fin - inicio)).astype(int)).astype(np.int32)
+        pesos_t = np.array([t[1] for t in TIPOS], float)
+        tipo = r.choice(len(TIPOS), n, p=pesos_t / pesos_t.sum()).astype(np.int8)
+        con_habs = np.array([t[2] for t in TIPOS])[tipo]
+        habs = np.where(con_habs, r.integers(1, 6, n), 0).astype(np.int8)
+        banos = np.clip(habs - r.integers(0, 2, n), 1, None).astype(np.int8)
+        area = np.round(r.lognormal(np.log(40 + 25 * habs.astype(float)), 0.35), 0)
+        decimales = r.random(n) < 0.25
+        area[decimales] += np.round(r.random(decimales.sum()), 2)
+        m2 = np.array([t[3] for t in TIPOS])[tipo] * r.lognormal(0, 0.3, n)
+        precio = (np.round(area * m2, 0) * 1_000_000).astype(np.int64)
+        proyecto = r.random(n) < 0.15
+        precio[proyecto] += r.integers(0, 999, proyecto.sum()) * 1_000   # "Desde $ 207.800.000"
+        publicante = np.where(r.random(n) < 0.6, -1, r.integers(0, 2000, n)).astype(np.int32)
+        etiquetas = np.zeros(n, np.int16)
+        for i in range(len(ETIQUETAS)):
+            etiquetas |= ((r.random(n) < 0.08) << i).astype(np.int16)
+        etiquetas[proyecto] |= 1
+        estrato = np.where(r.random(n) < FICHA_NULA, 0, r.integers(1, 7, n)).astype(np.int8)
+        lat = np.array([c[2] for c in CIUDADES])[ciudad] + r.normal(0, 0.04, n)
+        lon = np.array([c[3] for c in CIUDADES])[ciudad] + r.normal(0, 0.04, n)
+        ids = np.arange(self.siguiente_id, self.siguiente_id + n, dtype=np.int64)
+        self.siguiente_id += n
+        nuevos = dict(id=ids, barrio=barrio, tipo=tipo, habs=habs, banos=banos, area=area,
+                      precio=precio, proyecto=proyecto, publicante=publicante,
+                      etiquetas=etiquetas, estrato=estrato, lat=lat, lon=lon)
+        self.cols = {k: np.concatenate([self.cols[k], v.astype(self.cols[k].dtype)])
+                     for k, v in nuevos.items()}
+
+    def bajas(self, fraccion: float) -> None:
+        """Da de baja (vendidos/retirados) una `fraccion` del inventario."""
+        queda = self.rng.random(len(self)) >= fraccion
+        self.cols = {k: v[queda] for k, v in self.cols.items()}
+
+    def repreciar(self, fraccion: float) -> None:
+        """Cambia el precio de una `fraccion` del inventario (±2–10 %, redondeado)."""
+        cambia = self.rng.random(len(self)) < fraccion
+        factor = 1 + self.rng.choice([-1, 1], cambia.sum()) * self.rng.uniform(.02, .10, cambia.sum())
+        self.cols["precio"][cambia] = (np.round(self.cols["precio"][cambia] * factor / 1e6)
+                                       * 1e6).astype(np.int64)
+
+    def materializar(self, fecha: str, filas: np.ndarray | None = None,
+                     descripcion: bool = True) -> pd.DataFrame:
+        """Frame crudo (columnas y formatos del scraper) de las `filas` indicadas."""
+        c = {k: v if filas is None else v[filas] for k, v in self.cols.items()}
+        n = len(c["id"])
+        r = np.random.default_rng(int(c["id"][0]) if n else 0)   # estable por tanda
+
+        # Textos que dependen solo de (barrio, tipo): se arman una vez por combinación
+        llave = c["barrio"].astype(np.int64) * len(TIPOS) + c["tipo"]
+        combos, pos = np.unique(llave, return_inverse=True)
+        b, t = combos // len(TIPOS), combos % len(TIPOS)
+        ci = self.barrio_ciudad[b]
+        tipo_u = pd.Series(np.array([x[0] for x in TIPOS], dtype=object)[t])
+        barrio_u = pd.Series(np.array([x for _, x in self.barrios], dtype=object)[b])
+        ciudad_u = pd.Series(np.array([x[0] for x in CIUDADES], dtype=object)[ci])
+        depto_u = pd.Series(np.array([x[1] for x in CIUDADES], dtype=object)[ci])
+        titulo_u = tipo_u + " en Venta en " + barrio_u + ", " + ciudad_u
+
+        def por_combo(s):
+            return pd.Series(s.to_numpy(dtype=object)[pos])
+
+        titulo = por_combo(titulo_u)
+        breve = por_combo(titulo_u.str.lower())
+        ubicacion = por_combo(tipo_u + " en" + ciudad_u + ", " + depto_u)
+        ids = pd.Series(c["id"]).astype(str)
+        ruta = np.where(c["proyecto"], "proyectos-vivienda/", "")
+        url = ("https://www.fincaraiz.com.co/" + pd.Series(ruta)
+               + por_combo(_slug(titulo_u.str.lower())) + "/" + ids)
+
+        # Tipología en sus variantes
+        habs, banos = pd.Series(c["habs"]).astype(str), pd.Series(c["banos"]).astype(str)
+        area = pd.Series(np.where(c["area"] % 1 == 0, c["area"].astype(np.int64).astype(str),
+                                  c["area"].round(2).astype(str)))
+        plural_h = np.where(c["habs"] == 1, " Hab ", " Habs. ")
+        plural_b = np.where(c["banos"] == 1, " Baño ", " Baños ")
+        con_habs = habs + plural_h + banos + plural_b + area + " m²"
+        ambientes = habs + " Ambientes " + banos + plural_b + area + " m²"
+        tipologia = np.where(c["habs"] == 0, area + " m²",
+                             np.where(r.random(n) < 0.03, ambientes, con_habs))
+
+        precio = "$ " + pd.Series(_miles(c["precio"]))
+        precio = precio.where(~c["proyecto"], "Desde " + precio)
+        precio[r.random(n) < 0.005] = None
+
+        por_mascara = np.empty(1 << len(ETIQUETAS), dtype=object)
+        for m in range(len(por_mascara)):
+            por_mascara[m] = [e for i, e in enumerate(ETIQUETAS) if m >> i & 1]
+        ficha = r.random(n) >= FICHA_NULA
+
+        def sin_ficha(v):
+            return np.where(ficha, v, None)
+
+        df = pd.DataFrame({
+            "Título": titulo,
+            "URL detalle": url,
+            "id_inmueble": ids,
+            "URL imagen": "https://cdn4.fincaraiz.com.co/repo/img/th.outside384x275." + ids + ".jpg",
+            "Etiquetas": por_mascara[c["etiquetas"]],
+            "Precio listado": precio,
+            "Tipología listado": tipologia,
+            "Descripción breve": breve,
+            "Ubicación listado": ubicacion,
+            "Publicante": np.where(c["publicante"] < 0, None,
+                                   "Inmobiliaria " + pd.Series(c["publicante"]).astype(str)),
+            "Acción disponible": "Llamar",
+            "Porcentaje terminado": sin_ficha(PREGUNTALE),
+            "Porcentaje vendido": sin_ficha(PREGUNTALE),
+            "Ocupación": sin_ficha(PREGUNTALE),
+            "Desarrollador": sin_ficha(PREGUNTALE),
+            "Estado": sin_ficha(np.array(["Sobre planos", "En construcción", "Nuevos",
+                                          PREGUNTALE], dtype=object)[r.integers(0, 4, n)]),
+            "Parqueaderos": sin_ficha(np.where(r.random(n) < .8, PREGUNTALE,
+                                               r.integers(1, 4, n).astype(str))),
+            "Financiación": sin_ficha(PREGUNTALE),
+            "Formas de pago": sin_ficha(PREGUNTALE),
+            "Cuota inicial": sin_ficha("30% CUOTA INICIAL"),
+            "Cantidad de pisos": sin_ficha(PREGUNTALE),
+            "Aplica subsidio": sin_ficha(PREGUNTALE),
+            "Fecha de Finalización": sin_ficha(r.integers(2026, 2031, n).astype(str)),
+            "Estrato": np.where(c["estrato"] > 0, c["estrato"].astype(str), None),
+            "Latitud": c["lat"].round(6),
+            "Longitud": c["lon"].round(6),
+            "fecha_recoleccion": fecha,
+        })
+        if descripcion:
+            df.insert(df.columns.get_loc("Estrato") + 1, "Descripción completa",
+                      titulo + ". Inmueble de " + area + " m² con " + habs + " habitaciones y "
+                      + banos + " baños, cerca a vías principales, comercio y transporte. "
+                      + "Excelente ubicación en " + por_combo(barrio_u) + ".")
+        return df
+
+    def por_ciudad(self) -> List[Tuple[int, np.ndarray]]:
+        """Índices del inventario agrupados por ciudad (una tanda por archivo)."""
+        ci = self.barrio_ciudad[self.cols["barrio"]]
+        orden = np.argsort(ci, kind="stable")
+        cortes = np.flatnonzero(np.diff(ci[orden])) + 1
+        return [(int(ci[g[0]]), g) for g in np.split(orden, cortes) if len(g)]
+
+
+def historia(filas: int, fechas: int = 5, rotacion: float = 0.05, repreciados: float = 0.03,
+             semilla: int = 0, inicio: str = "2026-01-01",
+             dias_entre: int = 7) -> Iterator[Tuple[str, Inventario]]:
+    """Recorre `fechas` corridas con ~`filas` filas en total.
+
+    Entre corridas se da de baja `rotacion` del inventario, entra la misma
+    cantidad de inmuebles nuevos y `repreciados` cambia de precio. Devuelve
+    (fecha, inventario) con el inventario en el estado de esa corrida.
+    """
+    inv = Inventario(semilla)
+    inv.altas(max(1, filas // fechas))
+    dia = date.fromisoformat(inicio)
+    for k in range(fechas):
+        if k:
+            n = len(inv)
+            inv.bajas(rotacion)
+            inv.altas(n - len(inv))
+            inv.repreciar(repreciados)
+        yield (dia + timedelta(days=k * dias_entre)).isoformat(), inv
+
+
+def frame(filas: int, fechas: int = 1, semilla: int = 0, descripcion: bool = True,
+          **kw) -> pd.DataFrame:
+    """Todas las corridas en un solo frame crudo (para tamaños que caben en memoria)."""
+    return pd.concat([inv.materializar(f, descripcion=descripcion)
+                      for f, inv in historia(filas, fechas, semilla=semilla, **kw)],
+                     ignore_index=True)
+
+
+def escribir_raw(raiz: Path, filas: int, fechas: int = 5, formato: str = "parquet",
+                 semilla: int = 0, descripcion: bool = True, **kw) -> List[Path]:
+    """Escribe la historia como data/raw: <raiz>/<fecha>/venta_<ciudad>_<depto>.<formato>."""
+    raiz = Path(raiz)
+    escritos = []
+    for fecha, inv in historia(filas, fechas, semilla=semilla, **kw):
+        (raiz / fecha).mkdir(parents=True, exist_ok=True)
+        for ci, idx in inv.por_ciudad():
+            ciudad, depto = CIUDADES[ci][0], CIUDADES[ci][1].split(",")[0]
+            nombre = "_".join(_slug(pd.Series([ciudad, depto])))
+            path = raiz / fecha / f"venta_{nombre}.{formato}"
+            escribir_snapshot(inv.materializar(fecha, idx, descripcion), path)
+            escritos.append(path)
+    return escritos
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Snapshots crudos sintéticos")
+    p.add_argument("--filas", type=int, default=100_000, help="Filas totales (todas las fechas)")
+    p.add_argument("--fechas", type=int, default=5)
+    p.add_argument("--rotacion", type=float, default=0.05)
+    p.add_argument("--repreciados", type=float, default=0.03)
+    p.add_argument("--formato", choices=FORMATOS, default="parquet")
+    p.add_argument("--semilla", type=int, default=0)
+    p.add_argument("--sin-descripcion", action="store_true",
+                   help="Omite 'Descripción completa' (archivos más livianos)")
+    p.add_argument("--out", type=Path, required=True)
+    a = p.parse_args()
+    files = escribir_raw(a.out, a.filas, a.fechas, a.formato, a.semilla,
+                         not a.sin_descripcion, rotacion=a.rotacion, repreciados=a.repreciados)
+    print(f"✅ {len(files)} snapshots sintéticos → {a.out}")
+
+
+if __name__ == "__main__":
+    main()
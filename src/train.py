@@ -1,5 +1,6 @@
 # streamlit_dashboard.py
 # src/train.py
+import argparse
 import joblib, pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -12,19 +13,46 @@ from src.config import DATA_PROC, MODEL_DIR
 TARGET = "Precio"
 
 def main():
-    df = pd.read_parquet(DATA_PROC / "housing_clean.parquet")
+    p = argparse.ArgumentParser(description="Entrena el modelo de precio")
+    p.add_argument("--servicios", action="store_true",
+                   help="Añade las features de servicios cercanos de OSM (src/osm_pois.py); "
+                        "el modelo resultante las exige al predecir")
+    p.add_argument("--etiquetas", action="store_true",
+                   help="Añade una columna 0/1 por CADA etiqueta del dataset (multi-hot de "
+                        "`codificar_etiquetas`), no solo las 4 comunes")
+    args = p.parse_args()
 
     num_cols = ["Area_m2", "Habitaciones", "Baños"]
     cat_cols = ["Tipo_propiedad", "Ciudad", "Departamento",
                 "Etiqueta_Proyecto", "Etiqueta_Destacado",
                 "Etiqueta_Nuevo", "Etiqueta_Oportunidad"]
+    # Solo las columnas del modelo (la descripción y demás texto ni se leen)
+    extra = ["id_inmueble", "Latitud", "Longitud"] if args.servicios else []
+    extra += ["Etiquetas"] if args.etiquetas else []
+    df = pd.read_parquet(DATA_PROC / "housing_clean.parquet",
+                         columns=num_cols + cat_cols + [TARGET] + extra)
+    if args.servicios:
+        # Desde la tabla lateral: solo se calculan los inmuebles que no estén
+        from src.osm_pois import COLUMNA_SERVICIO, con_servicios
+        df = con_servicios(df)
+        num_cols += [c for c in df.columns if COLUMNA_SERVICIO.match(c)]
+    tag_cols = []
+    if args.etiquetas:
+        # Vocabulario de todo el dataset; las 4 comunes ya vienen como Etiqueta_*
+        from src.preprocessing import ETIQUETAS_COMUNES, codificar_etiquetas
+        matriz, vocabulario = codificar_etiquetas(df["Etiquetas"])
+        otras = [i for i, t in enumerate(vocabulario) if t not in ETIQUETAS_COMUNES]
+        tag_cols = [f"Etiqueta_{vocabulario[i]}" for i in otras]
+        df = pd.concat([df, pd.DataFrame(matriz[:, otras].toarray(), columns=tag_cols,
+                                         index=df.index)], axis=1)
 
-    X = df[num_cols + cat_cols]
+    X = df[num_cols + cat_cols + tag_cols]
     y = df[TARGET]
 
     pre = ColumnTransformer([
         ("num", StandardScaler(), num_cols),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols)
+        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
+        ("tags", "passthrough", tag_cols)
     ])
 
     model = RandomForestRegressor(n_estimators=200, random_state=42)
@@ -18,37 +18,47 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import folium
 from folium.plugins import HeatMap, FastMarkerCluster, Fullscreen, MiniMap
 from branca.colormap import LinearColormap
 
 from src.config import DATA_RAW, BASE_DIR
-from src.preprocessing import preprocesar_datos_finca_raiz
+from src.preprocessing import preprocesar_datos_finca_raiz, columnas_crudas
+from src.raw_io import leer_raw, listar_raw
 
 # Paleta verde → rojo (barato → caro) para el precio por m²
 PALETA = ["#1a9850", "#66bd63", "#a6d96a", "#fee08b", "#fc8d59", "#d73027"]
 
+# Columnas que usa el mapa (proyección al leer)
+COLUMNAS = ["Ciudad", "Barrio", "Latitud", "Longitud", "Precio", "Area_m2",
+            "Habitaciones", "Baños", "Título", "Tipo_propiedad", "URL detalle"]
+
 
 def _cargar_todo() -> pd.DataFrame:
     """Devuelve el dataset limpio. Prefiere el parquet curado (rápido, y en CI
-    no hay CSV crudos); si no existe, lee y limpia todos los CSV de data/raw."""
+    no hay snapshots crudos); si no existe, lee y limpia todo data/raw."""
     parquets = [BASE_DIR / "data" / "app" / "housing_clean.parquet",
                 BASE_DIR / "data" / "processed" / "housing_clean.parquet"]
     p = next((q for q in parquets if q.exists()), None)
     if p is not None:
-        return pd.read_parquet(p)
+        return pd.read_parquet(p, columns=[c for c in COLUMNAS if c in pq.read_schema(p).names])
 
-    files = sorted(Path(DATA_RAW).rglob("*.csv"))
+    files = listar_raw(DATA_RAW)
     if not files:
-        raise FileNotFoundError(f"No hay parquet curado ni CSV en {DATA_RAW}")
-    return preprocesar_datos_finca_raiz(pd.concat([pd.read_csv(f) for f in files],
-                                                  ignore_index=True))
+        raise FileNotFoundError(f"No hay parquet curado ni snapshots en {DATA_RAW}")
+    # Solo las columnas crudas de las que salen COLUMNAS (sin descripción ni ficha)
+    return preprocesar_datos_finca_raiz(leer_raw(files, columnas_crudas(COLUMNAS)))
 
 
 def cargar_ciudad(ciudad: str) -> pd.DataFrame:
     """Deja solo la ciudad pedida con geo válida y precio/m² saneado."""
     df = _cargar_todo()
-    df = df[df["Ciudad"].str.contains(ciudad, case=False, na=False)].copy()
+    # Coincidencia sobre las categorías (pocas) y filtro por código, no fila a fila
+    ciudades = df["Ciudad"].astype("category")
+    cats = ciudades.cat.categories
+    df = df[ciudades.isin(cats[cats.str.contains(ciudad, case=False)])].copy()
+    df["Barrio"] = df["Barrio"].astype("category").cat.remove_unused_categories()
     for c in ["Latitud", "Longitud", "Precio", "Area_m2", "Habitaciones", "Baños"]:
         df[c] = pd.to_numeric(df[c], errors="coerce")
     df = df.dropna(subset=["Latitud", "Longitud", "Precio", "Area_m2"])
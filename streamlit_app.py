@@ -1,12 +1,15 @@
 """
 Dashboard comercial de inteligencia inmobiliaria (100% descriptivo).
 
-Dos vistas pensadas para el equipo comercial de una inmobiliaria:
+Tres vistas pensadas para el equipo comercial de una inmobiliaria:
   1. 📍 Precio por zona  → dónde está lo caro/barato por m² en la ciudad.
   2. ⚖️ Comparador       → "esta propiedad vs. el mercado de su barrio".
+  3. 📈 Tendencia        → precio/m² y altas/bajas por fecha.
 
-Lee un parquet ya curado (data/app/housing_clean.parquet). Pensado para
-desplegar en Streamlit Community Cloud.
+Lee un parquet ya curado (data/app/housing_clean.parquet) y, para la tendencia,
+el índice de mercado materializado (src/indice_mercado.py): la serie es una
+consulta al índice, no un recálculo sobre las filas. Pensado para desplegar en
+Streamlit Community Cloud.
 """
 from pathlib import Path
 import numpy as np
@@ -14,6 +17,9 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from src import indice_mercado as IM
+from src.schema import CATEGORICAS
+
 st.set_page_config(page_title="Inteligencia Inmobiliaria", page_icon="🏙️", layout="wide")
 
 ESCALA = "RdYlGn_r"  # verde = barato · rojo = caro
@@ -32,9 +38,25 @@ def cargar() -> pd.DataFrame:
     df = df.dropna(subset=["Precio", "Area_m2"])
     df = df[(df["Area_m2"] > 10) & (df["Precio"] > 1e7)]
     df["precio_m2"] = df["Precio"] / df["Area_m2"]
+    # Baja cardinalidad (schema.CATEGORICAS) → categóricas: filtros (==) y groupby
+    # sobre códigos enteros y mucha menos memoria por sesión
+    for c in CATEGORICAS:
+        if c in df.columns:   # no-op si ya viene como dictionary
+            df[c] = df[c].astype("category").cat.remove_unused_categories()
     return df
 
 
+@st.cache_data(show_spinner=False)
+def serie_mercado(ciudad: str, tipo: str | None) -> pd.DataFrame:
+    """Serie por fecha de la ciudad (y tipo) desde el índice; vacía si no hay índice."""
+    if not IM.INDICE_PATH.exists():
+        return pd.DataFrame()
+    idx = IM.cargar(ciudad)
+    if tipo:
+        idx = idx[idx["Tipo_propiedad"] == tipo]
+    return IM.resumir(idx, por=["fecha"])
+
+
 def formato_cop(x: float) -> str:
     return f"${x:,.0f}".replace(",", ".")
 
@@ -64,7 +86,7 @@ st.sidebar.caption("Precio/m² en millones de COP. Se recortan outliers (1%–99
 
 st.title(f"Mercado de vivienda — {ciudad}")
 
-tab_zona, tab_comp = st.tabs(["📍 Precio por zona", "⚖️ Comparador"])
+tab_zona, tab_comp, tab_tend = st.tabs(["📍 Precio por zona", "⚖️ Comparador", "📈 Tendencia"])
 
 # ─────────────────────────────── VISTA 1: por zona ──────────────────────────────
 with tab_zona:
@@ -94,12 +116,13 @@ with tab_zona:
         st.plotly_chart(fig, width='stretch')
 
     st.subheader("Precio por m² según barrio")
-    por_barrio = (d.groupby("Barrio")
+    por_barrio = (d.groupby("Barrio", observed=True)
                     .agg(avisos=("Precio", "size"),
                          precio_m2_M=("precio_m2", lambda s: s.median() / 1e6),
                          precio_mediano=("Precio", "median"),
                          area_mediana=("Area_m2", "median"))
-                    .reset_index())
+                    .reset_index()
+                    .astype({"Barrio": str}))
     por_barrio = por_barrio[por_barrio["avisos"] >= 5].sort_values("precio_m2_M", ascending=False)
 
     colg, colt = st.columns([3, 2])
@@ -189,4 +212,31 @@ with tab_comp:
                  hide_index=True, width='stretch',
                  column_config={"URL detalle": st.column_config.LinkColumn("Aviso", display_text="Ver ↗")})
 
+# ─────────────────────────────── VISTA 3: tendencia ─────────────────────────────
+with tab_tend:
+    serie = serie_mercado(ciudad, None if tipo_sel == "(todos)" else tipo_sel)
+    if len(serie) < 2:
+        st.info("Aún no hay suficientes fechas en el índice de mercado "
+                "(se llena con cada corrida diaria).")
+    else:
+        serie = serie.assign(fecha=pd.to_datetime(serie["fecha"]))
+        m = serie.melt(id_vars="fecha", value_vars=["precio_m2_p25", "precio_m2_mediana",
+                                                     "precio_m2_p75"],
+                       var_name="Cuantil", value_name="Precio/m²")
+        m["Precio/m²"] = m["Precio/m²"] / 1e6
+        m["Cuantil"] = m["Cuantil"].str.replace("precio_m2_", "")
+        fig4 = px.line(m, x="fecha", y="Precio/m²", color="Cuantil", markers=True, height=360,
+                       labels={"Precio/m²": "Precio/m² (M COP)", "fecha": ""})
+        fig4.update_layout(margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig4, width='stretch')
+
+        flujo = serie.melt(id_vars="fecha", value_vars=["nuevos", "no_vistos"],
+                           var_name="Evento", value_name="Avisos")
+        fig5 = px.bar(flujo, x="fecha", y="Avisos", color="Evento", barmode="group",
+                      height=280, labels={"fecha": ""})
+        fig5.update_layout(margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig5, width='stretch')
+        st.caption(f"Avisos vigentes = vistos en los últimos {IM.VENTANA_DIAS} días. "
+                   "Cuantiles aproximados (±1%) al agregar barrios.")
+
 st.caption("Demostración con fines ilustrativos · datos de fuentes públicas · sin modelado predictivo.")
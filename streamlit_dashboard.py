@@ -11,6 +11,7 @@ import pandas as pd
 import numpy as np
 import re
 import os
+import ast
 
 def preprocesar_datos_finca_raiz(df):
     """
@@ -132,8 +133,8 @@ def preprocesar_datos_finca_raiz(df):
             return []
         
         try:
-            # Convertir string de lista a lista real
-            return eval(etiquetas_str)
+            # Convertir string de lista a lista real (literal_eval: sin ejecutar código)
+            return ast.literal_eval(etiquetas_str)
         except:
             # Manejar formato incorrecto
             return [x.strip() for x in etiquetas_str.strip("[]").split(',')]
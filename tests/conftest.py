@@ -0,0 +1,45 @@
+"""
+Fixtures comunes: todas las rutas de datos de los módulos apuntan a un
+directorio temporal (como `benchmarks._redirigir`), así los tests nunca tocan
+data/ del repo. Los datos salen de `src.synthetic`.
+"""
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from src import (build_app_dataset, eventos, indice_mercado, ingest, ingest_master,
+                 master, osm_pois, preprocessing)
+
+
+@pytest.fixture
+def datos(tmp_path: Path, monkeypatch) -> Path:
+    """Raíz temporal con raw/, processed/, master/ y osm/ vacíos."""
+    raw, proc, mast, osm = (tmp_path / d for d in ("raw", "processed", "master", "osm"))
+    for d in (raw, proc, mast, osm):
+        d.mkdir()
+    monkeypatch.setattr(ingest, "DATA_RAW", raw)
+    monkeypatch.setattr(ingest, "DATA_PROC", proc)
+    monkeypatch.setattr(ingest, "HIST_PATH", proc / "housing_history.parquet")
+    monkeypatch.setattr(ingest, "CLEAN_PATH", proc / "housing_clean.parquet")
+    monkeypatch.setattr(ingest, "MANIFEST_PATH", proc / "raw_manifest.parquet")
+    monkeypatch.setattr(ingest_master, "DATA_RAW", raw)
+    monkeypatch.setattr(ingest_master, "MANIFEST_PATH", mast / "manifest.parquet")
+    monkeypatch.setattr(master, "MASTER_PATH", mast / "listings.parquet")
+    monkeypatch.setattr(eventos, "EVENTOS_DIR", mast / "eventos")
+    monkeypatch.setattr(indice_mercado, "INDICE_PATH", mast / "indice_mercado.parquet")
+    monkeypatch.setattr(build_app_dataset, "CLEAN_ROWS_PATH", mast / "clean_rows.parquet")
+    monkeypatch.setattr(build_app_dataset, "CLEAN_INDEX_PATH", mast / "clean_index.parquet")
+    monkeypatch.setattr(preprocessing, "CACHE_DIR", mast / "norm_cache")
+    monkeypatch.setattr(preprocessing, "_CACHES", {})
+    monkeypatch.setattr(preprocessing, "_NUEVAS", {})
+    monkeypatch.setattr(osm_pois, "OSM_DIR", osm)
+    monkeypatch.setattr(osm_pois, "POIS_DIR", osm / "pois")
+    monkeypatch.setattr(osm_pois, "POIS_PARQUET_PLANO", osm / "pois_colombia.parquet")
+    monkeypatch.setattr(osm_pois, "INDICE_DIR", osm / "pois_indice")
+    monkeypatch.setattr(osm_pois, "SERVICIOS_PATH", mast / "servicios.parquet")
+    osm_pois._cargar.cache_clear()
+    osm_pois._cargar_grilla.cache_clear()
+    yield tmp_path
+    osm_pois._cargar.cache_clear()
+    osm_pois._cargar_grilla.cache_clear()
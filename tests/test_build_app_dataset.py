@@ -0,0 +1,39 @@
+"""Store de filas limpias: la limpieza incremental da lo mismo que limpiar todo."""
+import numpy as np
+import pandas as pd
+
+from src import build_app_dataset as B, master as M, synthetic
+
+
+def _sembrar(fechas: int, semilla: int = 4):
+    for fecha, inv in synthetic.historia(1500, fechas, semilla=semilla):
+        M.upsert(inv.materializar(fecha), fecha)
+
+
+def test_incremental_igual_a_completo(datos):
+    _sembrar(2)
+    B.limpiar_incremental(M.cargar(B.ENTRADAS))
+    # Otra corrida (altas, bajas, repreciados) y una edición a mano del master
+    m = M.cargar()
+    m.loc[m.index[:5], "Título"] = "Casa en Venta en El Prado, Cali"
+    m = m.drop(index=m.index[5:10])
+    M.guardar(m)
+    _sembrar(3)
+    master = M.cargar(B.ENTRADAS)
+    incremental = B.limpiar_incremental(master)
+    completo = B.limpiar_incremental(master, full_rebuild=True)
+    pd.testing.assert_frame_equal(incremental, completo)
+    # Sin los que la limpieza descarta (sin precio/área), en el orden del master
+    ids = master["id_inmueble"].astype(str)
+    assert incremental["id_inmueble"].tolist() == ids[ids.isin(incremental["id_inmueble"])].tolist()
+
+
+def test_hash_detecta_cambio_de_etiquetas(datos):
+    _sembrar(1)
+    m = M.cargar(B.ENTRADAS)
+    assert isinstance(m["Etiquetas"].dropna().iloc[0], np.ndarray)   # así las da pyarrow
+    antes = B.hash_crudo(m)
+    m.at[m.index[0], "Etiquetas"] = np.array(["Piscina", "Remodelado"], dtype=object)
+    despues = B.hash_crudo(m)
+    assert antes.iloc[0] != despues.iloc[0]
+    assert (antes.iloc[1:] == despues.iloc[1:]).all()
@@ -0,0 +1,52 @@
+"""Bitácora de eventos: lo que anota cada upsert contra la verdad de la historia
+sintética (altas, bajas y repreciados entre corridas)."""
+import pandas as pd
+
+from src import eventos as EV, master as M, synthetic
+from src.preprocessing import extraer_precio
+
+
+def _verdad(previo: pd.DataFrame, actual: pd.DataFrame, conocidos: dict) -> dict:
+    """Eventos esperados de la corrida `actual` tras la corrida `previo`."""
+    precio = lambda df: dict(zip(df["id_inmueble"], extraer_precio(
+        df["Precio listado"].astype("string")).to_numpy(dtype="float64", na_value=float("nan"))))
+    ahora = precio(actual)
+    alcances = set(EV.alcance(actual["Ubicación listado"]).dropna())
+    prev_alc = dict(zip(previo["id_inmueble"], EV.alcance(previo["Ubicación listado"])))
+    return {
+        "nuevo": set(ahora) - set(conocidos),
+        "precio": {i for i, p in ahora.items() if i in conocidos and p == p
+                   and conocidos[i] == conocidos[i] and p != conocidos[i]},
+        "no_visto": {i for i in prev_alc if i not in ahora and prev_alc[i] in alcances},
+    }
+
+
+def test_eventos_igual_a_la_historia(datos):
+    conocidos, previo, esperado = {}, None, {}
+    for fecha, inv in synthetic.historia(3000, 4, rotacion=0.1, repreciados=0.1, semilla=5):
+        actual = inv.materializar(fecha)
+        if previo is not None:
+            esperado[fecha] = _verdad(previo, actual, conocidos)
+        M.upsert(actual, fecha)
+        conocidos.update(zip(actual["id_inmueble"], extraer_precio(
+            actual["Precio listado"].astype("string")).to_numpy(dtype="float64",
+                                                                 na_value=float("nan"))))
+        previo = actual
+
+    ev = EV.leer()
+    assert set(ev["fecha"]) == set(esperado)   # la siembra no anota nada
+    for fecha, tipos in esperado.items():
+        for tipo, ids in tipos.items():
+            anotados = ev.loc[(ev["fecha"] == fecha) & (ev["evento"] == tipo), "id_inmueble"]
+            assert set(anotados) == ids, (fecha, tipo)
+            assert len(ids) > 0, (fecha, tipo)
+
+
+def test_filtro_empujado_igual_a_filtrar_en_pandas(datos):
+    for fecha, inv in synthetic.historia(2000, 3, repreciados=0.2, semilla=6):
+        M.upsert(inv.materializar(fecha), fecha)
+    todo = EV.leer()
+    ciudad = todo["Ciudad"].mode()[0]
+    filtrado = EV.leer(tipos=["precio"], filtro=EV.ds.field("Ciudad") == ciudad)
+    esperado = todo[(todo["evento"] == "precio") & (todo["Ciudad"] == ciudad)]
+    pd.testing.assert_frame_equal(filtrado, esperado.reset_index(drop=True))
@@ -0,0 +1,69 @@
+"""Features de servicios: todos los motores dan lo mismo que el BallTree."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import osm_pois as O
+
+
+@pytest.fixture
+def pois(datos):
+    """POIs sintéticos alrededor de dos ciudades + inmuebles en la misma zona."""
+    rng = np.random.default_rng(7)
+    centros = np.array([[4.65, -74.08], [6.24, -75.58]])
+    c = centros[rng.integers(0, 2, 20_000)]
+    O.guardar_pois(pd.DataFrame({"lat": c[:, 0] + rng.normal(0, 0.05, len(c)),
+                                 "lon": c[:, 1] + rng.normal(0, 0.05, len(c)),
+                                 "categoria": rng.choice(sorted(O.CATEGORIAS), len(c))}))
+    c = centros[rng.integers(0, 2, 1500)]
+    inmuebles = pd.DataFrame({"id_inmueble": [str(i) for i in range(len(c))],
+                              "Latitud": c[:, 0] + rng.normal(0, 0.04, len(c)),
+                              "Longitud": c[:, 1] + rng.normal(0, 0.04, len(c))})
+    inmuebles.loc[:4, ["Latitud", "Longitud"]] = np.nan   # sin coordenadas
+    return inmuebles
+
+
+def _conteos(df):
+    return [c for c in df.columns if c.startswith(("serv_", "n_"))]
+
+
+def _distancias(df):
+    return [c for c in df.columns if c.startswith("dist_")]
+
+
+def test_motores_iguales_al_balltree(pois):
+    coords = pois.loc[5:, ["Latitud", "Longitud"]].reset_index(drop=True)
+    ref = O.features_servicios(coords)
+    for kw in ({"motor": "ckdtree"}, {"conteo": "exacto"}, {"region": True},
+               {"filas_chunk": 200, "n_jobs": 2}):
+        otro = O.features_servicios(coords, **kw)
+        assert list(otro.columns) == list(ref.columns), kw
+        pd.testing.assert_frame_equal(otro[_conteos(ref)], ref[_conteos(ref)],
+                                      check_dtype=False, obj=str(kw))
+        np.testing.assert_allclose(otro[_distancias(ref)], ref[_distancias(ref)],
+                                   rtol=0, atol=1e-6, err_msg=str(kw))
+
+
+def test_grilla_aproxima(pois):
+    coords = pois.loc[5:, ["Latitud", "Longitud"]].reset_index(drop=True)
+    ref = O.features_servicios(coords)["serv_1000m"].to_numpy()
+    aprox = O.features_servicios(coords, conteo="grilla")["serv_1000m"].to_numpy()
+    assert abs(aprox.sum() / ref.sum() - 1) < 0.05
+
+
+def test_tabla_lateral_reutiliza_y_recalcula(pois, capsys):
+    directo = O.features_servicios(pois.loc[5:, ["Latitud", "Longitud"]])
+    primera = O.con_servicios(pois)
+    cols = _conteos(directo) + _distancias(directo)
+    pd.testing.assert_frame_equal(primera[cols].iloc[5:], directo[cols], check_dtype=False)
+    assert primera[cols].iloc[:5].isna().all().all()
+
+    movidos = pois.copy()
+    movidos.loc[10:19, "Latitud"] += 0.01
+    capsys.readouterr()
+    segunda = O.con_servicios(movidos)
+    assert "calculados 10 de" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(
+        segunda[cols].iloc[5:].reset_index(drop=True),
+        O.features_servicios(movidos.loc[5:, ["Latitud", "Longitud"]])[cols]
+        .reset_index(drop=True), check_dtype=False)
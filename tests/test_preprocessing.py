@@ -0,0 +1,110 @@
+"""Limpieza: normalizadores vectorizados vs la versión fila a fila original,
+caché en disco vs sin caché y proceso único vs pool."""
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import preprocessing as P
+from src import synthetic
+
+
+@pytest.fixture(scope="module")
+def crudo() -> pd.DataFrame:
+    return synthetic.frame(1500, fechas=2, semilla=1)
+
+
+# --- Referencia: las funciones por fila de la versión original ---
+def _precio_fila(v):
+    if pd.isna(v):
+        return np.nan
+    try:
+        return float(re.sub(r"[^\d.]", "", v.split("$")[-1]).replace(".", ""))
+    except ValueError:
+        return np.nan
+
+
+def _tipologia_fila(v):
+    out = {k: np.nan for k in P.PATRONES_TIPOLOGIA}
+    if pd.isna(v):
+        return out
+    for k, pat in P.PATRONES_TIPOLOGIA.items():
+        m = re.search(pat, v, re.IGNORECASE)
+        if m:
+            out[k] = float(m.group(1))
+    return out
+
+
+def _ubicacion_fila(v):
+    if pd.isna(v):
+        return ("Desconocido", "Desconocido")
+    partes = [p.strip() for p in str(v).split(",") if p.strip()]
+    partes[0] = re.sub(r"^.*\ben(?=[A-ZÁÉÍÓÚÑ])", "", partes[0]).strip() or partes[0]
+    if len(partes) >= 3:
+        ciudad, depto = partes[-2], partes[-1]
+    elif len(partes) == 2:
+        ciudad, depto = partes
+    else:
+        ciudad, depto = partes[0], "Desconocido"
+    depto = depto.title()
+    return (ciudad.title(), P.DEPTO_NORM.get(depto, depto))
+
+
+def _barrio_fila(v):
+    if pd.isna(v):
+        return "Desconocido"
+    m = (re.search(r"venta en\s+([^\.,]+?),", v, re.IGNORECASE)
+         or re.search(r"venta en\s+([^\.,]+)$", v, re.IGNORECASE))
+    return m.group(1).strip().title() if m else "Desconocido"
+
+
+def _unicos(crudo, col):
+    return pd.Series(pd.unique(crudo[col].dropna()), dtype="string")
+
+
+def test_precio_igual_a_fila(crudo):
+    s = pd.concat([_unicos(crudo, "Precio listado"),
+                   pd.Series(["Desde $ 207.800.000", "Consultar", pd.NA], dtype="string")],
+                  ignore_index=True)
+    esperado = [_precio_fila(v) for v in s]
+    np.testing.assert_array_equal(P.extraer_precio(s).to_numpy(dtype="float64"), esperado)
+
+
+def test_tipologia_igual_a_fila(crudo):
+    s = pd.concat([_unicos(crudo, "Tipología listado"),
+                   pd.Series(["10 Habs. 4 Baños 432 m²", "2 Ambientes 1 Baño 85.78 m²"],
+                             dtype="string")], ignore_index=True)
+    esperado = pd.DataFrame([_tipologia_fila(v) for v in s])
+    pd.testing.assert_frame_equal(P.extraer_tipologia(s)[list(esperado.columns)]
+                                  .astype("float64"), esperado)
+
+
+def test_ubicacion_igual_a_fila(crudo):
+    s = pd.concat([_unicos(crudo, "Ubicación listado"),
+                   pd.Series(["Armenia, Quindio", "Apartamento enBogotá, Bogotá, d.c."],
+                             dtype="string")], ignore_index=True)
+    esperado = pd.DataFrame([_ubicacion_fila(v) for v in s], columns=["Ciudad", "Departamento"])
+    pd.testing.assert_frame_equal(P.normalizar_ubicacion(s).astype(object),
+                                  esperado.astype(object))
+
+
+def test_barrio_igual_a_fila(crudo):
+    s = _unicos(crudo, "Descripción breve")
+    assert P.extraer_barrio(s).tolist() == [_barrio_fila(v) for v in s]
+
+
+def test_cache_no_cambia_el_resultado(datos, crudo):
+    sin = P.preprocesar_datos_finca_raiz(crudo.copy(), usar_cache=False)
+    fria = P.preprocesar_datos_finca_raiz(crudo.copy())
+    assert (P.CACHE_DIR / "precio.parquet").exists()
+    P._CACHES.clear()
+    caliente = P.preprocesar_datos_finca_raiz(crudo.copy())
+    pd.testing.assert_frame_equal(sin, fria)
+    pd.testing.assert_frame_equal(sin, caliente)
+
+
+def test_paralelo_igual_a_serial(datos, crudo):
+    serial = P.preprocesar_datos_finca_raiz(crudo.copy(), usar_cache=False)
+    paralelo = P.preprocesar_datos_finca_raiz(crudo.copy(), usar_cache=False, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, paralelo)